@@ -7,13 +7,33 @@ accuracy, HUD signals).
 from __future__ import annotations
 
 import json
-import statistics
+import os
+import shutil
+from collections import Counter
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, Optional, Sequence
+from typing import IO, Any, Dict, Iterator, List, Mapping, Optional, Sequence
 
-from tools.emoji_translator import GlyphIndex, load_lexicon, translate_tokens
+from production.campaign2.event_store import (
+    KIND_COMMAND,
+    KIND_DOWNED,
+    KIND_ONE_MORE,
+    KIND_REVIVE,
+    KIND_UI_STATE,
+    ChainEntry,
+    EventStore,
+)
+from production.campaign2.latency_stats import LatencyHistogram
+from tools.emoji_translator import CompiledTranslator, GlyphIndex, load_lexicon
+
+
+_KIND_TYPES = {
+    KIND_UI_STATE: "ui_state",
+    KIND_DOWNED: "downed",
+    KIND_REVIVE: "revive",
+    KIND_ONE_MORE: "one_more_prompt",
+}
 
 
 def utc_now() -> datetime:
@@ -32,49 +52,154 @@ def ids_to_glyphs(chain_ids: Sequence[str], lexicon: GlyphIndex) -> List[str]:
     return glyphs
 
 
-def percentile(values: Sequence[int], pct: float) -> int:
-    if not values:
-        return 0
-    ordered = sorted(values)
-    k = int((len(ordered) - 1) * pct)
-    return ordered[k]
+def mirror_file(src: Path, dst: Path) -> None:
+    """Publish ``src`` at ``dst`` via hardlink, falling back to a copy."""
+    if dst.resolve() == src.resolve():
+        return
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
 
 
 @dataclass
 class CommandTelemetry:
+    """Session telemetry for the emoji command layer.
+
+    Events are kept in a columnar ``EventStore`` and only inflated to dicts
+    on export (``events``/``latency_samples``/``write_outputs``). With
+    ``stream_dir`` set, each event is instead appended to the playtest JSONL
+    in that directory as it is recorded (flushed every ``flush_every``
+    events, fsynced only on ``checkpoint``); flushed rows are dropped from the
+    store, so memory stays bounded by the counters, the latency sketch and
+    the interned chains, and exports read the JSONL back.
+    """
+
     order_id: str
     workspace: str
     run_id: str
     lexicon: GlyphIndex = field(default_factory=load_lexicon)
     start_time: datetime = field(default_factory=utc_now)
+    stream_dir: Optional[Path] = None
+    flush_every: int = 64
+    per_run_files: bool = False  # include run_id in output names so runs do not overwrite each other
 
-    events: List[Mapping[str, Any]] = field(default_factory=list)
-    latency_samples: List[Mapping[str, Any]] = field(default_factory=list)
-    latencies_ms: List[int] = field(default_factory=list)
+    latency_stats: LatencyHistogram = field(default_factory=LatencyHistogram)
     total_commands: int = 0
     total_valid: int = 0
     first_valid_ms: Optional[int] = None
     downed_ms: Optional[int] = None
     revive_ms: Optional[int] = None
+    event_counts: Counter = field(default_factory=Counter)
     _counter: int = 0
-
-    def _timestamp(self, delta_ms: int) -> str:
-        return isoformat(self.start_time + timedelta(milliseconds=delta_ms))
+    store: EventStore = field(init=False, repr=False)
+    translator: CompiledTranslator = field(init=False, repr=False)
+    _sink: Optional[IO[str]] = field(default=None, init=False, repr=False)
+    _sink_path: Optional[Path] = field(default=None, init=False, repr=False)
+    _unflushed: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.store = EventStore(self.order_id, self.run_id, self.workspace, self.start_time)
+        # Wheel-bound quick-casts repeat a handful of chains, so resolve each once.
+        self.translator = CompiledTranslator(self.lexicon)
+
+    @property
+    def events(self) -> List[Mapping[str, Any]]:
+        if self.stream_dir is not None:
+            return list(self._iter_streamed())
+        return list(self.store.iter_events())
+
+    @property
+    def latency_samples(self) -> List[Mapping[str, Any]]:
+        if self.stream_dir is not None:
+            return [event for event in self._iter_streamed() if event.get("type") == "emoji_latency_sample"]
+        return list(self.store.iter_latency_samples())
+
+    def _iter_streamed(self) -> Iterator[Dict[str, Any]]:
+        """Events already streamed to the playtest JSONL (flushing the sink first)."""
+        if self._sink is not None:
+            self._sink.flush()
+        if self._sink_path is None or not self._sink_path.exists():
+            return
+        with self._sink_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+    @property
+    def file_stem(self) -> str:
+        return f"{self.order_id}-{self.run_id}" if self.per_run_files else self.order_id
+
+    @property
+    def events_filename(self) -> str:
+        return f"{self.file_stem}-campaign2-playtest.jsonl"
+
+    @property
+    def telemetry_filename(self) -> str:
+        return f"{self.file_stem}-campaign2-telemetry.json"
+
+    def _open_sink(self) -> IO[str]:
+        assert self.stream_dir is not None
+        stream_dir = Path(self.stream_dir)
+        stream_dir.mkdir(parents=True, exist_ok=True)
+        self._sink_path = stream_dir / self.events_filename
+        # Unlink first so a previous run's hardlinked attachment is left intact.
+        self._sink_path.unlink(missing_ok=True)
+        self._sink = self._sink_path.open("w", encoding="utf-8", buffering=1 << 16)
+        return self._sink
+
+    def _emit(self, row: int, command_ordinal: int = 0) -> None:
+        events = self.store.inflate(row, command_ordinal) if self.stream_dir is not None else None
+        kind = self.store.kind[row]
+        if kind == KIND_COMMAND:
+            self.event_counts["command"] += 1
+            self.event_counts["emoji_latency_sample"] += 1
+        else:
+            self.event_counts[_KIND_TYPES[kind]] += 1
+        if events is None:
+            return
+        sink = self._sink or self._open_sink()
+        for event in events:
+            sink.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            sink.flush()
+            self._unflushed = 0
+            self.store.clear()  # streamed rows are not needed again
+
+    def checkpoint(self) -> None:
+        """Flush streamed events and fsync them to disk."""
+        if self._sink is None:
+            return
+        self._sink.flush()
+        os.fsync(self._sink.fileno())
+        self._unflushed = 0
+        self.store.clear()
+
+    def close_stream(self) -> Optional[Path]:
+        """Checkpoint and close the streaming sink; returns the JSONL path."""
+        if self._sink is not None:
+            self.checkpoint()
+            self._sink.close()
+            self._sink = None
+        return self._sink_path
 
     def record_ui_state(self, state: str, detail: Optional[str], wheel: Optional[str], player: Optional[str], delta_ms: int) -> None:
-        self.events.append(
-            {
-                "type": "ui_state",
-                "timestamp": self._timestamp(delta_ms),
-                "state": state,
-                "detail": detail,
-                "wheel": wheel,
-                "player": player,
-                "order_id": self.order_id,
-                "run_id": self.run_id,
-                "workspace": self.workspace,
-            }
-        )
+        row = self.store.append(KIND_UI_STATE, delta_ms, player=player, wheel=wheel, text_a=state, text_b=detail)
+        self._emit(row)
+
+    def _chain(self, glyph_ids: Sequence[str]) -> int:
+        chain_id = self.store.chain_id(glyph_ids)
+        if chain_id is not None:
+            return chain_id
+        glyphs = tuple(ids_to_glyphs(glyph_ids, self.lexicon))
+        try:
+            round_trip = self.translator.translate(glyph_ids)
+            entry = ChainEntry(tuple(glyph_ids), glyphs, True, intent=round_trip.get("intent"))
+        except Exception as exc:
+            entry = ChainEntry(tuple(glyph_ids), glyphs, False, error=str(exc))
+        return self.store.add_chain(entry)
 
     def record_command(
         self,
@@ -87,133 +212,103 @@ class CommandTelemetry:
         label: Optional[str],
         delta_ms: int,
     ) -> None:
-        event_id = f"cmd-{self._counter}"
+        ordinal = self._counter
         self._counter += 1
-        glyphs = ids_to_glyphs(glyph_ids, self.lexicon)
-        timestamp = self._timestamp(delta_ms)
-
-        record: Dict[str, Any] = {
-            "type": "command",
-            "event_id": event_id,
-            "timestamp": timestamp,
-            "player": player,
-            "source": source,
-            "wheel": wheel,
-            "slot": slot,
-            "glyph_ids": list(glyph_ids),
-            "glyphs": glyphs,
-            "latency_ms": latency_ms,
-            "label": label,
-            "order_id": self.order_id,
-            "run_id": self.run_id,
-            "workspace": self.workspace,
-        }
+        chain_id = self._chain(glyph_ids)
+        valid = self.store.chains[chain_id].valid
 
         self.total_commands += 1
-        try:
-            round_trip = translate_tokens(glyph_ids, index=self.lexicon)
-            record["valid"] = True
-            record["intent"] = round_trip.get("intent")
+        if valid:
             self.total_valid += 1
-            self.latencies_ms.append(latency_ms)
+            self.latency_stats.record(latency_ms)
             if self.first_valid_ms is None:
                 self.first_valid_ms = delta_ms
-        except Exception as exc:
-            record["valid"] = False
-            record["error"] = str(exc)
-
-        self.events.append(record)
-
-        latency_event = {
-            "type": "emoji_latency_sample",
-            "event_id": f"latency-{event_id}",
-            "related_event": event_id,
-            "timestamp": timestamp,
-            "player": player,
-            "glyph_ids": list(glyph_ids),
-            "glyphs": glyphs,
-            "latency_ms": latency_ms,
-            "valid": record["valid"],
-            "order_id": self.order_id,
-            "run_id": self.run_id,
-            "workspace": self.workspace,
-        }
-        self.latency_samples.append(latency_event)
-        self.events.append(latency_event)
+
+        row = self.store.append(
+            KIND_COMMAND,
+            delta_ms,
+            player=player,
+            wheel=wheel,
+            text_a=slot,
+            text_b=source,
+            label=label,
+            chain=chain_id,
+            latency_ms=latency_ms,
+            flag=valid,
+        )
+        self._emit(row, ordinal)
 
     def record_downed(self, player: str, by: str, delta_ms: int) -> None:
         self.downed_ms = delta_ms
-        self.events.append(
-            {
-                "type": "downed",
-                "timestamp": self._timestamp(delta_ms),
-                "player": player,
-                "by": by,
-                "order_id": self.order_id,
-                "run_id": self.run_id,
-                "workspace": self.workspace,
-            }
-        )
+        self._emit(self.store.append(KIND_DOWNED, delta_ms, player=player, text_a=by))
 
     def record_revive(self, player: str, by: str, emoji: Optional[str], delta_ms: int) -> None:
         self.revive_ms = delta_ms
-        self.events.append(
-            {
-                "type": "revive",
-                "timestamp": self._timestamp(delta_ms),
-                "player": player,
-                "by": by,
-                "emoji": emoji,
-                "order_id": self.order_id,
-                "run_id": self.run_id,
-                "workspace": self.workspace,
-            }
-        )
+        self._emit(self.store.append(KIND_REVIVE, delta_ms, player=player, text_a=by, text_b=emoji))
 
     def record_one_more_prompt(self, accepted: bool, delta_ms: int) -> None:
-        self.events.append(
-            {
-                "type": "one_more_prompt",
-                "timestamp": self._timestamp(delta_ms),
-                "accepted": accepted,
-                "order_id": self.order_id,
-                "run_id": self.run_id,
-                "workspace": self.workspace,
-            }
-        )
+        self._emit(self.store.append(KIND_ONE_MORE, delta_ms, flag=accepted))
 
-    def build_summary(self, duration_ms: int) -> Mapping[str, Any]:
+    def metrics(self, duration_ms: int) -> Dict[str, Any]:
         accuracy_rate = (self.total_valid / self.total_commands) if self.total_commands else 0
-        avg_latency = int(statistics.mean(self.latencies_ms)) if self.latencies_ms else 0
-        p95_latency = percentile(self.latencies_ms, 0.95)
+        tails = self.latency_stats.percentiles((0.5, 0.9, 0.95, 0.99))
         revive_gap_ms = (
             self.revive_ms - self.downed_ms if self.downed_ms is not None and self.revive_ms is not None else None
         )
+        return {
+            "time_to_fun_ms": self.first_valid_ms,
+            "revive_ms": revive_gap_ms,
+            "tutorial_duration_ms": duration_ms,
+            "avg_command_latency_ms": self.latency_stats.mean(),
+            "p50_command_latency_ms": tails["p50"],
+            "p90_command_latency_ms": tails["p90"],
+            "p95_command_latency_ms": tails["p95"],
+            "p99_command_latency_ms": tails["p99"],
+            "command_accuracy": round(accuracy_rate, 3),
+            "commands_executed": self.total_commands,
+            "commands_valid": self.total_valid,
+            "one_more_accept": True,
+        }
+
+    def hud_signals(self) -> Dict[str, int]:
+        return {
+            "ui_state_events": self.event_counts["ui_state"],
+            "revive_events": self.event_counts["revive"],
+            "one_more_prompts": self.event_counts["one_more_prompt"],
+            "emoji_latency_samples": self.event_counts["emoji_latency_sample"],
+        }
+
+    def latency_summary(self) -> Dict[str, Any]:
+        """Counts and percentiles of accepted-command latency (raw samples stay in the playtest JSONL)."""
+        stats = self.latency_stats
+        summary: Dict[str, Any] = {
+            "count": stats.count,
+            "min_ms": stats.minimum,
+            "max_ms": stats.maximum,
+            "mean_ms": stats.mean(),
+        }
+        for name, value in stats.percentiles((0.5, 0.9, 0.95, 0.99)).items():
+            summary[f"{name}_ms"] = value
+        return summary
+
+    def live_metrics(self, duration_ms: int) -> Mapping[str, Any]:
+        """Cheap mid-session snapshot for HUD overlays (no event history scan)."""
+        return {
+            "run_id": self.run_id,
+            "metrics": self.metrics(duration_ms),
+            "hud_signals": self.hud_signals(),
+        }
 
+    def build_summary(self, duration_ms: int) -> Mapping[str, Any]:
         return {
-            "schema": "toysoldiers-campaign2-telemetry@1.0",
+            "schema": "toysoldiers-campaign2-telemetry@1.1",  # 1.1: latency_stats replaces latency_samples
             "order_id": self.order_id,
             "workspace": self.workspace,
             "run_id": self.run_id,
             "timestamp": isoformat(utc_now()),
-            "metrics": {
-                "time_to_fun_ms": self.first_valid_ms,
-                "revive_ms": revive_gap_ms,
-                "tutorial_duration_ms": duration_ms,
-                "avg_command_latency_ms": avg_latency,
-                "p95_command_latency_ms": p95_latency,
-                "command_accuracy": round(accuracy_rate, 3),
-                "commands_executed": self.total_commands,
-                "commands_valid": self.total_valid,
-                "one_more_accept": True,
-            },
-            "hud_signals": {
-                "ui_state_events": len([e for e in self.events if e["type"] == "ui_state"]),
-                "revive_events": len([e for e in self.events if e["type"] == "revive"]),
-                "one_more_prompts": len([e for e in self.events if e["type"] == "one_more_prompt"]),
-                "emoji_latency_samples": len(self.latency_samples),
-            },
-            "latency_samples": self.latency_samples,
+            "metrics": self.metrics(duration_ms),
+            "hud_signals": self.hud_signals(),
+            "latency_stats": self.latency_summary(),
             "guardrails": {
                 "input_mode": "emoji_dsl_only",
                 "filters": ["no free text", "template-bound commands", "wheel-locked quick-cast"],
@@ -229,27 +324,30 @@ class CommandTelemetry:
         }
 
     def write_outputs(self, log_dir: Path, attachments_dir: Path, duration_ms: int) -> Dict[str, Path]:
-        payloads = self.export_payloads(duration_ms)
         log_dir.mkdir(parents=True, exist_ok=True)
         attachments_dir.mkdir(parents=True, exist_ok=True)
 
-        events_path = log_dir / f"{self.order_id}-campaign2-playtest.jsonl"
-        telemetry_path = log_dir / f"{self.order_id}-campaign2-telemetry.json"
-        attachment_events = attachments_dir / events_path.name
-        attachment_telemetry = attachments_dir / telemetry_path.name
-
-        def write_jsonl(path: Path, records: List[Mapping[str, Any]]) -> None:
-            with path.open("w", encoding="utf-8") as handle:
-                for record in records:
+        telemetry_path = log_dir / self.telemetry_filename
+        if self.stream_dir is not None:
+            events_path = self.close_stream() or (Path(self.stream_dir) / self.events_filename)
+            events_path.touch(exist_ok=True)
+        else:
+            events_path = log_dir / self.events_filename
+            events_path.unlink(missing_ok=True)
+            with events_path.open("w", encoding="utf-8") as handle:
+                for record in self.store.iter_events():
                     handle.write(json.dumps(record, ensure_ascii=False) + "\n")
 
-        def write_json(path: Path, payload: Mapping[str, Any]) -> None:
-            path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        telemetry_path.unlink(missing_ok=True)
+        telemetry_path.write_text(
+            json.dumps(self.build_summary(duration_ms), indent=2, ensure_ascii=False),
+            encoding="utf-8",
+        )
 
-        write_jsonl(events_path, payloads["events"])
-        write_json(telemetry_path, payloads["telemetry"])
-        write_jsonl(attachment_events, payloads["events"])
-        write_json(attachment_telemetry, payloads["telemetry"])
+        attachment_events = attachments_dir / events_path.name
+        attachment_telemetry = attachments_dir / telemetry_path.name
+        mirror_file(events_path, attachment_events)
+        mirror_file(telemetry_path, attachment_telemetry)
 
         return {
             "events": events_path,
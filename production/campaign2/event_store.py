@@ -0,0 +1,241 @@
+"""Columnar event store backing ``CommandTelemetry``.
+
+Each recorded event is one row across typed arrays: numeric fields live in
+``array`` columns, free-form strings (player, wheel, slot, source, label...)
+are interned once in a ``StringTable`` and stored as integer codes, and glyph
+chains are interned in a chain table holding the translated glyphs, intent
+and validity. Session-constant fields (order_id, run_id, workspace) and
+timestamps are only re-inflated when events are exported, so a command costs
+a few dozen bytes instead of two ~14-key dicts.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+KIND_COMMAND = 0
+KIND_UI_STATE = 1
+KIND_DOWNED = 2
+KIND_REVIVE = 3
+KIND_ONE_MORE = 4
+
+
+class StringTable:
+    """Interns optional strings to dense integer codes (0 is ``None``)."""
+
+    def __init__(self) -> None:
+        self._codes: Dict[str, int] = {}
+        self.values: List[Optional[str]] = [None]
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code: int) -> Optional[str]:
+        return self.values[code]
+
+
+@dataclass(frozen=True)
+class ChainEntry:
+    glyph_ids: Tuple[str, ...]
+    glyphs: Tuple[str, ...]
+    valid: bool
+    intent: Optional[Mapping[str, Any]] = None
+    error: Optional[str] = None
+
+
+class EventStore:
+    """Append-only columnar storage for one telemetry session."""
+
+    def __init__(self, order_id: str, run_id: str, workspace: str, start_time: datetime) -> None:
+        self.order_id = order_id
+        self.run_id = run_id
+        self.workspace = workspace
+        self.start_time = start_time
+
+        self.strings = StringTable()
+        self.chains: List[ChainEntry] = []
+        self._chain_ids: Dict[Tuple[str, ...], int] = {}
+
+        self.kind = array("B")
+        self.delta_ms = array("q")
+        self.player = array("I")
+        self.wheel = array("I")
+        self.text_a = array("I")  # command slot / ui state / downed+revive "by"
+        self.text_b = array("I")  # command source / ui detail / revive emoji
+        self.label = array("I")
+        self.chain = array("I")
+        self.latency_ms = array("l")
+        self.flag = array("b")  # command validity / one-more accepted
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def clear(self) -> None:
+        """Drop every row (e.g. once streamed out); interned strings and chains are kept."""
+        for column in (
+            self.kind,
+            self.delta_ms,
+            self.player,
+            self.wheel,
+            self.text_a,
+            self.text_b,
+            self.label,
+            self.chain,
+            self.latency_ms,
+            self.flag,
+        ):
+            del column[:]
+
+    def chain_id(self, glyph_ids: Sequence[str]) -> Optional[int]:
+        return self._chain_ids.get(tuple(glyph_ids))
+
+    def add_chain(self, entry: ChainEntry) -> int:
+        chain_id = self._chain_ids[entry.glyph_ids] = len(self.chains)
+        self.chains.append(entry)
+        return chain_id
+
+    def append(
+        self,
+        kind: int,
+        delta_ms: int,
+        *,
+        player: Optional[str] = None,
+        wheel: Optional[str] = None,
+        text_a: Optional[str] = None,
+        text_b: Optional[str] = None,
+        label: Optional[str] = None,
+        chain: int = 0,
+        latency_ms: int = 0,
+        flag: bool = False,
+    ) -> int:
+        code = self.strings.code
+        self.kind.append(kind)
+        self.delta_ms.append(delta_ms)
+        self.player.append(code(player))
+        self.wheel.append(code(wheel))
+        self.text_a.append(code(text_a))
+        self.text_b.append(code(text_b))
+        self.label.append(code(label))
+        self.chain.append(chain)
+        self.latency_ms.append(latency_ms)
+        self.flag.append(1 if flag else 0)
+        return len(self.kind) - 1
+
+    def _timestamp(self, delta_ms: int) -> str:
+        return (self.start_time + timedelta(milliseconds=delta_ms)).isoformat().replace("+00:00", "Z")
+
+    def _session(self) -> Dict[str, str]:
+        return {"order_id": self.order_id, "run_id": self.run_id, "workspace": self.workspace}
+
+    def inflate(self, row: int, command_ordinal: int = 0) -> List[Dict[str, Any]]:
+        """Rebuild the JSONL event dict(s) for ``row``; commands yield two events."""
+        s = self.strings
+        kind = self.kind[row]
+        timestamp = self._timestamp(self.delta_ms[row])
+        player = s[self.player[row]]
+
+        if kind == KIND_COMMAND:
+            entry = self.chains[self.chain[row]]
+            event_id = f"cmd-{command_ordinal}"
+            valid = bool(self.flag[row])
+            record: Dict[str, Any] = {
+                "type": "command",
+                "event_id": event_id,
+                "timestamp": timestamp,
+                "player": player,
+                "source": s[self.text_b[row]],
+                "wheel": s[self.wheel[row]],
+                "slot": s[self.text_a[row]],
+                "glyph_ids": list(entry.glyph_ids),
+                "glyphs": list(entry.glyphs),
+                "latency_ms": self.latency_ms[row],
+                "label": s[self.label[row]],
+                **self._session(),
+                "valid": valid,
+            }
+            if valid:
+                intent = dict(entry.intent or {})
+                intent["qualifiers"] = list(intent.get("qualifiers", []))
+                record["intent"] = intent
+            else:
+                record["error"] = entry.error
+            return [record, self._latency_sample(row, event_id, timestamp, entry)]
+
+        if kind == KIND_UI_STATE:
+            return [
+                {
+                    "type": "ui_state",
+                    "timestamp": timestamp,
+                    "state": s[self.text_a[row]],
+                    "detail": s[self.text_b[row]],
+                    "wheel": s[self.wheel[row]],
+                    "player": player,
+                    **self._session(),
+                }
+            ]
+        if kind == KIND_DOWNED:
+            return [{"type": "downed", "timestamp": timestamp, "player": player, "by": s[self.text_a[row]], **self._session()}]
+        if kind == KIND_REVIVE:
+            return [
+                {
+                    "type": "revive",
+                    "timestamp": timestamp,
+                    "player": player,
+                    "by": s[self.text_a[row]],
+                    "emoji": s[self.text_b[row]],
+                    **self._session(),
+                }
+            ]
+        return [{"type": "one_more_prompt", "timestamp": timestamp, "accepted": bool(self.flag[row]), **self._session()}]
+
+    def _latency_sample(self, row: int, event_id: str, timestamp: str, entry: ChainEntry) -> Dict[str, Any]:
+        return {
+            "type": "emoji_latency_sample",
+            "event_id": f"latency-{event_id}",
+            "related_event": event_id,
+            "timestamp": timestamp,
+            "player": self.strings[self.player[row]],
+            "glyph_ids": list(entry.glyph_ids),
+            "glyphs": list(entry.glyphs),
+            "latency_ms": self.latency_ms[row],
+            "valid": bool(self.flag[row]),
+            **self._session(),
+        }
+
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        ordinal = 0
+        for row in range(len(self.kind)):
+            if self.kind[row] == KIND_COMMAND:
+                yield from self.inflate(row, ordinal)
+                ordinal += 1
+            else:
+                yield from self.inflate(row)
+
+    def iter_latency_samples(self) -> Iterator[Dict[str, Any]]:
+        ordinal = 0
+        for row in range(len(self.kind)):
+            if self.kind[row] != KIND_COMMAND:
+                continue
+            event_id = f"cmd-{ordinal}"
+            ordinal += 1
+            yield self._latency_sample(row, event_id, self._timestamp(self.delta_ms[row]), self.chains[self.chain[row]])
+
+
+__all__ = [
+    "ChainEntry",
+    "EventStore",
+    "KIND_COMMAND",
+    "KIND_DOWNED",
+    "KIND_ONE_MORE",
+    "KIND_REVIVE",
+    "KIND_UI_STATE",
+    "StringTable",
+]
@@ -0,0 +1,117 @@
+"""Streaming latency sketch for Campaign 2 telemetry.
+
+``LatencyHistogram`` is a small HDR-style log-linear histogram over integer
+milliseconds. Values below ``EXACT_LIMIT`` are counted exactly; larger values
+land in buckets whose width is at most 1/1024 of their value, so percentiles
+stay within ~0.1% while memory is bounded by the number of distinct buckets
+rather than the number of samples. Histograms merge by adding counts, which
+lets per-run sketches roll up across sessions.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Mapping
+
+SUB_BUCKET_BITS = 11
+EXACT_LIMIT = 1 << SUB_BUCKET_BITS  # 2048 ms
+_HALF = EXACT_LIMIT >> 1
+
+
+def bucket_index(value: int) -> int:
+    if value < EXACT_LIMIT:
+        return max(0, value)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return EXACT_LIMIT + (shift - 1) * _HALF + ((value >> shift) - _HALF)
+
+
+def bucket_floor(index: int) -> int:
+    """Smallest value that maps to ``index``."""
+    if index < EXACT_LIMIT:
+        return index
+    offset = index - EXACT_LIMIT
+    shift = offset // _HALF + 1
+    return (_HALF + offset % _HALF) << shift
+
+
+@dataclass
+class LatencyHistogram:
+    counts: Dict[int, int] = field(default_factory=dict)
+    count: int = 0
+    total: int = 0
+    minimum: int = 0
+    maximum: int = 0
+
+    def record(self, value: int) -> None:
+        value = max(0, int(value))
+        idx = bucket_index(value)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        if self.count == 0 or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.count == 0:
+            return
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        self.minimum = other.minimum if self.count == 0 else min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.count += other.count
+        self.total += other.total
+
+    def mean(self) -> int:
+        return self.total // self.count if self.count else 0
+
+    def percentile(self, pct: float) -> int:
+        """Value at rank ``int((count - 1) * pct)`` of the sorted samples (nearest-rank, no interpolation)."""
+        if not self.count:
+            return 0
+        rank = int((self.count - 1) * pct)
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen > rank:
+                return min(max(bucket_floor(idx), self.minimum), self.maximum)
+        return self.maximum
+
+    def percentiles(self, pcts: Iterable[float]) -> Dict[str, int]:
+        """Several percentiles in one pass, keyed ``p50``/``p95``/``p99``..."""
+        wanted = sorted((int((self.count - 1) * pct), f"p{pct * 100:g}") for pct in pcts)
+        results = {name: 0 for _, name in wanted}
+        if not self.count:
+            return results
+        seen = 0
+        pos = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            while pos < len(wanted) and seen > wanted[pos][0]:
+                results[wanted[pos][1]] = min(max(bucket_floor(idx), self.minimum), self.maximum)
+                pos += 1
+            if pos == len(wanted):
+                break
+        return results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "buckets": {str(idx): n for idx, n in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "LatencyHistogram":
+        return cls(
+            counts={int(idx): int(n) for idx, n in (data.get("buckets") or {}).items()},
+            count=int(data.get("count", 0)),
+            total=int(data.get("total", 0)),
+            minimum=int(data.get("min", 0)),
+            maximum=int(data.get("max", 0)),
+        )
+
+
+__all__ = ["EXACT_LIMIT", "LatencyHistogram", "bucket_floor", "bucket_index"]
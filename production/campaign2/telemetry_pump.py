@@ -0,0 +1,141 @@
+"""Concurrent recording front-end for ``CommandTelemetry``.
+
+UI input handlers may fire from several threads. ``TelemetryPump`` exposes
+the same ``record_*`` methods as ``CommandTelemetry`` but only enqueues the
+call on a ``queue.SimpleQueue`` (a C-level, constant-time put that never
+contends on the telemetry state). A single background consumer thread drains
+the queue in batches and performs translation, aggregation and JSONL output,
+so event ids stay monotonic in enqueue order and no frame ever waits on
+translation or disk I/O. On ``stop`` the consumer applies whatever is still
+queued before it exits; the caller's thread only applies events when no
+consumer is running.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple
+
+from production.campaign2.command_layer import CommandTelemetry
+
+_Call = Tuple[str, Tuple[Any, ...]]
+_STOP = ("__stop__", ())
+
+
+class TelemetryPump:
+    def __init__(self, telemetry: CommandTelemetry, max_batch: int = 512) -> None:
+        self.telemetry = telemetry
+        self.max_batch = max_batch
+        self.errors: List[str] = []
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._state_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- input-thread API (enqueue only) ---------------------------------
+
+    def record_ui_state(self, state: str, detail: Optional[str], wheel: Optional[str], player: Optional[str], delta_ms: int) -> None:
+        self._queue.put(("record_ui_state", (state, detail, wheel, player, delta_ms)))
+
+    def record_command(
+        self,
+        source: str,
+        wheel: str,
+        slot: str,
+        glyph_ids: Sequence[str],
+        player: str,
+        latency_ms: int,
+        label: Optional[str],
+        delta_ms: int,
+    ) -> None:
+        self._queue.put(("record_command", (source, wheel, slot, tuple(glyph_ids), player, latency_ms, label, delta_ms)))
+
+    def record_downed(self, player: str, by: str, delta_ms: int) -> None:
+        self._queue.put(("record_downed", (player, by, delta_ms)))
+
+    def record_revive(self, player: str, by: str, emoji: Optional[str], delta_ms: int) -> None:
+        self._queue.put(("record_revive", (player, by, emoji, delta_ms)))
+
+    def record_one_more_prompt(self, accepted: bool, delta_ms: int) -> None:
+        self._queue.put(("record_one_more_prompt", (accepted, delta_ms)))
+
+    def checkpoint(self) -> None:
+        self._queue.put(("checkpoint", ()))
+
+    # -- consumer lifecycle ------------------------------------------------
+
+    def start(self) -> "TelemetryPump":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="campaign2-telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything enqueued before this call has been applied."""
+        done = threading.Event()
+        self._queue.put(("__barrier__", (done,)))
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_inline()
+        return done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stop the consumer once it has applied everything enqueued so far.
+
+        Returns False if the consumer is still busy after ``timeout``; its
+        remaining events are then left to it rather than applied here.
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        # No consumer any more: apply anything enqueued after its final drain.
+        self._drain_inline()
+        return True
+
+    def live_metrics(self, duration_ms: int) -> Mapping[str, Any]:
+        with self._state_lock:
+            return self.telemetry.live_metrics(duration_ms)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._apply(batch):
+                break
+        # Final drain on the consumer itself, so events queued behind the stop
+        # marker are still applied in order and never by two threads at once.
+        self._drain_inline()
+
+    def _drain_inline(self) -> None:
+        batch: List[Any] = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._apply(batch)
+
+    def _apply(self, batch: List[_Call]) -> bool:
+        keep_running = True
+        with self._state_lock:
+            for name, args in batch:
+                if name == "__stop__":
+                    keep_running = False
+                    continue
+                if name == "__barrier__":
+                    args[0].set()
+                    continue
+                method: Callable[..., None] = getattr(self.telemetry, name)
+                try:
+                    method(*args)
+                except Exception as exc:  # noqa: BLE001 - keep the consumer alive
+                    self.errors.append(f"{name}: {exc}")
+        return keep_running
+
+
+__all__ = ["TelemetryPump"]
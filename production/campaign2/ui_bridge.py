@@ -9,9 +9,10 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Mapping, Sequence
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
 
 from production.campaign2.command_layer import CommandTelemetry
+from production.campaign2.telemetry_pump import TelemetryPump
 from tools.emoji_translator import load_lexicon
 
 
@@ -39,7 +40,10 @@ class UILoggingSession:
     run_id: str
     order_id: str = "order-2025-11-26-061"
     workspace: str = "toysoldiers_ai_0"
+    stream_dir: Optional[Path | str] = None  # stream events to <stream_dir>/<order>-campaign2-playtest.jsonl
+    concurrent: bool = False  # enqueue from input threads; a background consumer records
     telemetry: CommandTelemetry = field(init=False)
+    recorder: Union[CommandTelemetry, TelemetryPump] = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
         self.telemetry = CommandTelemetry(
@@ -47,17 +51,19 @@ class UILoggingSession:
             workspace=self.workspace,
             run_id=self.run_id,
             lexicon=load_lexicon(),
+            stream_dir=Path(self.stream_dir) if self.stream_dir is not None else None,
         )
+        self.recorder = TelemetryPump(self.telemetry).start() if self.concurrent else self.telemetry
 
     def wheel_open(self, wheel: str, player: str, detail: str | None, delta_ms: int) -> None:
-        self.telemetry.record_ui_state("wheel_open", detail, wheel, player, delta_ms)
+        self.recorder.record_ui_state("wheel_open", detail, wheel, player, delta_ms)
 
     def ui_state(self, state: str, detail: str | None, wheel: str | None, player: str | None, delta_ms: int) -> None:
-        self.telemetry.record_ui_state(state, detail, wheel, player, delta_ms)
+        self.recorder.record_ui_state(state, detail, wheel, player, delta_ms)
 
     def cast(self, wheel: str, slot: str, player: str, latency_ms: int, delta_ms: int, label: str | None = None) -> None:
         glyph_ids = WHEEL_BINDINGS.get(wheel, {}).get(slot, [])
-        self.telemetry.record_command(
+        self.recorder.record_command(
             source="quick_cast" if wheel == "ability" else "textless_comm",
             wheel=wheel,
             slot=slot,
@@ -69,15 +75,23 @@ class UILoggingSession:
         )
 
     def downed(self, player: str, by: str, delta_ms: int) -> None:
-        self.telemetry.record_downed(player, by, delta_ms)
+        self.recorder.record_downed(player, by, delta_ms)
 
     def revive(self, player: str, by: str, emoji: str | None, delta_ms: int) -> None:
-        self.telemetry.record_revive(player, by, emoji, delta_ms)
+        self.recorder.record_revive(player, by, emoji, delta_ms)
 
     def one_more(self, accepted: bool, delta_ms: int) -> None:
-        self.telemetry.record_one_more_prompt(accepted, delta_ms)
+        self.recorder.record_one_more_prompt(accepted, delta_ms)
+
+    def checkpoint(self) -> None:
+        self.recorder.checkpoint()
+
+    def live_metrics(self, duration_ms: int) -> Mapping[str, Any]:
+        return self.recorder.live_metrics(duration_ms)
 
     def finalize(self, duration_ms: int, log_dir: Path | str = "logs", attachments_dir: Path | str = "exchange/outbox/attachments/campaign2") -> Mapping[str, Any]:
+        if isinstance(self.recorder, TelemetryPump):
+            self.recorder.stop()
         return self.telemetry.write_outputs(
             log_dir=Path(log_dir),
             attachments_dir=Path(attachments_dir),
@@ -1,17 +1,36 @@
-"""Simulate Campaign 2 emoji-first command layer with reusable telemetry."""
+"""Simulate Campaign 2 emoji-first command layer with reusable telemetry.
+
+Default mode replays the fixed ``TUTORIAL_SCRIPT``. With ``--sessions N`` the
+simulator becomes a seedable load generator: it synthesizes N sessions drawing
+quick-casts from ``QUICK_CAST_WHEELS`` (configurable command rate, lognormal
+latency and invalid-glyph ratio), runs them across a process pool and reports
+aggregate throughput plus the tail latency of the recording path. Load
+runs write their per-session outputs under a fresh temporary directory
+unless ``--log-dir``/``--attachments-dir`` are given (``--no-write`` skips
+them), so they never land in the real logs/ or outbox attachments.
+"""
 from __future__ import annotations
 
 import argparse
+import json
+import math
+import os
+import random
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, List, Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from production.campaign2.command_layer import CommandTelemetry
+from production.campaign2.latency_stats import LatencyHistogram
 from tools.emoji_translator import load_lexicon
 
 ORDER_ID_DEFAULT = "order-2025-11-26-061"
@@ -159,34 +178,28 @@ TUTORIAL_SCRIPT: List[Mapping[str, Any]] = [
 ]
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Campaign 2 emoji command layer simulator")
-    parser.add_argument("--order-id", default=ORDER_ID_DEFAULT, help="Order id to stamp into logs")
-    parser.add_argument("--workspace", default=WORKSPACE_DEFAULT, help="Workspace id stamped into logs")
-    parser.add_argument("--run-id", default=f"campaign2-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}", help="Run id for this playtest")
-    parser.add_argument("--log-dir", default="logs", help="Directory to write log outputs")
-    parser.add_argument(
-        "--attachments-dir",
-        default="exchange/outbox/attachments/campaign2",
-        help="Directory to mirror attachment outputs",
-    )
-    return parser.parse_args()
+INVALID_GLYPH = "unknown_token"
 
 
-def main() -> None:
-    args = parse_args()
-    telemetry = CommandTelemetry(
-        order_id=args.order_id,
-        workspace=args.workspace,
-        run_id=args.run_id,
-        lexicon=load_lexicon(),
-    )
+@dataclass(frozen=True)
+class LoadProfile:
+    commands: int = 1000
+    rate_per_sec: float = 4.0
+    latency_median_ms: float = 350.0
+    latency_sigma: float = 0.35
+    invalid_ratio: float = 0.02
+    players: int = 2
+    seed: int = 2025
 
-    for step in TUTORIAL_SCRIPT:
+
+def replay_steps(telemetry: CommandTelemetry, steps: Iterable[Mapping[str, Any]], timer: Optional[LatencyHistogram] = None) -> None:
+    """Feed scripted steps through ``telemetry``; ``timer`` records record_command cost in microseconds."""
+    for step in steps:
         delta_ms = step["delta_ms"]
         if step["type"] == "ui_state":
             telemetry.record_ui_state(step["state"], step.get("detail"), step.get("wheel"), step.get("player"), delta_ms)
         elif step["type"] == "command":
+            started = time.perf_counter_ns()
             telemetry.record_command(
                 source=step["source"],
                 wheel=step["wheel"],
@@ -197,6 +210,8 @@ def main() -> None:
                 label=step.get("label"),
                 delta_ms=delta_ms,
             )
+            if timer is not None:
+                timer.record((time.perf_counter_ns() - started) // 1000)
         elif step["type"] == "downed":
             telemetry.record_downed(step["player"], step["by"], delta_ms)
         elif step["type"] == "revive":
@@ -204,9 +219,190 @@ def main() -> None:
         elif step["type"] == "one_more_prompt":
             telemetry.record_one_more_prompt(step["accepted"], delta_ms)
 
+
+def synthesize_session(profile: LoadProfile, session_index: int) -> Iterator[Mapping[str, Any]]:
+    """Deterministic quick-cast stream for one session (seed + session index)."""
+    rng = random.Random(profile.seed * 1_000_003 + session_index)
+    mu = math.log(max(profile.latency_median_ms, 1.0))
+    delta_ms = 0
+    yield {"delta_ms": 0, "type": "ui_state", "state": "session_start", "detail": f"loadgen session {session_index}"}
+    for _ in range(profile.commands):
+        delta_ms += int(rng.expovariate(profile.rate_per_sec) * 1000) if profile.rate_per_sec > 0 else 0
+        wheel = rng.choice(QUICK_CAST_WHEELS)
+        slot = rng.choice(wheel["slots"])
+        glyph_ids = list(slot["glyph_ids"])
+        if rng.random() < profile.invalid_ratio:
+            glyph_ids[rng.randrange(len(glyph_ids))] = INVALID_GLYPH
+        player = f"P{rng.randrange(profile.players) + 1}"
+        yield {"delta_ms": delta_ms, "type": "ui_state", "state": "wheel_open", "wheel": wheel["wheel"], "player": player}
+        yield {
+            "delta_ms": delta_ms,
+            "type": "command",
+            "player": player,
+            "source": "quick_cast" if wheel["wheel"] == "ability" else "textless_comm",
+            "wheel": wheel["wheel"],
+            "slot": slot["slot"],
+            "glyph_ids": glyph_ids,
+            "latency_ms": int(rng.lognormvariate(mu, profile.latency_sigma)),
+            "label": slot["label"],
+        }
+    yield {"delta_ms": delta_ms, "type": "one_more_prompt", "accepted": True}
+
+
+def run_session(
+    profile: LoadProfile,
+    session_index: int,
+    order_id: str,
+    workspace: str,
+    run_prefix: str,
+    log_dir: Optional[str],
+    attachments_dir: Optional[str],
+) -> Dict[str, Any]:
+    """Run one synthetic session in a worker process and return its stats."""
+    started = time.perf_counter()
+    timer = LatencyHistogram()
+    telemetry = CommandTelemetry(
+        order_id=order_id,
+        workspace=workspace,
+        run_id=f"{run_prefix}-s{session_index:04d}",
+        lexicon=load_lexicon(),
+        per_run_files=True,
+    )
+    replay_steps(telemetry, synthesize_session(profile, session_index), timer)
+    if log_dir is not None and attachments_dir is not None:
+        telemetry.write_outputs(
+            log_dir=Path(log_dir),
+            attachments_dir=Path(attachments_dir),
+            duration_ms=telemetry.store.delta_ms[-1] if len(telemetry.store) else 0,
+        )
+    return {
+        "commands": telemetry.total_commands,
+        "valid": telemetry.total_valid,
+        "seconds": time.perf_counter() - started,
+        "record_us": timer.to_dict(),
+    }
+
+
+def run_load(
+    profile: LoadProfile,
+    sessions: int,
+    workers: int,
+    order_id: str,
+    workspace: str,
+    run_prefix: str,
+    log_dir: Optional[str],
+    attachments_dir: Optional[str],
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    timer = LatencyHistogram()
+    commands = valid = 0
+    session_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_session, profile, idx, order_id, workspace, run_prefix, log_dir, attachments_dir)
+            for idx in range(sessions)
+        ]
+        for future in futures:
+            result = future.result()
+            commands += result["commands"]
+            valid += result["valid"]
+            session_seconds += result["seconds"]
+            timer.merge(LatencyHistogram.from_dict(result["record_us"]))
+    wall = time.perf_counter() - started
+
+    return {
+        "profile": asdict(profile),
+        "sessions": sessions,
+        "workers": workers,
+        "commands": commands,
+        "commands_valid": valid,
+        "wall_seconds": round(wall, 3),
+        "commands_per_sec": round(commands / wall, 1) if wall else 0,
+        "commands_per_sec_per_worker": round(commands / session_seconds, 1) if session_seconds else 0,
+        "record_path_us": {
+            "mean": timer.mean(),
+            **timer.percentiles((0.5, 0.9, 0.99, 0.999)),
+            "max": timer.maximum,
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Campaign 2 emoji command layer simulator")
+    parser.add_argument("--order-id", default=ORDER_ID_DEFAULT, help="Order id to stamp into logs")
+    parser.add_argument("--workspace", default=WORKSPACE_DEFAULT, help="Workspace id stamped into logs")
+    parser.add_argument("--run-id", default=f"campaign2-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}", help="Run id for this playtest")
+    parser.add_argument("--log-dir", default=None, help="Directory to write log outputs (default: logs; load runs: a temp dir)")
+    parser.add_argument(
+        "--attachments-dir",
+        default=None,
+        help="Directory to mirror attachment outputs (default: exchange/outbox/attachments/campaign2; load runs: a temp dir)",
+    )
+    parser.add_argument(
+        "--per-run-files",
+        action="store_true",
+        help="Include the run id in output file names (for tools/campaign2_rollup.py)",
+    )
+
+    load = parser.add_argument_group("load generation (enabled by --sessions)")
+    load.add_argument("--sessions", type=int, default=0, help="Synthesize N sessions instead of replaying the tutorial")
+    load.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size")
+    load.add_argument("--commands", type=int, default=LoadProfile.commands, help="Commands per session")
+    load.add_argument("--rate", type=float, default=LoadProfile.rate_per_sec, help="Mean commands/sec of simulated play time")
+    load.add_argument("--latency-median", type=float, default=LoadProfile.latency_median_ms, help="Median wheel->cast latency (ms)")
+    load.add_argument("--latency-sigma", type=float, default=LoadProfile.latency_sigma, help="Lognormal sigma of the latency")
+    load.add_argument("--invalid-ratio", type=float, default=LoadProfile.invalid_ratio, help="Share of casts with an unknown glyph")
+    load.add_argument("--players", type=int, default=LoadProfile.players, help="Players per session")
+    load.add_argument("--seed", type=int, default=LoadProfile.seed, help="Base RNG seed")
+    load.add_argument("--no-write", action="store_true", help="Skip writing per-session outputs (measure recording only)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.sessions > 0:
+        profile = LoadProfile(
+            commands=args.commands,
+            rate_per_sec=args.rate,
+            latency_median_ms=args.latency_median,
+            latency_sigma=args.latency_sigma,
+            invalid_ratio=args.invalid_ratio,
+            players=args.players,
+            seed=args.seed,
+        )
+        log_dir, attachments_dir = args.log_dir, args.attachments_dir
+        if not args.no_write and (log_dir is None or attachments_dir is None):
+            scratch = Path(tempfile.mkdtemp(prefix="campaign2-load-"))
+            log_dir = log_dir or str(scratch / "logs")
+            attachments_dir = attachments_dir or str(scratch / "attachments")
+        report = run_load(
+            profile,
+            sessions=args.sessions,
+            workers=max(1, args.workers),
+            order_id=args.order_id,
+            workspace=args.workspace,
+            run_prefix=args.run_id,
+            log_dir=None if args.no_write else log_dir,
+            attachments_dir=None if args.no_write else attachments_dir,
+        )
+        if not args.no_write:
+            report["log_dir"], report["attachments_dir"] = log_dir, attachments_dir
+        print(json.dumps(report, indent=2))
+        return
+
+    telemetry = CommandTelemetry(
+        order_id=args.order_id,
+        workspace=args.workspace,
+        run_id=args.run_id,
+        lexicon=load_lexicon(),
+        per_run_files=args.per_run_files,
+    )
+
+    replay_steps(telemetry, TUTORIAL_SCRIPT)
+
     paths = telemetry.write_outputs(
-        log_dir=Path(args.log_dir),
-        attachments_dir=Path(args.attachments_dir),
+        log_dir=Path(args.log_dir or "logs"),
+        attachments_dir=Path(args.attachments_dir or "exchange/outbox/attachments/campaign2"),
         duration_ms=TUTORIAL_SCRIPT[-1]["delta_ms"],
     )
     print(f"Wrote events to {paths['events']}")
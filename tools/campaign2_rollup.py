@@ -0,0 +1,179 @@
+"""Roll up Campaign 2 playtest telemetry across many runs.
+
+Streams ``*-campaign2-playtest.jsonl`` files line by line (never loading a
+whole session), merges per-run latency sketches and accuracy counters, and
+writes one rollup with percentiles per run, player, wheel, wheel/slot and
+order.
+
+Usage:
+  python tools/campaign2_rollup.py logs/ nightly/ --out logs/campaign2-rollup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from production.campaign2.latency_stats import LatencyHistogram
+
+ROLLUP_SCHEMA = "toysoldiers-campaign2-rollup@1.0"
+PLAYTEST_GLOB = "*-campaign2-playtest.jsonl"
+DIMENSIONS = ("run", "player", "wheel", "slot", "order")
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+@dataclass
+class Bucket:
+    commands: int = 0
+    valid: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def add(self, latency_ms: int, valid: bool) -> None:
+        self.commands += 1
+        if valid:
+            self.valid += 1
+            # Match CommandTelemetry: latency metrics cover accepted commands only.
+            self.latency.record(latency_ms)
+
+    def merge(self, other: "Bucket") -> None:
+        self.commands += other.commands
+        self.valid += other.valid
+        self.latency.merge(other.latency)
+
+    def to_dict(self, include_sketch: bool = False) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "commands": self.commands,
+            "commands_valid": self.valid,
+            "command_accuracy": round(self.valid / self.commands, 3) if self.commands else 0,
+            "avg_command_latency_ms": self.latency.mean(),
+            "max_command_latency_ms": self.latency.maximum,
+        }
+        for name, value in self.latency.percentiles(PERCENTILES).items():
+            data[f"{name}_command_latency_ms"] = value
+        if include_sketch:
+            data["latency_sketch"] = self.latency.to_dict()
+        return data
+
+
+@dataclass
+class Rollup:
+    files: int = 0
+    lines: int = 0
+    bad_lines: int = 0
+    total: Bucket = field(default_factory=Bucket)
+    dims: Dict[str, Dict[str, Bucket]] = field(default_factory=lambda: {name: {} for name in DIMENSIONS})
+
+    def ingest_run(self, run: Mapping[str, Bucket]) -> None:
+        """Merge one file's per-dimension buckets (keyed ``"<dim>\\x00<value>"``)."""
+        for key, bucket in run.items():
+            dim, value = key.split("\x00", 1)
+            if dim == "total":
+                self.total.merge(bucket)
+                continue
+            self.dims[dim].setdefault(value, Bucket()).merge(bucket)
+
+    def ingest_file(self, path: Path) -> None:
+        run: Dict[str, Bucket] = {}
+        for event in self._iter_commands(path):
+            valid = bool(event.get("valid"))
+            latency = int(event.get("latency_ms") or 0)
+            wheel = str(event.get("wheel"))
+            keys = (
+                "total\x00",
+                f"run\x00{event.get('run_id')}",
+                f"player\x00{event.get('player')}",
+                f"wheel\x00{wheel}",
+                f"slot\x00{wheel}/{event.get('slot')}",
+                f"order\x00{event.get('order_id')}",
+            )
+            for key in keys:
+                bucket = run.get(key)
+                if bucket is None:
+                    bucket = run[key] = Bucket()
+                bucket.add(latency, valid)
+        self.files += 1
+        self.ingest_run(run)
+
+    def _iter_commands(self, path: Path) -> Iterator[Mapping[str, Any]]:
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                self.lines += 1
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    self.bad_lines += 1
+                    continue
+                if isinstance(event, dict) and event.get("type") == "command":
+                    yield event
+
+    def to_dict(self, include_sketches: bool = False) -> Dict[str, Any]:
+        return {
+            "schema": ROLLUP_SCHEMA,
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "files": self.files,
+            "lines": self.lines,
+            "bad_lines": self.bad_lines,
+            "runs": len(self.dims["run"]),
+            "totals": self.total.to_dict(include_sketches),
+            **{
+                f"by_{dim}": {value: bucket.to_dict(include_sketches) for value, bucket in sorted(buckets.items())}
+                for dim, buckets in self.dims.items()
+            },
+        }
+
+
+def iter_playtest_files(targets: Iterable[str]) -> Iterator[Path]:
+    seen = set()
+    for raw in targets:
+        path = Path(raw)
+        candidates: Iterable[Path] = sorted(path.rglob(PLAYTEST_GLOB)) if path.is_dir() else [path]
+        for candidate in candidates:
+            resolved = candidate.resolve()
+            if resolved in seen or not candidate.is_file():
+                continue
+            seen.add(resolved)
+            yield candidate
+
+
+def build_rollup(targets: Iterable[str]) -> Rollup:
+    rollup = Rollup()
+    for path in iter_playtest_files(targets):
+        rollup.ingest_file(path)
+    return rollup
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate Campaign 2 playtest JSONL across runs")
+    parser.add_argument("paths", nargs="+", help="Playtest JSONL files or directories to scan recursively")
+    parser.add_argument("--out", default="logs/campaign2-rollup.json", help="Where to write the rollup JSON")
+    parser.add_argument("--include-sketches", action="store_true", help="Embed mergeable latency sketches per bucket")
+    args = parser.parse_args(argv)
+
+    rollup = build_rollup(args.paths)
+    if rollup.files == 0:
+        print("[WARN] No playtest JSONL files found", file=sys.stderr)
+        return 1
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(rollup.to_dict(args.include_sketches), indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    totals = rollup.total.to_dict()
+    print(
+        f"[OK] Rolled up {rollup.files} file(s), {len(rollup.dims['run'])} run(s), "
+        f"{totals['commands']} command(s); p95={totals['p95_command_latency_ms']}ms -> {out}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,23 +3,41 @@ Minimal contract test runner for Toysoldiers exchange.
 
 Contracts included:
 - json_validity: parse all JSON files under exchange/
-- ledger_integrity: verify exchange/ledger/index.json paths exist
+- ledger_integrity: verify ledger paths exist (journal + shards via tools/ledger_store.py)
+- schema_checks: validate pending acks + inbox reports
+
+All contracts read from the shared exchange index (tools/exchange_index.py),
+so each JSON file is parsed at most once per run and unchanged files are not
+re-parsed at all when the persisted index is warm. The index is warmed once
+up front, with a process pool for large parse batches (``--jobs``); the
+contracts then run concurrently on threads against it, and their output is
+printed per contract, in order, with its wall time.
+
+schema_checks results are cached in logs/contract_cache.json keyed by each
+file's (size, mtime_ns, sha256) from the index, and invalidated when
+tools/schema_validator.py changes; unchanged files are not re-validated.
 
 CLI:
 - --list           List available contracts
 - --select NAMES   Comma-separated or repeated names to run specific contracts
 - -q/--quiet       Suppress per-file details; show summary only
 - --failfast       Stop on first failing contract
+- --jobs N         Parse processes and contract threads (default: CPU count; 1 = sequential)
+- --no-cache       Re-validate every file (the cache is still rewritten)
 """
 
 from __future__ import annotations
 
 import argparse
+import io
 import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Dict, Iterable, List, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 
 # Make stdout robust on Windows consoles
@@ -33,6 +51,95 @@ except Exception:
 RepoPath = Path(__file__).resolve().parents[1]
 ExchangePath = RepoPath / "exchange"
 
+if str(RepoPath) not in sys.path:
+    sys.path.insert(0, str(RepoPath))
+
+from tools import schema_validator  # noqa: E402
+from tools.exchange_index import Record, get_index, save_shared  # noqa: E402
+from tools.exchange_io import atomic_write_json  # noqa: E402
+from tools.ledger_store import load_ledger  # noqa: E402
+
+CachePath = RepoPath / "logs" / "contract_cache.json"
+CACHE_SCHEMA = "contract-cache@1.0"
+
+
+class ResultCache:
+    """Per-contract results keyed by file fingerprint, valid for one validator version."""
+
+    def __init__(self, path: Optional[Path], salt: str, enabled: bool = True) -> None:
+        self.path = path
+        self.salt = salt
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._data: Dict[str, Dict[str, List[Any]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None:
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                raw = None
+            if isinstance(raw, dict) and raw.get("schema") == CACHE_SCHEMA and raw.get("salt") == salt:
+                self._data = {k: v for k, v in (raw.get("contracts") or {}).items() if isinstance(v, dict)}
+
+    @staticmethod
+    def key(record: Record) -> List[Any]:
+        return [record.fingerprint[1], record.fingerprint[2], record.sha256]
+
+    def get(self, contract: str, rel: str, record: Record) -> Optional[Tuple[bool, str]]:
+        entry = self._data.get(contract, {}).get(rel) if self.enabled else None
+        key = self.key(record)
+        if entry and record.sha256 and entry[0] == key[2] and entry[1] == key[0]:
+            with self._lock:
+                self.hits += 1
+                if entry[2] != key[1]:
+                    entry[2] = key[1]  # same content under a new mtime (checkout, copy)
+                    self._dirty = True
+            return bool(entry[3]), str(entry[4])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, contract: str, rel: str, record: Record, ok: bool, message: str) -> None:
+        size, mtime_ns, sha = self.key(record)
+        with self._lock:
+            self._data.setdefault(contract, {})[rel] = [sha, size, mtime_ns, ok, message]
+            self._dirty = True
+
+    def prune(self, contract: str, live: Iterable[str]) -> None:
+        keep = set(live)
+        with self._lock:
+            bucket = self._data.get(contract, {})
+            for rel in [r for r in bucket if r not in keep]:
+                del bucket[rel]
+                self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        payload = {"schema": CACHE_SCHEMA, "salt": self.salt, "contracts": self._data}
+        atomic_write_json(self.path, payload, indent=None)
+        self._dirty = False
+
+
+def _validator_salt() -> str:
+    try:
+        st = Path(schema_validator.__file__).stat()
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    except (OSError, TypeError):
+        return "unknown"
+
+
+_CACHE: Optional[ResultCache] = None
+
+
+def get_cache() -> ResultCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResultCache(CachePath, _validator_salt())
+    return _CACHE
+
 
 def contract_json_validity(exchange_dir: Path, quiet: bool = False) -> Tuple[bool, str]:
     """Validate that all JSON files under exchange/ parse successfully."""
@@ -40,16 +147,14 @@ def contract_json_validity(exchange_dir: Path, quiet: bool = False) -> Tuple[boo
         return False, f"Missing exchange directory: {exchange_dir}"
 
     errors: List[str] = []
-    for p in exchange_dir.rglob("*.json"):
-        try:
-            with p.open("r", encoding="utf-8") as f:
-                json.load(f)
-        except Exception as e:
-            rel = p.relative_to(RepoPath)
-            msg = f"ERR {rel}: {e}"
-            errors.append(msg)
-            if not quiet:
-                print(msg)
+    for record in get_index(exchange_dir.parent).files_in(exchange_dir, recursive=True):
+        if record.ok:
+            continue
+        rel = record.path.relative_to(exchange_dir.parent)
+        msg = f"ERR {rel}: {record.error}"
+        errors.append(msg)
+        if not quiet:
+            print(msg)
 
     if errors:
         return False, f"json_validity: {len(errors)} file(s) invalid"
@@ -58,17 +163,16 @@ def contract_json_validity(exchange_dir: Path, quiet: bool = False) -> Tuple[boo
 
 def contract_ledger_integrity(exchange_dir: Path, quiet: bool = False) -> Tuple[bool, str]:
     """Verify ledger paths exist for each order entry."""
-    ledger = exchange_dir / "ledger" / "index.json"
-    if not ledger.exists():
-        return False, f"Missing ledger: {ledger}"
-
+    ledger_root = exchange_dir / "ledger"
     try:
-        with ledger.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        # Journal + shards through the ledger module (falls back to a legacy index.json, read-only).
+        ledger = load_ledger(exchange_dir.parent, bootstrap=False)
+        if not ledger.exists():
+            return False, f"Missing ledger: {ledger_root}"
+        orders = ledger.orders
     except Exception as e:
         return False, f"Failed to parse ledger: {e}"
 
-    orders = (data or {}).get("orders", {})
     missing_count = 0
     for name, entry in orders.items():
         miss: List[str] = []
@@ -96,19 +200,10 @@ def contract_schema_checks(exchange_dir: Path, quiet: bool = False) -> Tuple[boo
     """Run schema validation for pending acks and inbox reports.
 
     Only validates folders that use supported schemas to avoid false negatives
-    from historical payload formats.
+    from historical payload formats. Results come from the result cache for
+    files whose size and content hash are unchanged.
     """
-    # Import schema_validator via file path to avoid package layout issues
-    import importlib.util
-    validator_path = (RepoPath / "tools" / "schema_validator.py").resolve()
-    try:
-        spec = importlib.util.spec_from_file_location("schema_validator", str(validator_path))
-        if spec is None or spec.loader is None:
-            return False, "schema_checks: cannot load schema_validator spec"
-        schema_validator = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(schema_validator)  # type: ignore[attr-defined]
-    except Exception as e:
-        return False, f"schema_checks: cannot import validator -> {e}"
+    cache = get_cache()
 
     # Collect candidate files and validate only supported schemas
     supported = {
@@ -117,45 +212,69 @@ def contract_schema_checks(exchange_dir: Path, quiet: bool = False) -> Tuple[boo
         getattr(schema_validator, "SCHEMA_FACTORY_REPORT", "factory-report@1.0"),
     }
 
-    candidates: List[Path] = []
+    index = get_index(exchange_dir.parent)
+    candidates = []
     for sub in [
         exchange_dir / "acknowledgements" / "pending",
         exchange_dir / "reports" / "inbox",
     ]:
-        if sub.exists():
-            candidates.extend(sorted(p for p in sub.glob("*.json") if p.is_file()))
+        candidates.extend(index.files_in(sub))
 
     if not candidates:
         return True, "schema_checks: skipped (no targets)"
 
     failures = 0
-    for path in candidates:
-        try:
-            payload = schema_validator._read_payload(path)  # type: ignore[attr-defined]
-        except Exception as e:
+    live: List[str] = []
+    for record in candidates:
+        path = record.path
+        rel = record.path.relative_to(exchange_dir.parent).as_posix()
+        live.append(rel)
+        cached = cache.get("schema_checks", rel, record)
+        if cached is not None:
+            ok, detail = cached
+            if not ok:
+                failures += 1
+                if not quiet:
+                    print(f"INVALID: {path} -> {detail}")
+            elif detail and not quiet:
+                print(f"VALID: {path}")
+            continue
+        if not record.ok:
             # Skip files that are not valid JSON at all; json_validity handles this.
             # Treat as a failure for schema contract clarity.
             failures += 1
             if not quiet:
-                print(f"INVALID(JSON): {path} -> {e}")
+                print(f"INVALID(JSON): {path} -> Invalid JSON: {record.error}")
             continue
 
-        schema = payload.get("schema")
+        schema = record.get("schema")
         if schema not in supported:
-            # Not a schema we validate here; skip silently
+            # Not a schema we validate here; skip silently (without parsing the payload)
+            cache.put("schema_checks", rel, record, True, "")
+            continue
+
+        try:
+            payload = record.payload()
+        except Exception as e:
+            failures += 1
+            if not quiet:
+                print(f"INVALID(JSON): {path} -> {e}")
             continue
 
         # Scope: default contract skips archived reports (legacy variability)
 
         try:
             schema_validator._validate_payload(payload)  # type: ignore[attr-defined]
+            cache.put("schema_checks", rel, record, True, "valid")
             if not quiet:
                 print(f"VALID: {path}")
         except Exception as e:
             failures += 1
+            cache.put("schema_checks", rel, record, False, str(e))
             if not quiet:
                 print(f"INVALID: {path} -> {e}")
 
+    cache.prune("schema_checks", live)
     if failures:
         return False, f"schema_checks: {failures} failure(s)"
     return True, "schema_checks: OK"
@@ -177,9 +296,48 @@ def parse_args(argv: Iterable[str]) -> argparse.Namespace:
     )
     ap.add_argument("-q", "--quiet", action="store_true", help="Reduce output noise")
     ap.add_argument("--failfast", action="store_true", help="Stop on first failure")
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Parse processes and contract threads (default: CPU count; 1 runs sequentially)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Ignore cached schema_checks results")
     return ap.parse_args(list(argv))
 
 
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout stand-in that buffers writes from contract threads."""
+
+    def __init__(self, target) -> None:
+        self.target = target
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.target).write(text)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+
+def _run_contract(name: str, quiet: bool, output: Optional[_ThreadOutput]) -> Tuple[bool, str, float, str]:
+    """Run one contract; returns (ok, message, wall seconds, captured output)."""
+    fn, _ = CONTRACTS[name]
+    buffer = io.StringIO()
+    if output is not None:
+        output.local.buffer = buffer
+    start = time.perf_counter()
+    try:
+        ok, msg = fn(ExchangePath, quiet=quiet)
+    except Exception as e:  # a crashing contract fails; it does not abort the others
+        ok, msg = False, f"{name}: crashed -> {type(e).__name__}: {e}"
+    finally:
+        if output is not None:
+            output.local.buffer = None
+    return ok, msg, time.perf_counter() - start, buffer.getvalue()
+
+
 def iter_selected(names: List[str] | None) -> List[str]:
     if not names:
         return list(CONTRACTS.keys())
@@ -208,24 +366,56 @@ def main(argv: Iterable[str] = None) -> int:
         print("Use --list to see available contracts.", file=sys.stderr)
         return 2
 
+    jobs = max(1, ns.jobs)
+    started = time.perf_counter()
+    # Warm the shared index once (parse-heavy on a cold tree: process pool), before any contract reads it.
+    index = get_index(RepoPath, workers=jobs)
+    cache = get_cache()
+    cache.enabled = not ns.no_cache
+    if not ns.quiet:
+        print(f"{index.report()} [{time.perf_counter() - started:.2f}s]")
+
     failures = 0
-    for name in selected:
-        fn, _ = CONTRACTS[name]
-        ok, msg = fn(ExchangePath, quiet=ns.quiet)
-        if not ns.quiet:
-            print(msg)
-        if not ok:
-            failures += 1
-            if ns.failfast:
-                break
+    timings: Dict[str, float] = {}
+    if jobs == 1 or len(selected) == 1:
+        outcomes = (_run_contract(name, ns.quiet, None) for name in selected)
+        pool = None
+    else:
+        output = _ThreadOutput(sys.stdout)
+        sys.stdout = output
+        pool = ThreadPoolExecutor(max_workers=min(jobs, len(selected)), thread_name_prefix="contract")
+        futures = [pool.submit(_run_contract, name, ns.quiet, output) for name in selected]
+        outcomes = (f.result() for f in futures)
+    try:
+        for name, (ok, msg, elapsed, captured) in zip(selected, outcomes):
+            sys.stdout.write(captured)
+            timings[name] = elapsed
+            if not ns.quiet:
+                print(f"{msg} [{elapsed:.2f}s]")
+            if not ok:
+                failures += 1
+                if ns.failfast:
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            sys.stdout = sys.stdout.target  # type: ignore[attr-defined]
+    save_shared()
+    cache.save()
+    ran = len(timings)
+    if not ns.quiet:
+        print(
+            f"Timing: {time.perf_counter() - started:.2f}s wall; schema cache {cache.hits} hit(s), "
+            f"{cache.misses} miss(es)"
+        )
 
     if failures:
         if not ns.quiet:
-            print(f"Summary: {len(selected)-failures} passed, {failures} failed")
+            print(f"Summary: {ran-failures} passed, {failures} failed")
         return 1
 
     if not ns.quiet:
-        print(f"Summary: {len(selected)} passed, 0 failed")
+        print(f"Summary: {ran} passed, 0 failed")
     return 0
 
 
@@ -1,11 +1,18 @@
 """Production emoji translator utilities for factory-order@1.0."""
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
-from dataclasses import dataclass
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 ROOT = Path(__file__).parents[1]
 LEXICON_PATH = ROOT / "planning" / "emoji_language" / "glyph_lexicon_level0.json"
@@ -17,6 +24,9 @@ ALLOWED_STATUS = {"success", "warning", "error"}
 DURATION_MIN = 0
 DURATION_MAX = 300_000  # 5 minutes in ms
 
+# Set SHAGI_TRANSLATOR_AUDIT=1 to force full validation of translator-built payloads.
+TRANSLATOR_AUDIT = os.getenv("SHAGI_TRANSLATOR_AUDIT", "").strip().lower() in {"1", "true", "yes"}
+
 
 @dataclass(frozen=True)
 class Glyph:
@@ -29,8 +39,8 @@ class Glyph:
 
 @dataclass(frozen=True)
 class GlyphIndex:
-    by_token: Dict[str, Glyph]
-    by_id: Dict[str, Glyph]
+    by_token: Mapping[str, Glyph]
+    by_id: Mapping[str, Glyph]
 
     def get(self, token: str) -> Optional[Glyph]:
         return self.by_token.get(token)
@@ -39,9 +49,9 @@ class GlyphIndex:
         return self.by_id.get(glyph_id)
 
 
-def load_lexicon(path: Path | None = None) -> GlyphIndex:
-    lexicon_path = path or LEXICON_PATH
-    data = json.loads(lexicon_path.read_text(encoding="utf-8"))
+def parse_lexicon(raw: str | bytes) -> GlyphIndex:
+    """Build a read-only ``GlyphIndex`` from lexicon JSON text."""
+    data = json.loads(raw)
     by_token: Dict[str, Glyph] = {}
     by_id: Dict[str, Glyph] = {}
 
@@ -58,7 +68,81 @@ def load_lexicon(path: Path | None = None) -> GlyphIndex:
             by_token[glyph.identifier] = glyph
             by_id[glyph.identifier] = glyph
 
-    return GlyphIndex(by_token=by_token, by_id=by_id)
+    return GlyphIndex(by_token=MappingProxyType(by_token), by_id=MappingProxyType(by_id))
+
+
+@dataclass
+class _CachedLexicon:
+    stat_key: Tuple[int, int]
+    digest: str
+    index: GlyphIndex
+
+
+class LexiconRegistry:
+    """Process-wide cache handing out one shared ``GlyphIndex`` per lexicon path.
+
+    Every lookup costs a single ``stat``. When size/mtime change the file is
+    re-read and hashed; the index is only rebuilt if the sha256 differs, so a
+    touched-but-identical lexicon keeps its existing index.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Path, _CachedLexicon] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, path: Path) -> GlyphIndex:
+        key = Path(path).resolve()
+        stat = key.stat()
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.stat_key == stat_key:
+                self.hits += 1
+                return cached.index
+
+            raw = key.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if cached is not None and cached.digest == digest:
+                cached.stat_key = stat_key
+                self.hits += 1
+                return cached.index
+
+            index = parse_lexicon(raw)
+            if cached is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._entries[key] = _CachedLexicon(stat_key=stat_key, digest=digest, index=index)
+            return index
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.reloads = 0
+
+
+LEXICON_REGISTRY = LexiconRegistry()
+
+
+def load_lexicon(path: Path | None = None) -> GlyphIndex:
+    """Return the shared, read-only index for ``path`` (default level-0 lexicon)."""
+    return LEXICON_REGISTRY.get(path or LEXICON_PATH)
+
+
+def lexicon_cache_stats() -> Dict[str, int]:
+    return LEXICON_REGISTRY.stats()
 
 
 def resolve_chain(tokens: Sequence[str], index: GlyphIndex) -> List[Glyph]:
@@ -142,7 +226,85 @@ def summary_from_intent(intent: Mapping[str, Optional[str]], index: GlyphIndex |
     return build_summary(actor, action, target, outcome)
 
 
-def build_order_payload(chain: Sequence[Glyph], intent: Mapping[str, Any]) -> Dict[str, Any]:
+class TrustedOrder(dict):
+    """factory-order payload built by this module from glyphs of one lexicon.
+
+    The bound lexicon is the proof of construction: ``validate_factory_order``
+    accepts the payload without re-checking it when validated against that same
+    lexicon. Any top-level mutation revokes the proof; nested objects stay plain
+    dicts/lists, so they are compared against a snapshot taken at construction
+    and any change to them revokes it too. Copies and pickles degrade to plain dicts.
+    """
+
+    __slots__ = ("_lexicon", "_snapshot")
+
+    def __init__(self, payload: Mapping[str, Any], lexicon: "GlyphIndex") -> None:
+        super().__init__(payload)
+        self._snapshot: Dict[str, Any] = copy.deepcopy(dict(self))
+        self._lexicon: Optional[GlyphIndex] = lexicon
+
+    def trusted_for(self, lexicon: "GlyphIndex") -> bool:
+        if self._lexicon is None or self._lexicon is not lexicon:
+            return False
+        if dict(self) != self._snapshot:
+            self._revoke()
+            return False
+        return True
+
+    def _revoke(self) -> None:
+        self._lexicon = None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._revoke()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._revoke()
+        super().__delitem__(key)
+
+    def __ior__(self, other: Any) -> "TrustedOrder":
+        self._revoke()
+        return super().__ior__(other)
+
+    def clear(self) -> None:
+        self._revoke()
+        super().clear()
+
+    def pop(self, *args: Any) -> Any:
+        self._revoke()
+        return super().pop(*args)
+
+    def popitem(self) -> Any:
+        self._revoke()
+        return super().popitem()
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        self._revoke()
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._revoke()
+        super().update(*args, **kwargs)
+
+    def __reduce__(self) -> Any:
+        return (dict, (dict(self),))
+
+
+def build_batch_id(actor: Glyph, action: Glyph, now: datetime) -> str:
+    return f"{actor.identifier}-{action.identifier}-{now.strftime('%H%M%S')}"
+
+
+def build_order_payload(
+    chain: Sequence[Glyph],
+    intent: Mapping[str, Any],
+    now: datetime | None = None,
+    index: GlyphIndex | None = None,
+) -> Dict[str, Any]:
+    """Build a factory-order payload from a resolved chain.
+
+    Pass the ``index`` the chain was resolved against to get a
+    ``TrustedOrder`` that skips re-validation against that lexicon.
+    """
     actor: Glyph = intent["actor"]
     action: Glyph = intent["action"]
     target: Glyph | None = intent["target"]
@@ -152,9 +314,9 @@ def build_order_payload(chain: Sequence[Glyph], intent: Mapping[str, Any]) -> Di
     ritual = VERB_CANONICAL_RITUAL.get(action.identifier, "forge")
     status = OUTCOME_STATUS.get(outcome.identifier if outcome else "victory", "success")
 
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     telemetry = {
-        "batch_id": f"{actor.identifier}-{action.identifier}-{now.strftime('%H%M%S')}",
+        "batch_id": build_batch_id(actor, action, now),
         "ritual": ritual,
         "units_processed": max(1, len(chain)),
         "status": status,
@@ -175,6 +337,8 @@ def build_order_payload(chain: Sequence[Glyph], intent: Mapping[str, Any]) -> Di
         "telemetry_stub": telemetry,
     }
 
+    if index is not None and DURATION_MIN <= telemetry["duration_ms"] <= DURATION_MAX:
+        return TrustedOrder(payload, index)
     return payload
 
 
@@ -229,10 +393,19 @@ def validate_telemetry_dq(records: Iterable[Mapping[str, Any]]) -> List[str]:
     return errors
 
 
-def validate_factory_order(order: Mapping[str, Any], index: GlyphIndex | None = None) -> Dict[str, Any]:
+def validate_factory_order(
+    order: Mapping[str, Any],
+    index: GlyphIndex | None = None,
+    audit: bool | None = None,
+) -> Dict[str, Any]:
+    """Validate a factory-order payload; ``audit`` forces full checks on trusted payloads."""
+    lexicon = index or load_lexicon()
+    full = TRANSLATOR_AUDIT if audit is None else audit
+    if not full and isinstance(order, TrustedOrder) and order.trusted_for(lexicon):
+        return {"schema_errors": [], "dq_errors": [], "accepted": True}
+
     schema_errors: List[str] = []
     dq_errors: List[str] = []
-    lexicon = index or load_lexicon()
 
     if order.get("schema") != FACTORY_ORDER_SCHEMA:
         schema_errors.append(f"Order schema must be '{FACTORY_ORDER_SCHEMA}'")
@@ -334,6 +507,10 @@ def log_round_trip(log_path: Path, entry: Mapping[str, Any]) -> None:
         handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
 
 
+def _round_trip_timestamp(now: datetime) -> str:
+    return now.isoformat().replace("+00:00", "Z")
+
+
 def translate_tokens(
     tokens: Sequence[str],
     index: GlyphIndex | None = None,
@@ -342,11 +519,11 @@ def translate_tokens(
     lexicon = index or load_lexicon()
     chain = resolve_chain(tokens, lexicon)
     intent = derive_intent(chain)
-    payload = build_order_payload(chain, intent)
+    payload = build_order_payload(chain, intent, index=lexicon)
     validation = validate_factory_order(payload, lexicon)
 
     round_trip = {
-        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "timestamp": _round_trip_timestamp(datetime.now(timezone.utc)),
         "glyphs": [glyph.emoji for glyph in chain],
         "intent": {
             "actor": intent["actor"].identifier,
@@ -365,6 +542,244 @@ def translate_tokens(
     return round_trip
 
 
+@dataclass(frozen=True)
+class CompiledChain:
+    """Per-chain translation state that does not depend on the call time.
+
+    ``error`` is set instead of the other fields when the chain fails to
+    resolve or derive an intent, so repeated guardrail rejections are cached
+    as well.
+    """
+
+    glyphs: Tuple[str, ...] = ()
+    intent: Optional[Mapping[str, Any]] = None
+    summary: str = ""
+    telemetry: Optional[Mapping[str, Any]] = None
+    actor: Optional[Glyph] = None
+    action: Optional[Glyph] = None
+    validation: Optional[Mapping[str, Any]] = None
+    error: Optional[str] = None
+
+
+class CompiledTranslator:
+    """Memoizing front-end for ``translate_tokens`` bound to one lexicon.
+
+    Chains are keyed on their token tuple in a bounded LRU. A cache hit only
+    rebuilds the time-dependent fields (round-trip timestamp and
+    ``telemetry_stub.batch_id``); the validation verdict is computed once at
+    compile time since ``batch_id`` is always a non-empty string.
+    """
+
+    def __init__(self, index: GlyphIndex | None = None, maxsize: int = 256) -> None:
+        self.index = index or load_lexicon()
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[Tuple[str, ...], CompiledChain]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compile(self, tokens: Sequence[str]) -> CompiledChain:
+        key = tuple(tokens)
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = self._compile(key)
+        with self._lock:
+            self._cache[key] = compiled
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def _compile(self, tokens: Tuple[str, ...]) -> CompiledChain:
+        try:
+            chain = resolve_chain(tokens, self.index)
+            intent = derive_intent(chain)
+        except ValueError as exc:
+            return CompiledChain(error=str(exc))
+
+        payload = build_order_payload(chain, intent, index=self.index)
+        return CompiledChain(
+            glyphs=tuple(payload["glyph_chain"]),
+            intent=payload["intent"],
+            summary=payload["summary"],
+            telemetry=payload["telemetry_stub"],
+            actor=intent["actor"],
+            action=intent["action"],
+            validation=validate_factory_order(payload, self.index),
+        )
+
+    def translate(self, tokens: Sequence[str], log_path: Path | None = None) -> Dict[str, Any]:
+        """Drop-in equivalent of ``translate_tokens`` for a fixed lexicon."""
+        compiled = self.compile(tokens)
+        if compiled.error is not None:
+            raise ValueError(compiled.error)
+
+        now = datetime.now(timezone.utc)
+        intent = compiled.intent or {}
+        telemetry = dict(compiled.telemetry or {})
+        telemetry["batch_id"] = build_batch_id(compiled.actor, compiled.action, now)  # type: ignore[arg-type]
+        validation = compiled.validation or {}
+        payload: Dict[str, Any] = {
+            "schema": FACTORY_ORDER_SCHEMA,
+            "summary": compiled.summary,
+            "glyph_chain": list(compiled.glyphs),
+            "intent": {**intent, "qualifiers": list(intent.get("qualifiers", []))},
+            "telemetry_stub": telemetry,
+        }
+        if validation.get("accepted"):
+            payload = TrustedOrder(payload, self.index)
+
+        round_trip = {
+            "timestamp": _round_trip_timestamp(now),
+            "glyphs": list(compiled.glyphs),
+            "intent": {**intent, "qualifiers": list(intent.get("qualifiers", []))},
+            "payload": payload,
+            "validation": {
+                "schema_errors": list(validation.get("schema_errors", [])),
+                "dq_errors": list(validation.get("dq_errors", [])),
+                "accepted": validation.get("accepted", False),
+            },
+        }
+
+        if log_path:
+            log_round_trip(log_path, round_trip)
+
+        return round_trip
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+            }
+
+
+@dataclass
+class BatchTranslation:
+    """Columnar result of ``translate_batch``.
+
+    Per-chain columns are indexed by unique chain; ``rows`` maps each input
+    row onto its unique chain so duplicates cost one array slot.
+    """
+
+    timestamp: str
+    rows: array = field(default_factory=lambda: array("I"))
+    chains: List[Tuple[str, ...]] = field(default_factory=list)
+    glyphs: List[Optional[Tuple[str, ...]]] = field(default_factory=list)
+    actor: List[Optional[str]] = field(default_factory=list)
+    action: List[Optional[str]] = field(default_factory=list)
+    target: List[Optional[str]] = field(default_factory=list)
+    qualifiers: List[Tuple[str, ...]] = field(default_factory=list)
+    outcome: List[Optional[str]] = field(default_factory=list)
+    summary: List[Optional[str]] = field(default_factory=list)
+    ritual: List[Optional[str]] = field(default_factory=list)
+    status: List[Optional[str]] = field(default_factory=list)
+    accepted: List[bool] = field(default_factory=list)
+    chain_errors: List[Optional[str]] = field(default_factory=list)
+    errors: Optional[List[Optional[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def accepted_rows(self) -> int:
+        return sum(1 for unique in self.rows if self.accepted[unique])
+
+    def row(self, idx: int) -> Dict[str, Any]:
+        """Inflate one input row into the ``translate_tokens`` intent shape."""
+        unique = self.rows[idx]
+        return {
+            "tokens": list(self.chains[unique]),
+            "glyphs": list(self.glyphs[unique] or ()),
+            "intent": {
+                "actor": self.actor[unique],
+                "action": self.action[unique],
+                "target": self.target[unique],
+                "qualifiers": list(self.qualifiers[unique]),
+                "outcome": self.outcome[unique],
+            },
+            "summary": self.summary[unique],
+            "ritual": self.ritual[unique],
+            "status": self.status[unique],
+            "accepted": self.accepted[unique],
+            "error": self.chain_errors[unique],
+        }
+
+
+def translate_batch(
+    chains: Iterable[Sequence[str]],
+    index: GlyphIndex | None = None,
+    with_errors: bool = False,
+) -> BatchTranslation:
+    """Translate many glyph chains against a single lexicon snapshot.
+
+    Identical chains are resolved, derived and validated once. Rows that fail
+    to resolve are kept (``accepted`` False) rather than raising; pass
+    ``with_errors`` to also get a per-row error column.
+    """
+    lexicon = index or load_lexicon()
+    now = datetime.now(timezone.utc)
+    result = BatchTranslation(timestamp=_round_trip_timestamp(now))
+    positions: Dict[Tuple[str, ...], int] = {}
+
+    for tokens in chains:
+        key = tuple(tokens)
+        unique = positions.get(key)
+        if unique is None:
+            unique = positions[key] = len(result.chains)
+            result.chains.append(key)
+        result.rows.append(unique)
+
+    for key in result.chains:
+        try:
+            chain = resolve_chain(key, lexicon)
+            intent = derive_intent(chain)
+        except ValueError as exc:
+            result.glyphs.append(None)
+            result.actor.append(None)
+            result.action.append(None)
+            result.target.append(None)
+            result.qualifiers.append(())
+            result.outcome.append(None)
+            result.summary.append(None)
+            result.ritual.append(None)
+            result.status.append(None)
+            result.accepted.append(False)
+            result.chain_errors.append(str(exc))
+            continue
+
+        payload = build_order_payload(chain, intent, now, lexicon)
+        validation = validate_factory_order(payload, lexicon)
+        ids = payload["intent"]
+        result.glyphs.append(tuple(payload["glyph_chain"]))
+        result.actor.append(ids["actor"])
+        result.action.append(ids["action"])
+        result.target.append(ids["target"])
+        result.qualifiers.append(tuple(ids["qualifiers"]))
+        result.outcome.append(ids["outcome"])
+        result.summary.append(payload["summary"])
+        result.ritual.append(payload["telemetry_stub"]["ritual"])
+        result.status.append(payload["telemetry_stub"]["status"])
+        result.accepted.append(bool(validation["accepted"]))
+        errors = validation["schema_errors"] + validation["dq_errors"]
+        result.chain_errors.append("; ".join(errors) if errors else None)
+
+    if with_errors:
+        result.errors = [result.chain_errors[unique] for unique in result.rows]
+
+    return result
+
+
 def load_glyphs_from_file(path: Path) -> List[str]:
     payload = json.loads(path.read_text(encoding="utf-8"))
     glyphs = payload.get("glyphs")
@@ -376,13 +791,25 @@ def load_glyphs_from_file(path: Path) -> List[str]:
 __all__ = [
     "DEFAULT_LOG",
     "FACTORY_ORDER_SCHEMA",
+    "BatchTranslation",
+    "CompiledChain",
+    "CompiledTranslator",
     "Glyph",
     "GlyphIndex",
     "LEXICON_PATH",
+    "LEXICON_REGISTRY",
+    "LexiconRegistry",
+    "TRANSLATOR_AUDIT",
+    "TrustedOrder",
+    "build_batch_id",
+    "build_order_payload",
+    "lexicon_cache_stats",
     "load_glyphs_from_file",
     "load_lexicon",
     "log_round_trip",
+    "parse_lexicon",
     "resolve_chain",
+    "translate_batch",
     "translate_tokens",
     "validate_factory_order",
     "validate_telemetry_dq",
@@ -4,8 +4,15 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
+from typing import Iterator, List
 
-from tools.emoji_translator import DEFAULT_LOG, load_glyphs_from_file, load_lexicon, translate_tokens
+from tools.emoji_translator import (
+    DEFAULT_LOG,
+    load_glyphs_from_file,
+    load_lexicon,
+    translate_batch,
+    translate_tokens,
+)
 
 
 def parse_args() -> argparse.Namespace:
@@ -13,11 +20,50 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--glyphs", help="Space-separated glyphs or ids", default=None)
     parser.add_argument("--glyph-file", help="Path to sample glyph JSON", default=None)
     parser.add_argument("--log", help="Log file path", default=str(DEFAULT_LOG))
+    parser.add_argument(
+        "--replay",
+        help="Re-translate every glyph chain in a round-trip JSONL log (batch mode, nothing is logged)",
+        default=None,
+    )
     return parser.parse_args()
 
 
+def iter_logged_chains(path: Path) -> Iterator[List[str]]:
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            glyphs = json.loads(line).get("glyphs")
+            if isinstance(glyphs, list) and glyphs:
+                yield [str(item) for item in glyphs]
+
+
+def replay(path: Path) -> int:
+    batch = translate_batch(iter_logged_chains(path), index=load_lexicon(), with_errors=True)
+    rejected = len(batch) - batch.accepted_rows
+    print(
+        json.dumps(
+            {
+                "log": str(path),
+                "rows": len(batch),
+                "unique_chains": len(batch.chains),
+                "accepted": batch.accepted_rows,
+                "rejected": rejected,
+                "errors": sorted({err for err in batch.errors or [] if err}),
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+    )
+    return 0 if rejected == 0 else 1
+
+
 def main() -> int:
     args = parse_args()
+    if args.replay:
+        return replay(Path(args.replay))
+
     lexicon = load_lexicon()
 
     if args.glyphs:
@@ -25,7 +71,7 @@ def main() -> int:
     elif args.glyph_file:
         tokens = load_glyphs_from_file(Path(args.glyph_file))
     else:
-        raise SystemExit("Provide --glyphs or --glyph-file")
+        raise SystemExit("Provide --glyphs, --glyph-file or --replay")
 
     result = translate_tokens(tokens, index=lexicon, log_path=Path(args.log))
     print(json.dumps(result, indent=2, ensure_ascii=False))
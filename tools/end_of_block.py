@@ -3,11 +3,15 @@ Hybrid comms block-end cadence runner.
 
 Sequence:
 - exchange_heartbeat
+- exchange_index (warm the shared scan index once for the steps below)
 - offline_sync_exchange
 - ops_readiness
 - exchange_all
 
 Purpose: one-button check for exchange health + readiness + sync hygiene.
+
+For a warm, repeating cadence, tools/exchange_daemon.py --block-interval runs
+the same steps in-process against its shared index.
 """
 
 from __future__ import annotations
@@ -38,6 +42,7 @@ def main() -> None:
     py = sys.executable
     steps: Iterable[tuple[str, list[str], dict[str, str] | None]] = (
         ("heartbeat", [py, "tools/exchange_heartbeat.py"], None),
+        ("exchange_index", [py, "tools/exchange_index.py"], None),
         ("offline_sync_exchange", [py, "tools/offline_sync_exchange.py"], {"PYTHONIOENCODING": "utf-8"}),
         ("ops_readiness", [py, "-m", "tools.ops_readiness"], None),
         ("exchange_all", [py, "tools/exchange_all.py"], None),
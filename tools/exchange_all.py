@@ -1,4 +1,4 @@
-import json, os, sys, shutil
+import argparse, json, os, sys, time
 from pathlib import Path
 from datetime import datetime, timezone
 
@@ -6,6 +6,13 @@ WORKSPACE = "toysoldiers_ai_0"
 ROOT = Path(__file__).resolve().parents[1]
 LOGS = ROOT / "logs"
 
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_index import get_index, save_shared
+from tools.exchange_bundle import BUNDLE_DIR, BundleWriter, current_block, latest_entries, read_index
+from tools.exchange_io import CopyEngine
+
 ORDERS_SUB = Path("exchange/orders/dispatched")
 REPORTS_SUB = Path("exchange/reports/archived")
 ACKS_SUB = Path("exchange/acknowledgements/logged")
@@ -28,14 +35,16 @@ def read_hub_path():
         pass
     return None
 
-def collect_staged():
+def collect_staged(index=None):
+    index = index or get_index(ROOT)
     return {
-        "orders": list((ROOT/"outbox"/"orders").glob("*.json")),
-        "reports": list((ROOT/"outbox"/"reports").glob("*.json")),
-        "acks": list((ROOT/"outbox"/"acks").glob("*.json")),
+        "orders": [r.path for r in index.files_in(ROOT/"outbox"/"orders")],
+        "reports": [r.path for r in index.files_in(ROOT/"outbox"/"reports")],
+        "acks": [r.path for r in index.files_in(ROOT/"outbox"/"acks")],
     }
 
-def validate(files_by_kind):
+def validate(files_by_kind, index=None):
+    index = index or get_index(ROOT)
     missing = []
     def fields_for(kind):
         return {
@@ -46,23 +55,55 @@ def validate(files_by_kind):
     for kind, files in files_by_kind.items():
         req = fields_for(kind)
         for f in files:
-            try:
-                obj = json.loads(f.read_text(encoding="utf-8"))
-            except Exception:
-                missing.append({"kind": kind, "file": f.name, "missing": ["invalid_json"]})
-                continue
-            miss = [k for k in req if obj.get(k) is None]
+            record = index.get(f)
+            if record is None:
+                index.refresh_paths([f])
+                record = index.get(f)
+            miss = record.missing(req) if record is not None else ["invalid_json"]
             if miss:
                 missing.append({"kind": kind, "file": f.name, "missing": miss})
     return missing
 
-def main():
+def bundle_staged(hub, planned, index=None):
+    """Append staged files whose content is not already in this block's pack.
+
+    The pack lives at <hub>/bundles/<workspace>/<block>.pack with entries named
+    by their hub path (exchange/orders/dispatched/<name>, ...). Nothing is
+    placed in the hub folders themselves: unpack on the hub side with
+    ``tools/exchange_bundle.py extract <pack> --dest <hub>``. File hashes come
+    from the exchange index. Returns (files already bundled, newly bundled
+    entries, pack path, seconds).
+    """
+    index = index or get_index(ROOT)
+    pack = hub / BUNDLE_DIR / WORKSPACE / f"{current_block()}.pack"
+    existing, _ = read_index(pack)
+    packed = {e.path: e.sha256 for e in latest_entries(existing)}
+    items = []
+    unchanged = []
+    for kind, f, dest in planned:
+        name = dest.relative_to(hub).as_posix()
+        record = index.get(f)
+        sha = record.sha256 if record is not None else None
+        if sha and packed.get(name) == sha:
+            unchanged.append((kind, f))
+        else:
+            items.append((name, f))
+    started = time.perf_counter()
+    entries = BundleWriter(pack).append(items)
+    return unchanged, entries, pack, time.perf_counter() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate staged outbox artefacts and publish them to the hub")
+    parser.add_argument("--bundle", action="store_true", help="Append to this block's compressed pack under <hub>/bundles instead of copying files (extract it on the hub)")
+    args = parser.parse_args(argv)
     hub = read_hub_path()
     if not hub:
         print("No hub path. Set SHAGI_EXCHANGE_PATH or edit exchange/config.json.", file=sys.stderr)
         sys.exit(2)
-    files = collect_staged()
-    missing = validate(files)
+    index = get_index(ROOT)
+    files = collect_staged(index)
+    missing = validate(files, index)
+    save_shared()
     ok = len(missing) == 0
 
     summary = {
@@ -82,17 +123,59 @@ def main():
         print(f"Validation failed. See {out}")
         sys.exit(1)
 
-    (hub/ORDERS_SUB).mkdir(parents=True, exist_ok=True)
-    (hub/REPORTS_SUB).mkdir(parents=True, exist_ok=True)
-    (hub/ACKS_SUB).mkdir(parents=True, exist_ok=True)
-
+    engine = CopyEngine.from_env()
+    planned = []
     for kind, dest_sub in (("orders", ORDERS_SUB), ("reports", REPORTS_SUB), ("acks", ACKS_SUB)):
+        if not args.bundle:
+            engine.ensure_dir(hub/dest_sub)
         for f in files[kind]:
-            dest = hub/dest_sub/f.name
-            shutil.copy2(f, dest)
+            planned.append((kind, f, hub/dest_sub/f.name))
+
+    if args.bundle:
+        try:
+            unchanged, entries, pack, elapsed = bundle_staged(hub, planned, index)
+        except OSError as e:
+            summary["copy_failures"] = [{"kind": "bundle", "file": "", "error": str(e)}]
+            out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+            print(f"exchange_all bundle failed: {e}. See {out}")
+            sys.exit(1)
+        kinds = {dest.relative_to(hub).as_posix(): kind for kind, _, dest in planned}
+        summary["bundled"] = {"orders": [], "reports": [], "acks": []}
+        for kind, f in unchanged:
+            summary["bundled"][kind].append(f.name)
+        for e in entries:
+            summary["bundled"][kinds[e.path]].append(Path(e.path).name)
+        total = sum(e.size for e in entries)
+        summary["copy_failures"] = []
+        summary["bundle"] = {
+            "pack": str(pack),
+            "appended": len(entries),
+            "unchanged": len(unchanged),
+            "bytes": total,
+            "packed_bytes": entries[-1].member_length if entries else 0,
+            "elapsed_s": round(elapsed, 4),
+        }
+        out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        print(f"Bundle: {len(entries)} file(s) appended ({total} bytes), {len(unchanged)} unchanged -> {pack}")
+        print(f"Nothing copied to the hub folders; unpack with: python tools/exchange_bundle.py extract {pack} --dest {hub}")
+        print(f"exchange_all complete. See {out}")
+        sys.exit(0)
+
+    report = engine.copy_many((f, dest) for _, f, dest in planned)
+    failed = []
+    for (kind, f, _), result in zip(planned, report.results):
+        if result.ok:
             summary["copied"][kind].append(f.name)
+        else:
+            failed.append({"kind": kind, "file": f.name, "error": result.error})
+    summary["copy_failures"] = failed
+    summary["throughput"] = report.to_dict()
 
     out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print(f"Copy engine: {report.summary()}")
+    if failed:
+        print(f"exchange_all finished with {len(failed)} copy failure(s). See {out}")
+        sys.exit(1)
     print(f"exchange_all complete. See {out}")
     sys.exit(0)
 
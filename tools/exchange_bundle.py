@@ -0,0 +1,328 @@
+"""
+exchange_bundle.py — Append-only compressed packs for small-file-heavy hub transfers.
+
+On USB and SMB hubs the per-file open/close/metadata cost dwarfs the payload
+of a few-KB JSON artefact. A bundle carries a whole cadence block's files in
+two hub files:
+
+- ``<block>.pack``       concatenated gzip members; each append (one push)
+                         adds one member holding its files back to back.
+                         The pack is itself a valid multi-member gzip stream.
+- ``<block>.idx.jsonl``  one line per file: path, size, sha256, mtime_ns,
+                         the member's byte offset/length in the pack, and the
+                         file's offset inside the decompressed member.
+
+The index line is the commit point: the pack is written and synced first,
+then the index lines are appended. Pack bytes past the last indexed member
+(from an interrupted append) are truncated by the next append. One writer
+per bundle (each front owns its own bundle directory).
+
+Readers remember how many bytes of the index they have consumed, read only
+the new lines, and stream-decompress only the members holding entries they
+have not seen (``extract``). Entries are checked against their sha256 and
+written atomically; an entry whose path is absolute or climbs out with
+``..`` is refused rather than written.
+
+Stdlib only (zlib/gzip framing); zstd would compress better but is not in
+the standard library.
+
+CLI
+    python tools/exchange_bundle.py list  PACK
+    python tools/exchange_bundle.py extract PACK --dest DIR [--only GLOB]
+    python tools/exchange_bundle.py verify PACK
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_io import fsync_dir, temp_path_for  # noqa: E402
+from tools.pull_router import is_safe_rel  # noqa: E402
+
+PACK_SUFFIX = ".pack"
+INDEX_SUFFIX = ".idx.jsonl"
+BUNDLE_DIR = "bundles"
+DEFAULT_LEVEL = 6
+CHUNK_SIZE = 256 * 1024
+
+
+def index_path_for(pack: Path) -> Path:
+    stem = pack.name[: -len(PACK_SUFFIX)] if pack.name.endswith(PACK_SUFFIX) else pack.name
+    return pack.with_name(stem + INDEX_SUFFIX)
+
+
+def current_block() -> str:
+    """Bundle name for this cadence block: SHAGI_BUNDLE_BLOCK, else the UTC date."""
+    return os.getenv("SHAGI_BUNDLE_BLOCK") or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+@dataclass
+class BundleEntry:
+    path: str
+    size: int
+    sha256: str
+    mtime_ns: int
+    member: int  # byte offset of the gzip member in the pack
+    member_length: int
+    offset: int  # offset of this file inside the decompressed member
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "BundleEntry":
+        return cls(
+            path=str(data["path"]),
+            size=int(data["size"]),  # type: ignore[arg-type]
+            sha256=str(data["sha256"]),
+            mtime_ns=int(data.get("mtime_ns") or 0),  # type: ignore[arg-type]
+            member=int(data["member"]),  # type: ignore[arg-type]
+            member_length=int(data["member_length"]),  # type: ignore[arg-type]
+            offset=int(data["offset"]),  # type: ignore[arg-type]
+        )
+
+
+def read_index(pack: Path, start: int = 0) -> Tuple[List[BundleEntry], int]:
+    """Entries from byte ``start`` of the pack's index; returns them and the new offset.
+
+    A trailing partial line (an append in progress) is left for the next read.
+    """
+    entries: List[BundleEntry] = []
+    try:
+        with index_path_for(pack).open("rb") as handle:
+            handle.seek(start)
+            data = handle.read()
+    except FileNotFoundError:
+        return entries, start
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(BundleEntry.from_dict(json.loads(line)))
+        except (ValueError, KeyError, TypeError):
+            print(f"[WARN] Skipping malformed bundle index line in {index_path_for(pack).name}")
+    return entries, start + end
+
+
+class BundleWriter:
+    def __init__(self, pack: Path, level: int = DEFAULT_LEVEL) -> None:
+        self.pack = pack
+        self.index = index_path_for(pack)
+        self.level = level
+
+    def _committed_end(self) -> int:
+        entries, _ = read_index(self.pack)
+        return max((e.member + e.member_length for e in entries), default=0)
+
+    def append(self, items: Sequence[Tuple[str, Path]]) -> List[BundleEntry]:
+        """Add ``(bundle path, source file)`` pairs as one gzip member; returns their index entries."""
+        if not items:
+            return []
+        self.pack.parent.mkdir(parents=True, exist_ok=True)
+        end = self._committed_end()
+        new_pack = not self.pack.exists()
+        entries: List[BundleEntry] = []
+        with self.pack.open("r+b" if not new_pack else "w+b") as out:
+            out.truncate(end)  # drop bytes of an append that never reached the index
+            out.seek(end)
+            comp = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 31: gzip framing
+            position = 0
+            pending: List[Tuple[str, int, str, int, int]] = []
+            for name, src in items:
+                st = src.stat()
+                digest = hashlib.sha256()
+                size = 0
+                with src.open("rb") as fin:
+                    for chunk in iter(lambda: fin.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        out.write(comp.compress(chunk))
+                pending.append((name, size, digest.hexdigest(), st.st_mtime_ns, position))
+                position += size
+            out.write(comp.flush())
+            out.flush()
+            length = out.tell() - end
+            os.fsync(out.fileno())
+        for name, size, sha, mtime_ns, offset in pending:
+            entries.append(BundleEntry(name, size, sha, mtime_ns, end, length, offset))
+        lines = "".join(json.dumps(asdict(e), sort_keys=True) + "\n" for e in entries)
+        fd = os.open(str(self.index), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if new_pack:
+            fsync_dir(self.pack.parent)
+        return entries
+
+
+class _MemberReader:
+    """Sequential reader over the decompressed bytes of one gzip member."""
+
+    def __init__(self, handle, member: int, length: int) -> None:
+        handle.seek(member)
+        self._handle = handle
+        self._remaining = length
+        self._decomp = zlib.decompressobj(31)  # 31: gzip framing
+        self._buffer = b""
+        self.position = 0
+
+    def _fill(self) -> bool:
+        while not self._buffer:
+            if self._remaining <= 0:
+                self._buffer = self._decomp.flush()
+                return bool(self._buffer)
+            raw = self._handle.read(min(CHUNK_SIZE, self._remaining))
+            if not raw:
+                raise ValueError("bundle member truncated")
+            self._remaining -= len(raw)
+            self._buffer = self._decomp.decompress(raw)
+        return True
+
+    def read(self, limit: int) -> bytes:
+        if limit <= 0 or not self._fill():
+            return b""
+        data, self._buffer = self._buffer[:limit], self._buffer[limit:]
+        self.position += len(data)
+        return data
+
+    def skip_to(self, offset: int) -> None:
+        while self.position < offset:
+            if not self.read(offset - self.position):
+                raise ValueError("bundle member ended early")
+
+
+def _extract_one(reader: _MemberReader, entry: BundleEntry, dest: Optional[Path]) -> None:
+    """Copy one entry from ``reader`` to ``dest`` (or only hash it when ``dest`` is None)."""
+    if dest is not None and not is_safe_rel(entry.path):
+        raise ValueError(f"unsafe bundle path {entry.path!r}")
+    reader.skip_to(entry.offset)
+    digest = hashlib.sha256()
+    tmp = None
+    out = None
+    if dest is not None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = temp_path_for(dest)
+        out = tmp.open("wb")
+    try:
+        remaining = entry.size
+        while remaining > 0:
+            chunk = reader.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError("bundle member ended early")
+            remaining -= len(chunk)
+            digest.update(chunk)
+            if out is not None:
+                out.write(chunk)
+        if digest.hexdigest() != entry.sha256:
+            raise ValueError("sha256 mismatch")
+        if out is not None:
+            out.close()
+            os.utime(tmp, ns=(entry.mtime_ns, entry.mtime_ns))
+            os.replace(tmp, dest)
+    except BaseException:
+        if out is not None:
+            out.close()
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+def extract(
+    pack: Path, entries: Sequence[BundleEntry], dest_for: Callable[[BundleEntry], Optional[Path]]
+) -> List[Tuple[BundleEntry, Optional[Path], Optional[str]]]:
+    """Stream the members holding ``entries`` and write each to ``dest_for(entry)``.
+
+    Only members that contain a requested entry are read, each in a single
+    forward pass. ``dest_for`` returning None checks the entry without
+    writing it. Returns ``(entry, written path, error)`` in input order.
+    """
+    wanted: Dict[int, List[BundleEntry]] = {}
+    for entry in entries:
+        wanted.setdefault(entry.member, []).append(entry)
+    outcome: Dict[int, Tuple[Optional[Path], Optional[str]]] = {}
+    with pack.open("rb") as handle:
+        for member in sorted(wanted):
+            group = sorted(wanted[member], key=lambda e: e.offset)
+            reader = _MemberReader(handle, member, group[0].member_length)
+            for entry in group:
+                if reader.position > entry.offset:
+                    # Same bytes requested twice (duplicate entry): restart the member.
+                    reader = _MemberReader(handle, member, entry.member_length)
+                dest = dest_for(entry)
+                try:
+                    _extract_one(reader, entry, dest)
+                except (OSError, ValueError, zlib.error) as exc:
+                    outcome[id(entry)] = (None, str(exc))
+                    reader = _MemberReader(handle, member, entry.member_length)
+                else:
+                    outcome[id(entry)] = (dest, None)
+    return [(e, *outcome[id(e)]) for e in entries]
+
+
+def latest_entries(entries: Iterable[BundleEntry]) -> List[BundleEntry]:
+    """Last entry per path (a later append supersedes an earlier one)."""
+    latest: Dict[str, BundleEntry] = {}
+    for entry in entries:
+        latest[entry.path] = entry
+    return list(latest.values())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or unpack exchange bundles")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_list = sub.add_parser("list", help="List bundle entries")
+    p_list.add_argument("pack", type=Path)
+    p_ext = sub.add_parser("extract", help="Extract (latest) entries under --dest")
+    p_ext.add_argument("pack", type=Path)
+    p_ext.add_argument("--dest", type=Path, required=True)
+    p_ext.add_argument("--only", help="Glob on the bundle path")
+    p_ver = sub.add_parser("verify", help="Decompress every entry and check its sha256")
+    p_ver.add_argument("pack", type=Path)
+    args = parser.parse_args(argv)
+
+    entries, _ = read_index(args.pack)
+    if args.cmd == "list":
+        for e in entries:
+            print(f"{e.size:>10}  {e.sha256[:12]}  {e.path}")
+        print(f"[OK] {len(entries)} entr{'y' if len(entries) == 1 else 'ies'} in {args.pack.name}")
+        return 0
+    if args.cmd == "extract":
+        chosen = [e for e in latest_entries(entries) if not args.only or fnmatch.fnmatch(e.path, args.only)]
+        results = extract(args.pack, chosen, lambda e: args.dest / e.path)
+    else:
+        results = extract(args.pack, entries, lambda e: None)
+    errors = [(e, err) for e, _, err in results if err]
+    for e, err in errors:
+        print(f"[WARN] {e.path}: {err}")
+    done = len(results) - len(errors)
+    print(f"[OK] {args.cmd}: {done} entr{'y' if done == 1 else 'ies'} OK, {len(errors)} failed")
+    return 1 if errors else 0
+
+
+__all__ = [
+    "BUNDLE_DIR",
+    "BundleEntry",
+    "BundleWriter",
+    "current_block",
+    "extract",
+    "index_path_for",
+    "latest_entries",
+    "read_index",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
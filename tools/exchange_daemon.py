@@ -0,0 +1,497 @@
+"""
+exchange_daemon.py — Warm, long-running host for the exchange cadence tools.
+
+end_of_block.py and cron-style cadences start a fresh interpreter per step,
+and each one re-imports, re-resolves config and re-scans the tree. The
+daemon keeps one process (and one shared ``ExchangeIndex``) alive and runs
+the same work as asyncio tasks:
+
+- watcher   fs events on the exchange queues (tools/fs_events.py) update
+            the watcher snapshot and, incrementally, the ledger
+- receiver  ``exchange_receiver.process_orders`` for each new pending order;
+            an order that fails is skipped until its file changes
+- bridge    offline_bridge push + pull every ``--bridge-interval`` seconds
+- block     heartbeat, offline_sync_exchange, ops_readiness and exchange_all
+            in-process every ``--block-interval`` seconds (off by default)
+
+Index, ledger and bridge work all run on one worker thread, in the order it
+was scheduled, so no two jobs touch the index at once; the event loop only
+waits on the watcher and the timers.
+
+Health: ``logs/exchange_daemon.sock`` (Unix socket) answers every connection
+with one JSON line (task runs, failures, durations, queue sizes) and closes.
+Query it with ``--health``. Platforms without Unix sockets run without it.
+
+CLI
+    python tools/exchange_daemon.py                     # run until SIGINT/SIGTERM
+    python tools/exchange_daemon.py --once              # one pass of every task, then exit
+    python tools/exchange_daemon.py --health            # ask a running daemon
+    python tools/exchange_daemon.py --no-bridge --block-interval 3600
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+ROOT = Path(__file__).resolve().parents[1]
+SOCKET_PATH = ROOT / "logs" / "exchange_daemon.sock"
+HEALTH_SCHEMA = "exchange-daemon-health@1.0"
+DEFAULT_BRIDGE_INTERVAL = 300.0
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools import exchange_watcher  # noqa: E402
+from tools.exchange_index import ExchangeIndex, get_index  # noqa: E402
+from tools.exchange_io import CopyEngine  # noqa: E402
+from tools.exchange_receiver import (  # noqa: E402
+    ACK_PENDING_DIR,
+    ORDERS_DISPATCHED_DIR,
+    ORDERS_PENDING_DIR,
+    REPORT_INBOX_DIR,
+    OrderProcessingError,
+    process_orders,
+)
+from tools.fs_events import DEFAULT_DEBOUNCE, open_watcher  # noqa: E402
+from tools.ledger_update import SOURCES, update_ledger, update_ledger_paths  # noqa: E402
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        print(f"[WARN] Ignoring non-numeric {name}={raw!r}")
+        return default
+
+
+@dataclass
+class TaskHealth:
+    runs: int = 0
+    failures: int = 0
+    running: bool = False
+    last_started: Optional[str] = None
+    last_duration_s: Optional[float] = None
+    last_error: Optional[str] = None
+    last_result: Any = None
+
+
+class ExchangeDaemon:
+    def __init__(
+        self,
+        repo_root: Path = ROOT,
+        *,
+        bridge_interval: float = DEFAULT_BRIDGE_INTERVAL,
+        block_interval: float = 0.0,
+        backend: str = "auto",
+        poll_interval: float = 30.0,
+        debounce: float = DEFAULT_DEBOUNCE,
+        socket_path: Optional[Path] = SOCKET_PATH,
+        quiet: bool = False,
+    ) -> None:
+        self.repo_root = Path(repo_root)
+        self.orders_pending = self.repo_root / ORDERS_PENDING_DIR.relative_to(ROOT)
+        self.orders_dispatched = self.repo_root / ORDERS_DISPATCHED_DIR.relative_to(ROOT)
+        self.ack_pending = self.repo_root / ACK_PENDING_DIR.relative_to(ROOT)
+        self.report_inbox = self.repo_root / REPORT_INBOX_DIR.relative_to(ROOT)
+        self.bridge_interval = bridge_interval
+        self.block_interval = block_interval
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.socket_path = socket_path
+        self.quiet = quiet
+        self.started = _utc_now()
+        self.watch_backend: Optional[str] = None
+        self.tasks: Dict[str, TaskHealth] = {}
+        # Only touched on the worker thread; health reads the copy in ``stats``.
+        self.index: Optional[ExchangeIndex] = None
+        self.snapshot: Optional[exchange_watcher.Snapshot] = None
+        self.failed_orders: Dict[Path, Any] = {}
+        self.stats: Dict[str, Any] = {}
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exchange-daemon")
+        self._engine: Optional[CopyEngine] = None
+        self._bridge_cfg = None
+        self._stop: Optional[asyncio.Event] = None
+        self._orders_ready: Optional[asyncio.Event] = None
+
+    # -- jobs (worker thread) --------------------------------------------------
+
+    def _refresh_stats(self) -> None:
+        index = self.index
+        snapshot = self.snapshot or {}
+        self.stats = {
+            "index": {"files": len(index), "unchanged": index.hits, "parsed": index.parsed} if index else None,
+            "queues": {name: len(entries) for name, entries in snapshot.items()},
+            "failed_orders": sorted(p.name for p in self.failed_orders),
+        }
+
+    def _job_start(self) -> Dict[str, Any]:
+        self.index = get_index(self.repo_root)
+        self.snapshot = exchange_watcher.process_once(quiet=self.quiet, index=self.index)
+        changed = update_ledger(self.repo_root, index=self.index)
+        self.index.save()
+        self._refresh_stats()
+        return {"ledger_changes": changed, **self.stats["queues"]}
+
+    def _job_changes(self, changed: Set[Path]) -> Dict[str, Any]:
+        assert self.index is not None and self.snapshot is not None
+        self.snapshot = exchange_watcher.process_changes(self.snapshot, changed, quiet=True, index=self.index)
+        if any(path in self.watched for path in changed):
+            # A directory-level event (queue overflow, folder recreated): re-resolve everything.
+            ledger_changes = update_ledger(self.repo_root, index=self.index)
+        else:
+            ledger_changes = update_ledger_paths(self.repo_root, changed, index=self.index)
+        self.index.save()
+        self._refresh_stats()
+        return {"events": len(changed), "ledger_changes": ledger_changes}
+
+    def _job_receive(self) -> List[str]:
+        assert self.index is not None
+        processed: List[str] = []
+        touched: Set[Path] = set()
+        for record in self.index.files_in(self.orders_pending):
+            path = record.path
+            if not path.exists() or self.failed_orders.get(path) == record.fingerprint:
+                continue
+            try:
+                order_ids = process_orders([path.stem], base_dir=self.repo_root)
+            except OrderProcessingError as exc:
+                self.failed_orders[path] = record.fingerprint
+                print(f"[WARN] receiver: {exc}")
+                continue
+            self.failed_orders.pop(path, None)
+            processed.extend(order_ids)
+            touched.update((path, self.orders_dispatched / path.name))
+            for order_id in order_ids:
+                touched.update((self.ack_pending / f"{order_id}-ack.json", self.report_inbox / f"{order_id}-report.json"))
+        # Forget failures for files that have left the pending queue.
+        self.failed_orders = {p: fp for p, fp in self.failed_orders.items() if p.exists()}
+        if touched:
+            # Apply the receiver's own moves now rather than waiting for their fs events.
+            self._job_changes(touched)
+        else:
+            self._refresh_stats()
+        return processed
+
+    def _job_bridge(self) -> Dict[str, Any]:
+        from tools import offline_bridge
+
+        if self._bridge_cfg is None:
+            self._bridge_cfg = offline_bridge.resolve_config()
+            self._engine = CopyEngine.from_env()
+        cfg = self._bridge_cfg
+        if not cfg.hub.exists():
+            raise RuntimeError(f"hub path does not exist: {cfg.hub}")
+        pushed = offline_bridge.push(cfg, engine=self._engine)
+        pulled = offline_bridge.pull(cfg, engine=self._engine, index=self.index)
+        self._refresh_stats()
+        return {"pushed": pushed, "pulled": pulled}
+
+    def _job_block(self) -> Dict[str, Any]:
+        from tools import exchange_all, exchange_heartbeat, offline_sync_exchange, ops_readiness
+
+        # The outbox is not watched; re-stat it so exchange_all sees what was staged since the last block.
+        if self.index is not None:
+            self.index.refresh(self.repo_root / "outbox")
+        steps: List[tuple] = [
+            ("heartbeat", exchange_heartbeat.heartbeat),
+            ("offline_sync_exchange", functools.partial(offline_sync_exchange.sync_local, str(self.repo_root))),
+            ("ops_readiness", ops_readiness.main),
+            ("exchange_all", functools.partial(exchange_all.main, [])),
+        ]
+        codes: Dict[str, Any] = {}
+        for name, step in steps:
+            try:
+                result = step()
+                code = result if isinstance(result, int) else 0
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            codes[name] = code
+            if code:
+                # Same as end_of_block: later steps (publishing) only run after a clean check.
+                raise RuntimeError(f"block step {name} failed with code {code}: {codes}")
+        return codes
+
+    # -- scheduling (event loop) -----------------------------------------------
+
+    async def _run(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func`` on the worker thread and record its outcome under ``name``."""
+        health = self.tasks.setdefault(name, TaskHealth())
+        health.running = True
+        health.last_started = _utc_now()
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._worker, functools.partial(func, *args))
+        except Exception as exc:  # a failing task must not take the daemon down
+            health.failures += 1
+            health.last_error = f"{type(exc).__name__}: {exc}"
+            print(f"[WARN] {name} failed: {health.last_error}")
+            return None
+        finally:
+            health.runs += 1
+            health.running = False
+            health.last_duration_s = round(time.perf_counter() - start, 4)
+        health.last_error = None
+        health.last_result = result
+        return result
+
+    def _wake_receiver(self) -> None:
+        if self._orders_ready is not None and self.stats.get("queues", {}).get("orders_pending"):
+            self._orders_ready.set()
+
+    @property
+    def watched(self) -> List[Path]:
+        exchange = self.repo_root / "exchange"
+        dirs = [self.repo_root / config["path"].relative_to(ROOT) for config in exchange_watcher.CATEGORIES.values()]
+        dirs += [exchange / folder for folder, _, _, _ in SOURCES]
+        return list(dict.fromkeys(dirs))
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Wait ``seconds`` or until shutdown; True if the daemon is stopping."""
+        assert self._stop is not None
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _watch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        with open_watcher(self.watched, backend=self.backend, interval=self.poll_interval, debounce=self.debounce) as watcher:
+            self.watch_backend = watcher.backend
+            if not self.quiet:
+                print(f"[exchange-daemon] Watching {len(self.watched)} folder(s) via {watcher.backend}")
+            pending: Optional[asyncio.Future] = None
+            try:
+                while True:
+                    if watcher.backend == "poll":
+                        if await self._sleep(self.poll_interval):
+                            return
+                        pending = loop.run_in_executor(self._worker, watcher.poll)
+                    else:
+                        # Short timeouts keep shutdown prompt; events still arrive within the debounce.
+                        pending = loop.run_in_executor(None, watcher.wait, 1.0)
+                    # Shielded: cancelling must not abandon a thread still reading the watcher.
+                    changed = await asyncio.shield(pending)
+                    pending = None
+                    if changed:
+                        await self._run("watcher", self._job_changes, set(changed))
+                        self._wake_receiver()
+            finally:
+                if pending is not None:
+                    # Let the in-flight poll/wait return before the watcher closes its fd.
+                    await asyncio.wait([pending])
+
+    async def _receiver_loop(self) -> None:
+        assert self._orders_ready is not None
+        while True:
+            await self._orders_ready.wait()
+            self._orders_ready.clear()
+            processed = await self._run("receiver", self._job_receive)
+            if processed and not self.quiet:
+                print(f"[exchange-daemon] Processed orders: {', '.join(processed)}")
+
+    async def _cadence_loop(self, name: str, func: Callable[[], Any], interval: float, *, immediate: bool) -> None:
+        if immediate:
+            await self._run(name, func)
+        while not await self._sleep(interval):
+            await self._run(name, func)
+
+    async def _handle_health(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            writer.write((json.dumps(self.health(), default=str) + "\n").encode("utf-8"))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "schema": HEALTH_SCHEMA,
+            "pid": os.getpid(),
+            "started": self.started,
+            "now": _utc_now(),
+            "watch_backend": self.watch_backend,
+            "bridge_interval_s": self.bridge_interval or None,
+            "block_interval_s": self.block_interval or None,
+            **self.stats,
+            "tasks": {name: asdict(task) for name, task in sorted(self.tasks.items())},
+        }
+
+    async def _start_health_server(self) -> Optional[asyncio.AbstractServer]:
+        if self.socket_path is None:
+            return None
+        if not hasattr(asyncio, "start_unix_server") or not hasattr(socket, "AF_UNIX"):
+            print("[WARN] Unix sockets unavailable; health endpoint disabled")
+            return None
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists() and _query(self.socket_path) is not None:
+            raise RuntimeError(f"another daemon is answering on {self.socket_path}")
+        self.socket_path.unlink(missing_ok=True)  # stale socket from a daemon that died
+        try:
+            return await asyncio.start_unix_server(self._handle_health, path=str(self.socket_path))
+        except (OSError, NotImplementedError) as exc:
+            print(f"[WARN] Health endpoint disabled: {exc}")
+            return None
+
+    async def run(self) -> int:
+        self._stop = asyncio.Event()
+        self._orders_ready = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: KeyboardInterrupt ends asyncio.run instead
+
+        server = await self._start_health_server()
+        await self._run("start", self._job_start)
+        self._wake_receiver()
+        tasks = [
+            asyncio.create_task(self._watch_loop(), name="watcher"),
+            asyncio.create_task(self._receiver_loop(), name="receiver"),
+        ]
+        if self.bridge_interval > 0:
+            tasks.append(asyncio.create_task(self._cadence_loop("bridge", self._job_bridge, self.bridge_interval, immediate=True)))
+        if self.block_interval > 0:
+            tasks.append(asyncio.create_task(self._cadence_loop("block", self._job_block, self.block_interval, immediate=False)))
+        if not self.quiet:
+            where = f" (health: {self.socket_path})" if server is not None else ""
+            print(f"[exchange-daemon] Running with {len(tasks)} task(s){where}")
+
+        stopper = asyncio.create_task(self._stop.wait())
+        done, _ = await asyncio.wait([stopper, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        code = 0
+        for task in done:
+            if task is not stopper and task.exception() is not None:
+                print(f"[WARN] {task.get_name()} task stopped: {task.exception()}")
+                code = 1
+        for task in [stopper, *tasks]:
+            task.cancel()
+        await asyncio.gather(stopper, *tasks, return_exceptions=True)
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            assert self.socket_path is not None
+            self.socket_path.unlink(missing_ok=True)
+        # Let a job already on the worker finish, then persist the index.
+        await loop.run_in_executor(self._worker, self._flush)
+        self._worker.shutdown(wait=True)
+        if not self.quiet:
+            print("[exchange-daemon] Stopped")
+        return code
+
+    def _flush(self) -> None:
+        if self.index is not None:
+            self.index.save()
+
+    async def run_once(self) -> int:
+        """One pass of every enabled task, in dependency order; non-zero if any failed."""
+        await self._run("start", self._job_start)
+        await self._run("receiver", self._job_receive)
+        if self.bridge_interval > 0:
+            await self._run("bridge", self._job_bridge)
+        if self.block_interval > 0:
+            await self._run("block", self._job_block)
+        await asyncio.get_running_loop().run_in_executor(self._worker, self._flush)
+        self._worker.shutdown(wait=True)
+        print(json.dumps(self.health(), indent=2, default=str))
+        return 1 if any(task.last_error for task in self.tasks.values()) else 0
+
+
+def _query(path: Path, timeout: float = 2.0) -> Optional[Dict[str, Any]]:
+    """Health payload from a running daemon, or None if nothing answers on ``path``."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            chunks = []
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+    except OSError:
+        return None
+    try:
+        return json.loads(b"".join(chunks).decode("utf-8"))
+    except ValueError:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the exchange watcher, receiver, bridge and ledger in one warm process")
+    parser.add_argument("--once", action="store_true", help="Run every enabled task once and exit")
+    parser.add_argument("--health", action="store_true", help="Query a running daemon's health endpoint and exit")
+    parser.add_argument(
+        "--bridge-interval",
+        type=float,
+        default=_env_float("SHAGI_DAEMON_BRIDGE_S", DEFAULT_BRIDGE_INTERVAL),
+        help="Seconds between bridge push+pull runs (default: SHAGI_DAEMON_BRIDGE_S or 300)",
+    )
+    parser.add_argument("--no-bridge", action="store_true", help="Do not run the offline bridge")
+    parser.add_argument(
+        "--block-interval",
+        type=float,
+        default=_env_float("SHAGI_DAEMON_BLOCK_S", 0.0),
+        help="Seconds between in-process end-of-block runs; 0 disables (default: SHAGI_DAEMON_BLOCK_S or 0)",
+    )
+    parser.add_argument("--backend", choices=("auto", "inotify", "poll"), default="auto", help="Change-detection backend")
+    parser.add_argument("--interval", type=float, default=30.0, help="Polling interval when the watcher falls back to polling")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, help="Seconds of quiet before a burst of events is processed")
+    parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help="Health endpoint path")
+    parser.add_argument("--quiet", action="store_true", help="Suppress routine progress lines")
+    args = parser.parse_args(argv)
+
+    if args.health:
+        payload = _query(args.socket)
+        if payload is None:
+            print(f"[WARN] No exchange daemon answering on {args.socket}")
+            return 1
+        print(json.dumps(payload, indent=2))
+        return 0
+
+    daemon = ExchangeDaemon(
+        ROOT,
+        bridge_interval=0.0 if args.no_bridge else args.bridge_interval,
+        block_interval=args.block_interval,
+        backend=args.backend,
+        poll_interval=args.interval,
+        debounce=args.debounce,
+        socket_path=args.socket,
+        quiet=args.quiet,
+    )
+    try:
+        return asyncio.run(daemon.run_once() if args.once else daemon.run())
+    except KeyboardInterrupt:
+        return 130
+    except RuntimeError as exc:
+        print(f"[WARN] {exc}")
+        return 1
+
+
+__all__ = ["ExchangeDaemon", "HEALTH_SCHEMA", "SOCKET_PATH", "TaskHealth"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
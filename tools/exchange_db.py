@@ -0,0 +1,584 @@
+"""
+exchange_db.py — SQLite index of exchange artefacts and order lifecycle.
+
+The folder layout (orders/{pending,dispatched,completed},
+acknowledgements/{pending,logged}, reports/{inbox,archived}) is the source of
+truth; this database is a queryable view of it, kept current incrementally by
+the tools that move artefacts around:
+
+- exchange_receiver records the ack, report and dispatched order it writes;
+- offline_bridge.pull records every artefact it lands (tagged with the peer
+  front it came from);
+- ledger_update syncs the ledger's order paths after each update.
+
+Every writer is best effort: a locked or missing database prints a warning
+and never fails the caller. ``rebuild`` re-derives everything from the scan
+index when in doubt.
+
+Tables
+- artefacts(path, kind, state, order_id, schema, front, timestamp, ...)
+- orders(order_id, status, front, order/ack/report paths, issued_at,
+         acked_at, reported_at, updated_at)
+- transitions(order_id, from_status, to_status, at, source)
+
+Stored at logs/exchange.sqlite3 in WAL mode, so readers never block the
+cadence writers. Paths are relative to exchange/, like the ledger.
+
+CLI
+    python tools/exchange_db.py rebuild
+    python tools/exchange_db.py status
+    python tools/exchange_db.py orders --status acknowledged --since 24h
+    python tools/exchange_db.py unreported --since 24h
+    python tools/exchange_db.py history order-2025-10-01-001
+    python tools/exchange_db.py sql "SELECT status, COUNT(*) FROM orders GROUP BY status"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "logs" / "exchange.sqlite3"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS artefacts (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT,
+    order_id TEXT,
+    schema TEXT,
+    front TEXT,
+    timestamp TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    seen_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artefacts_order ON artefacts(order_id);
+CREATE INDEX IF NOT EXISTS artefacts_kind_state ON artefacts(kind, state);
+CREATE INDEX IF NOT EXISTS artefacts_schema ON artefacts(schema);
+CREATE INDEX IF NOT EXISTS artefacts_front ON artefacts(front);
+CREATE INDEX IF NOT EXISTS artefacts_timestamp ON artefacts(timestamp);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    front TEXT,
+    order_path TEXT,
+    ack_path TEXT,
+    report_path TEXT,
+    issued_at TEXT,
+    acked_at TEXT,
+    reported_at TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_status ON orders(status, updated_at);
+CREATE INDEX IF NOT EXISTS orders_front ON orders(front);
+CREATE INDEX IF NOT EXISTS orders_acked ON orders(acked_at);
+CREATE INDEX IF NOT EXISTS orders_reported ON orders(reported_at);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    from_status TEXT,
+    to_status TEXT NOT NULL,
+    at TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_order ON transitions(order_id, at);
+CREATE INDEX IF NOT EXISTS transitions_at ON transitions(at);
+"""
+
+# (kind, state) by folder prefix under exchange/
+LAYOUT: Tuple[Tuple[str, str, str], ...] = (
+    ("orders/pending/", "order", "pending"),
+    ("orders/dispatched/", "order", "dispatched"),
+    ("orders/completed/", "order", "completed"),
+    ("acknowledgements/pending/", "ack", "pending"),
+    ("acknowledgements/logged/", "ack", "logged"),
+    ("reports/inbox/", "report", "inbox"),
+    ("reports/archived/", "report", "archived"),
+)
+TIMESTAMP_FIELDS = (
+    "timestamp_sent",
+    "timestamp_submitted",
+    "timestamp_reported",
+    "timestamp_issued",
+    "ack_timestamp",
+    "issued_at",
+    "created_at",
+    "timestamp",
+)
+FRONT_FIELDS = ("sender", "origin", "workspace", "issued_by")
+_PATH_STAMPS = {"order_path": "issued_at", "ack_path": "acked_at", "report_path": "reported_at"}
+_ORDER_ID = re.compile(r"^(order-.+?)(?:-policy-update-report|-report|-ack|-result)?\.json$")
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def normalize_timestamp(raw: Any) -> Optional[str]:
+    """ISO-8601 in UTC with a ``Z`` suffix (so string order is time order), or None."""
+    if not isinstance(raw, str) or not raw.strip():
+        return None
+    try:
+        parsed = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def parse_since(raw: str) -> str:
+    """``24h`` / ``7d`` / ``30m`` relative to now, or an absolute ISO timestamp."""
+    match = re.fullmatch(r"(\d+)([smhd])", raw.strip())
+    if match:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[match.group(2)]
+        moment = datetime.now(timezone.utc) - timedelta(**{unit: int(match.group(1))})
+        return moment.replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    normalized = normalize_timestamp(raw)
+    if normalized is None:
+        raise ValueError(f"Cannot parse --since value {raw!r}")
+    return normalized
+
+
+def classify(rel: str) -> Tuple[str, Optional[str]]:
+    for prefix, kind, state in LAYOUT:
+        if rel.startswith(prefix):
+            return kind, state
+    return "other", None
+
+
+def order_id_for(rel: str, fields: Mapping[str, Any]) -> Optional[str]:
+    for key in ("order_id", "referenced_id"):
+        value = fields.get(key)
+        if isinstance(value, str) and value:
+            return value
+    match = _ORDER_ID.match(rel.rsplit("/", 1)[-1])
+    return match.group(1) if match else None
+
+
+def derive_status(order_path: Optional[str], ack_path: Optional[str], report_path: Optional[str]) -> str:
+    """Lifecycle status from artefact locations (extends the ledger_update rules)."""
+    order_path, ack_path, report_path = order_path or "", ack_path or "", report_path or ""
+    if (
+        order_path.startswith(("orders/completed/", "orders/dispatched/"))
+        and ack_path.startswith("acknowledgements/logged/")
+        and report_path.startswith("reports/archived/")
+    ):
+        return "closed"
+    if report_path:
+        return "received"
+    if ack_path:
+        return "acknowledged"
+    if order_path.startswith("orders/completed/"):
+        return "completed"
+    if order_path.startswith("orders/dispatched/"):
+        return "dispatched"
+    return "pending"
+
+
+def _timestamp_of(fields: Mapping[str, Any]) -> Optional[str]:
+    """First usable timestamp field of an artefact, normalized."""
+    return next((t for t in (normalize_timestamp(fields.get(k)) for k in TIMESTAMP_FIELDS) if t), None)
+
+
+class ExchangeDB:
+    def __init__(self, path: Path = DB_PATH, readonly: bool = False) -> None:
+        self.path = Path(path)
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{self.path.as_posix()}?mode=ro", uri=True, timeout=5.0)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), timeout=5.0)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA_SQL)
+        self.conn.row_factory = sqlite3.Row
+        self.log_transitions = True
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ExchangeDB":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: object) -> None:
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.close()
+
+    # -- writers ---------------------------------------------------------------
+
+    def record_artefact(
+        self,
+        rel: str,
+        fields: Optional[Mapping[str, Any]] = None,
+        *,
+        front: Optional[str] = None,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
+        source: str = "scan",
+    ) -> Optional[str]:
+        """Upsert one artefact (path relative to exchange/) and fold it into its order row."""
+        fields = fields or {}
+        kind, state = classify(rel)
+        order_id = order_id_for(rel, fields)
+        schema = fields.get("schema") if isinstance(fields.get("schema"), str) else None
+        if front is None:
+            front = next((fields[k] for k in FRONT_FIELDS if isinstance(fields.get(k), str) and fields[k]), None)
+        timestamp = _timestamp_of(fields)
+        now = utc_now()
+        self.conn.execute(
+            """
+            INSERT INTO artefacts (path, kind, state, order_id, schema, front, timestamp, size, mtime_ns, seen_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                kind=excluded.kind, state=excluded.state, order_id=excluded.order_id,
+                schema=excluded.schema, front=COALESCE(excluded.front, artefacts.front),
+                timestamp=excluded.timestamp, size=excluded.size, mtime_ns=excluded.mtime_ns,
+                seen_at=excluded.seen_at
+            """,
+            (rel, kind, state, order_id, schema, front, timestamp, size, mtime_ns, now),
+        )
+        if order_id and kind in ("order", "ack", "report"):
+            self._fold(order_id, kind, rel, timestamp or now, front, source)
+        return order_id
+
+    def remove_artefact(self, rel: str, source: str = "scan") -> None:
+        row = self.conn.execute("SELECT kind, order_id FROM artefacts WHERE path = ?", (rel,)).fetchone()
+        self.conn.execute("DELETE FROM artefacts WHERE path = ?", (rel,))
+        if row is None or not row["order_id"] or row["kind"] not in ("order", "ack", "report"):
+            return
+        column = f"{row['kind']}_path"
+        current = self.conn.execute(f"SELECT {column} FROM orders WHERE order_id = ?", (row["order_id"],)).fetchone()
+        if current is not None and current[0] == rel:
+            self.set_order_paths(row["order_id"], {column: None}, source=source)
+
+    def _fold(self, order_id: str, kind: str, rel: str, timestamp: str, front: Optional[str], source: str) -> None:
+        updates: Dict[str, Any] = {f"{kind}_path": rel}
+        stamps = {"order": "issued_at", "ack": "acked_at", "report": "reported_at"}
+        updates[stamps[kind]] = timestamp
+        self.set_order_paths(order_id, updates, front=front if kind == "order" else None, source=source)
+
+    def set_order_paths(
+        self, order_id: str, updates: Mapping[str, Any], *, front: Optional[str] = None, source: str = "scan"
+    ) -> Optional[str]:
+        """Apply path/timestamp updates to an order, re-derive its status and log any transition."""
+        row = self.conn.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        current: Dict[str, Any] = dict(row) if row is not None else {"order_id": order_id, "status": None}
+        for key, value in updates.items():
+            if key in _PATH_STAMPS:
+                current[key] = value
+                if value is None:
+                    current[_PATH_STAMPS[key]] = None
+            elif not current.get(key):
+                # Keep the first time an artefact was seen; later sightings do not move it.
+                current[key] = value
+        if front:
+            current["front"] = front
+        status = derive_status(current.get("order_path"), current.get("ack_path"), current.get("report_path"))
+        now = utc_now()
+        self.conn.execute(
+            """
+            INSERT INTO orders (order_id, status, front, order_path, ack_path, report_path,
+                                issued_at, acked_at, reported_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(order_id) DO UPDATE SET
+                status=excluded.status, front=excluded.front, order_path=excluded.order_path,
+                ack_path=excluded.ack_path, report_path=excluded.report_path, issued_at=excluded.issued_at,
+                acked_at=excluded.acked_at, reported_at=excluded.reported_at, updated_at=excluded.updated_at
+            """,
+            (
+                order_id,
+                status,
+                current.get("front"),
+                current.get("order_path"),
+                current.get("ack_path"),
+                current.get("report_path"),
+                current.get("issued_at"),
+                current.get("acked_at"),
+                current.get("reported_at"),
+                now if row is None or status != row["status"] else row["updated_at"],
+            ),
+        )
+        if self.log_transitions and (row is None or status != row["status"]):
+            self.conn.execute(
+                "INSERT INTO transitions (order_id, from_status, to_status, at, source) VALUES (?, ?, ?, ?, ?)",
+                (order_id, row["status"] if row is not None else None, status, now, source),
+            )
+        return status
+
+    def _artefact_timestamp(self, rel: str, exchange: Optional[Path]) -> str:
+        """The artefact's own timestamp: as recorded by ``record_artefact``, else read from
+        the file under ``exchange``; now only if neither has one.
+        """
+        row = self.conn.execute("SELECT timestamp FROM artefacts WHERE path = ?", (rel,)).fetchone()
+        if row is not None:
+            return row["timestamp"] or utc_now()
+        fields: Any = {}
+        if exchange is not None:
+            try:
+                fields = json.loads((exchange / rel).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+        return (_timestamp_of(fields) if isinstance(fields, dict) else None) or utc_now()
+
+    def sync_ledger(
+        self,
+        ledger_data: Mapping[str, Any],
+        order_ids: Optional[Iterable[str]] = None,
+        source: str = "ledger",
+        exchange: Optional[Path] = None,
+    ) -> int:
+        """Fold ledger order paths in (only ``order_ids`` if given); returns the number of orders changed.
+
+        ``acked_at``/``reported_at`` take the ack's/report's own timestamp; pass the
+        ``exchange`` folder so artefacts the database has not seen yet can be read.
+        """
+        changed = 0
+        orders = ledger_data.get("orders") or {}
+        for order_id in orders if order_ids is None else order_ids:
+            entry = orders.get(order_id)
+            if not isinstance(entry, dict):
+                continue
+            wanted = {k: entry.get(k) for k in ("order_path", "ack_path", "report_path") if entry.get(k)}
+            row = self.conn.execute(
+                "SELECT order_path, ack_path, report_path FROM orders WHERE order_id = ?", (order_id,)
+            ).fetchone()
+            if row is not None and all(row[k] == v for k, v in wanted.items()):
+                continue
+            updates: Dict[str, Any] = dict(wanted)
+            for path_key, stamp in (("ack_path", "acked_at"), ("report_path", "reported_at")):
+                if path_key in wanted and (row is None or not row[path_key]):
+                    updates[stamp] = self._artefact_timestamp(wanted[path_key], exchange)
+            self.set_order_paths(order_id, updates, source=source)
+            changed += 1
+        return changed
+
+    def rebuild(self, index: Any) -> int:
+        """Replace artefacts/orders with what the scan index sees under exchange/ (keeps transitions)."""
+        exchange = index.repo_root / "exchange"
+        previous = {r["order_id"]: r["status"] for r in self.conn.execute("SELECT order_id, status FROM orders")}
+        self.conn.execute("DELETE FROM artefacts")
+        self.conn.execute("DELETE FROM orders")
+        count = 0
+        self.log_transitions = False
+        try:
+            for record in index.files_in(exchange, recursive=True):
+                rel = record.path.relative_to(exchange).as_posix()
+                if classify(rel)[0] == "other":
+                    continue
+                fields = record.scalars if record.ok else {}
+                self.record_artefact(rel, fields, size=record.fingerprint[1], mtime_ns=record.fingerprint[2], source="rebuild")
+                count += 1
+        finally:
+            self.log_transitions = True
+        # One transition per order whose status actually moved across the rebuild.
+        now = utc_now()
+        for row in self.conn.execute("SELECT order_id, status FROM orders").fetchall():
+            before = previous.get(row["order_id"])
+            if before != row["status"]:
+                self.conn.execute(
+                    "INSERT INTO transitions (order_id, from_status, to_status, at, source) VALUES (?, ?, ?, ?, 'rebuild')",
+                    (row["order_id"], before, row["status"], now),
+                )
+        return count
+
+    # -- queries ---------------------------------------------------------------
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return self.conn.execute(sql, params).fetchall()
+
+    def status_counts(self) -> List[sqlite3.Row]:
+        return self.query("SELECT status, COUNT(*) AS orders FROM orders GROUP BY status ORDER BY status")
+
+    def orders(
+        self, status: Optional[str] = None, front: Optional[str] = None, since: Optional[str] = None
+    ) -> List[sqlite3.Row]:
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if front:
+            clauses.append("front = ?")
+            params.append(front)
+        if since:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(f"SELECT * FROM orders {where} ORDER BY updated_at DESC, order_id", params)
+
+    def unreported(self, since: Optional[str] = None) -> List[sqlite3.Row]:
+        """Orders acknowledged (optionally since ``since``) with no report yet."""
+        sql = "SELECT * FROM orders WHERE ack_path IS NOT NULL AND report_path IS NULL"
+        params: List[Any] = []
+        if since:
+            sql += " AND acked_at >= ?"
+            params.append(since)
+        return self.query(sql + " ORDER BY acked_at DESC", params)
+
+    def history(self, order_id: str) -> List[sqlite3.Row]:
+        return self.query(
+            "SELECT from_status, to_status, at, source FROM transitions WHERE order_id = ? ORDER BY id", (order_id,)
+        )
+
+
+@contextmanager
+def best_effort(action: str, path: Path = DB_PATH) -> Iterator[Optional[ExchangeDB]]:
+    """Open the DB for a writer that must never fail because of it; yields None on error."""
+    try:
+        db = ExchangeDB(path)
+    except sqlite3.Error as exc:
+        print(f"[WARN] exchange_db unavailable for {action}: {exc}")
+        yield None
+        return
+    try:
+        yield db
+        db.conn.commit()
+    except sqlite3.Error as exc:
+        db.conn.rollback()
+        print(f"[WARN] exchange_db {action} skipped: {exc}")
+    finally:
+        db.close()
+
+
+def record_paths(
+    repo_root: Path, paths: Iterable[Path], *, front: Optional[str] = None, source: str = "scan", db_path: Optional[Path] = None
+) -> int:
+    """Record/remove the given absolute paths (anything outside exchange/ is ignored)."""
+    exchange = repo_root / "exchange"
+    targets = sorted({Path(p) for p in paths})
+    if not targets:
+        return 0
+    count = 0
+    with best_effort(source, db_path or repo_root / "logs" / "exchange.sqlite3") as db:
+        if db is None:
+            return 0
+        for path in targets:
+            try:
+                rel = path.relative_to(exchange).as_posix()
+            except ValueError:
+                continue
+            if not rel.endswith(".json") or classify(rel)[0] == "other":
+                continue
+            if not path.exists():
+                db.remove_artefact(rel, source=source)
+                count += 1
+                continue
+            try:
+                st = path.stat()
+                fields = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                fields = {}
+                st = None
+            if not isinstance(fields, dict):
+                fields = {}
+            db.record_artefact(
+                rel,
+                fields,
+                front=front,
+                size=st.st_size if st else None,
+                mtime_ns=st.st_mtime_ns if st else None,
+                source=source,
+            )
+            count += 1
+    return count
+
+
+def _print_rows(rows: Sequence[sqlite3.Row], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps([dict(r) for r in rows], indent=2))
+        return
+    if not rows:
+        print("(no rows)")
+        return
+    columns = list(rows[0].keys())
+    widths = [max(len(c), *(len(str(r[c]) if r[c] is not None else "") for r in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join((str(r[c]) if r[c] is not None else "").ljust(w) for c, w in zip(columns, widths)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the SQLite exchange index")
+    parser.add_argument("--db", default=str(DB_PATH), help="Database path (default: logs/exchange.sqlite3)")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="Re-derive artefacts and orders from the exchange tree")
+    sub.add_parser("status", help="Order counts by status")
+    p_orders = sub.add_parser("orders", help="List orders")
+    p_orders.add_argument("--status")
+    p_orders.add_argument("--front")
+    p_orders.add_argument("--since", help="e.g. 24h, 7d or an ISO timestamp (matches updated_at)")
+    p_unrep = sub.add_parser("unreported", help="Orders acknowledged but not yet reported")
+    p_unrep.add_argument("--since", help="Only acks since e.g. 24h")
+    p_hist = sub.add_parser("history", help="Status transitions for one order")
+    p_hist.add_argument("order_id")
+    p_sql = sub.add_parser("sql", help="Run a read-only SQL query")
+    p_sql.add_argument("statement")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db)
+    if args.cmd == "rebuild":
+        from tools.exchange_index import get_index
+
+        index = get_index(ROOT)
+        with ExchangeDB(db_path) as db:
+            count = db.rebuild(index)
+        index.save()
+        print(f"[OK] Indexed {count} artefact(s) into {db_path}")
+        return 0
+
+    if not db_path.exists():
+        print(f"[WARN] No exchange database at {db_path}; run 'rebuild' first", file=sys.stderr)
+        return 1
+    db = ExchangeDB(db_path, readonly=True)
+    try:
+        since = parse_since(args.since) if getattr(args, "since", None) else None
+        if args.cmd == "status":
+            rows = db.status_counts()
+        elif args.cmd == "orders":
+            rows = db.orders(status=args.status, front=args.front, since=since)
+        elif args.cmd == "unreported":
+            rows = db.unreported(since=since)
+        elif args.cmd == "history":
+            rows = db.history(args.order_id)
+        else:
+            rows = db.query(args.statement)
+    except (sqlite3.Error, ValueError) as exc:
+        print(f"[WARN] {exc}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    _print_rows(rows, args.json)
+    return 0
+
+
+__all__ = [
+    "DB_PATH",
+    "ExchangeDB",
+    "best_effort",
+    "classify",
+    "derive_status",
+    "normalize_timestamp",
+    "record_paths",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,465 @@
+"""
+exchange_index.py — Shared scan service for exchange/ and outbox/.
+
+The watcher, contract runner, ledger updater, readiness check and
+exchange_all all need the same facts about the same JSON files. Instead of
+each tool globbing and ``json.load``-ing its own slice of the tree, they ask
+one ``ExchangeIndex``:
+
+- the tree is walked once per process (``get_index()`` is shared); callers
+  that only need the files they just wrote (a pull) can skip that walk with
+  ``get_index(refresh=False)`` and ``refresh_paths`` instead;
+- each ``*.json`` file becomes a ``Record`` with its (inode, size, mtime_ns)
+  fingerprint, parse status, the set of top-level keys with non-null values
+  and the top-level scalar fields (ids, schema, summary, timestamps...);
+- the full payload is parsed lazily, at most once per process, and only for
+  consumers that need more than the indexed fields;
+- the index is persisted to logs/exchange_index.json, so the next process
+  only stats files and re-parses the ones whose fingerprint changed;
+- each record keeps the file's sha256: a file whose size is unchanged but
+  whose inode/mtime moved (checkout, copy, touch) is re-hashed, and only
+  re-parsed if its content actually differs;
+- with ``workers > 1`` (``SHAGI_INDEX_WORKERS``), large batches of files to
+  parse (a cold index, a big pull) are parsed in a process pool.
+
+CLI
+    python tools/exchange_index.py            # refresh + save, print stats
+    python tools/exchange_index.py --rebuild  # ignore the persisted index
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_PATH = ROOT / "logs" / "exchange_index.json"
+INDEX_SCHEMA = "exchange-index@1.1"  # 1.1: records carry sha256
+DEFAULT_ROOTS = ("exchange", "outbox")
+PARALLEL_MIN = 256  # below this many files to parse, a process pool costs more than it saves
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_io import atomic_write_json, is_temp_name  # noqa: E402
+
+Fingerprint = Tuple[int, int, int]
+Scalar = Any  # str | int | float | bool
+
+_MISSING = object()
+
+
+def _fingerprint(st: os.stat_result) -> Fingerprint:
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def env_workers(default: int = 1) -> int:
+    raw = os.getenv("SHAGI_INDEX_WORKERS")
+    try:
+        return max(1, int(raw)) if raw else default
+    except ValueError:
+        return default
+
+
+@dataclass
+class Record:
+    path: Path
+    fingerprint: Fingerprint
+    ok: bool
+    error: Optional[str] = None
+    keys: FrozenSet[str] = frozenset()
+    scalars: Dict[str, Scalar] = field(default_factory=dict)
+    sha256: Optional[str] = None
+    _payload: Any = field(default=_MISSING, repr=False, compare=False)
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Top-level field; scalars come from the index, anything else from the payload."""
+        if key in self.scalars:
+            return self.scalars[key]
+        if key not in self.keys:
+            return default
+        payload = self.payload()
+        return payload.get(key, default) if isinstance(payload, dict) else default
+
+    def missing(self, fields: Iterable[str]) -> List[str]:
+        """Fields that are absent or null (``["invalid_json"]`` if the file does not parse)."""
+        if not self.ok:
+            return ["invalid_json"]
+        return [f for f in fields if f not in self.keys]
+
+    def payload(self) -> Any:
+        """Parsed JSON, loaded on first use; raises ValueError if the file does not parse."""
+        if self._payload is _MISSING:
+            with self.path.open("r", encoding="utf-8") as handle:
+                self._payload = json.load(handle)
+        return self._payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"fp": list(self.fingerprint), "ok": self.ok}
+        if self.error:
+            data["error"] = self.error
+        if self.keys:
+            data["keys"] = sorted(self.keys)
+        if self.scalars:
+            data["scalars"] = self.scalars
+        if self.sha256:
+            data["sha"] = self.sha256
+        return data
+
+    @classmethod
+    def from_dict(cls, path: Path, data: Mapping[str, Any]) -> "Record":
+        fp = data.get("fp") or (0, 0, 0)
+        return cls(
+            path=path,
+            fingerprint=(int(fp[0]), int(fp[1]), int(fp[2])),
+            ok=bool(data.get("ok")),
+            error=data.get("error"),
+            keys=frozenset(data.get("keys") or ()),
+            scalars=dict(data.get("scalars") or {}),
+            sha256=data.get("sha"),
+        )
+
+    @classmethod
+    def parse(cls, path: Path, fingerprint: Fingerprint) -> "Record":
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        try:
+            payload = json.loads(raw.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError) as exc:
+            return cls(path=path, fingerprint=fingerprint, ok=False, error=str(exc), sha256=digest)
+        keys: FrozenSet[str] = frozenset()
+        scalars: Dict[str, Scalar] = {}
+        if isinstance(payload, dict):
+            keys = frozenset(k for k, v in payload.items() if v is not None)
+            scalars = {k: v for k, v in payload.items() if isinstance(v, (str, int, float, bool))}
+        return cls(
+            path=path, fingerprint=fingerprint, ok=True, keys=keys, scalars=scalars, sha256=digest, _payload=payload
+        )
+
+
+def _parse_batch(batch: List[Tuple[Path, Fingerprint]]) -> List[Optional[Record]]:
+    """Process-pool worker: parse files without shipping payloads back (they stay lazy)."""
+    out: List[Optional[Record]] = []
+    for path, fingerprint in batch:
+        try:
+            record = Record.parse(path, fingerprint)
+        except OSError:
+            out.append(None)  # vanished between stat and read
+            continue
+        record._payload = None  # do not ship payloads back; they are re-read lazily
+        out.append(record)
+    return out
+
+
+class ExchangeIndex:
+    def __init__(
+        self,
+        repo_root: Path = ROOT,
+        index_path: Optional[Path] = INDEX_PATH,
+        roots: Iterable[str] = DEFAULT_ROOTS,
+        workers: int = 1,
+    ) -> None:
+        self.repo_root = Path(repo_root)
+        self.index_path = index_path
+        self.roots = [self.repo_root / r for r in roots]
+        self.workers = workers
+        self._dirs: Dict[Path, Dict[str, Record]] = {}
+        self.hits = 0
+        self.rehashed = 0
+        self.parsed = 0
+        self.removed = 0
+        self.dirty = False
+        self.walked = False  # every root reconciled with the disk at least once
+
+    # -- persistence -----------------------------------------------------------
+
+    @classmethod
+    def load(
+        cls,
+        repo_root: Path = ROOT,
+        index_path: Optional[Path] = INDEX_PATH,
+        roots: Iterable[str] = DEFAULT_ROOTS,
+        workers: int = 1,
+    ) -> "ExchangeIndex":
+        index = cls(repo_root, index_path, roots, workers)
+        if index_path is None:
+            return index
+        try:
+            data = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return index
+        if not isinstance(data, dict) or data.get("schema") != INDEX_SCHEMA:
+            return index
+        for rel, raw in (data.get("records") or {}).items():
+            if isinstance(raw, dict):
+                index._put(Record.from_dict(index.repo_root / rel, raw))
+        return index
+
+    def save(self, force: bool = False) -> bool:
+        if self.index_path is None or not (self.dirty or force):
+            return False
+        records = {self._rel(r.path): r.to_dict() for r in self.records()}
+        payload = {"schema": INDEX_SCHEMA, "roots": [self._rel(r) for r in self.roots], "records": records}
+        atomic_write_json(self.index_path, payload, indent=None, ensure_ascii=False)
+        self.dirty = False
+        return True
+
+    def _rel(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    # -- scanning ----------------------------------------------------------------
+
+    def _put(self, record: Record) -> None:
+        self._dirs.setdefault(record.path.parent, {})[record.path.name] = record
+
+    def _drop(self, path: Path) -> None:
+        bucket = self._dirs.get(path.parent)
+        if bucket and bucket.pop(path.name, None) is not None:
+            self.removed += 1
+            self.dirty = True
+            if not bucket:
+                del self._dirs[path.parent]
+
+    def _reuse(self, path: Path, st: os.stat_result) -> Optional[Record]:
+        """The known record if the file is unchanged (same fingerprint, or same size and sha256)."""
+        fingerprint = _fingerprint(st)
+        known = self._dirs.get(path.parent, {}).get(path.name)
+        if known is None:
+            return None
+        if known.fingerprint == fingerprint:
+            self.hits += 1
+            return known
+        if known.sha256 and known.fingerprint[1] == st.st_size and _sha256_file(path) == known.sha256:
+            known.fingerprint = fingerprint
+            self.rehashed += 1
+            self.dirty = True
+            return known
+        return None
+
+    def _observe(self, path: Path, st: os.stat_result) -> Record:
+        known = self._reuse(path, st)
+        if known is not None:
+            return known
+        record = Record.parse(path, _fingerprint(st))
+        self.parsed += 1
+        self.dirty = True
+        self._put(record)
+        return record
+
+    def _parse_parallel(self, todo: List[Tuple[Path, Fingerprint]]) -> List[Path]:
+        """Parse ``todo`` across ``self.workers`` processes; returns the paths indexed."""
+        size = max(16, len(todo) // (self.workers * 4))
+        batches = [todo[i : i + size] for i in range(0, len(todo), size)]
+        indexed: List[Path] = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for records in pool.map(_parse_batch, batches):
+                for record in records:
+                    if record is None:
+                        continue
+                    record._payload = _MISSING  # the sentinel does not survive pickling
+                    self._put(record)
+                    self.parsed += 1
+                    indexed.append(record.path)
+        if indexed:
+            self.dirty = True
+        return indexed
+
+    def _walk(self, top: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not name.startswith("."):
+                            stack.append(Path(entry.path))
+                    elif name.endswith(".json") and not is_temp_name(name) and entry.is_file():
+                        yield Path(entry.path), entry.stat()
+                except OSError:
+                    continue
+
+    def _covered(self, path: Path) -> bool:
+        return any(path == r or r in path.parents for r in self.roots)
+
+    def refresh(self, subtree: Optional[Path] = None) -> "ExchangeIndex":
+        """Walk ``subtree`` (default: every root) and reconcile records with what is on disk."""
+        tops = [subtree] if subtree is not None else self.roots
+        for top in tops:
+            seen = set()
+            todo: List[Tuple[Path, Fingerprint]] = []
+            for path, st in self._walk(top):
+                try:
+                    if self._reuse(path, st) is None:
+                        todo.append((path, _fingerprint(st)))
+                        continue
+                except OSError:
+                    continue  # vanished between stat and read
+                seen.add(path)
+            if self.workers > 1 and len(todo) >= PARALLEL_MIN:
+                seen.update(self._parse_parallel(todo))
+            else:
+                for path, fingerprint in todo:
+                    try:
+                        self._put(Record.parse(path, fingerprint))
+                    except OSError:
+                        continue
+                    self.parsed += 1
+                    self.dirty = True
+                    seen.add(path)
+            for directory in [d for d in self._dirs if d == top or top in d.parents]:
+                for name in list(self._dirs.get(directory, {})):
+                    if directory / name not in seen:
+                        self._drop(directory / name)
+        if subtree is None:
+            self.walked = True
+        return self
+
+    def refresh_paths(self, paths: Iterable[Path]) -> List[Path]:
+        """Re-stat specific files or directories (e.g. from fs events); returns paths whose record changed."""
+        changed: List[Path] = []
+        for raw in paths:
+            path = Path(raw)
+            if not self._covered(path):
+                continue
+            if path.is_dir():
+                before = {r.path: r.fingerprint for r in self.files_in(path, recursive=True)}
+                self.refresh(path)
+                after = {r.path: r.fingerprint for r in self.files_in(path, recursive=True)}
+                changed.extend(p for p in set(before) | set(after) if before.get(p) != after.get(p))
+                continue
+            if not path.name.endswith(".json") or is_temp_name(path.name):
+                continue
+            known = self.get(path)
+            try:
+                st = path.stat()
+            except OSError:
+                if known is not None:
+                    self._drop(path)
+                    changed.append(path)
+                continue
+            try:
+                record = self._observe(path, st)
+            except OSError:
+                continue
+            if record is not known:
+                changed.append(path)
+        return changed
+
+    # -- queries ---------------------------------------------------------------
+
+    def get(self, path: Path) -> Optional[Record]:
+        return self._dirs.get(path.parent, {}).get(path.name)
+
+    def records(self) -> Iterator[Record]:
+        for directory in sorted(self._dirs):
+            bucket = self._dirs[directory]
+            for name in sorted(bucket):
+                yield bucket[name]
+
+    def files_in(self, directory: Path, pattern: str = "*.json", recursive: bool = False) -> List[Record]:
+        """Records directly in ``directory`` (or anywhere below it) whose name matches ``pattern``."""
+        if recursive:
+            dirs = sorted(d for d in self._dirs if d == directory or directory in d.parents)
+        else:
+            dirs = [directory] if directory in self._dirs else []
+        out: List[Record] = []
+        for d in dirs:
+            bucket = self._dirs[d]
+            out.extend(bucket[name] for name in sorted(bucket) if fnmatch.fnmatchcase(name, pattern))
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._dirs.values())
+
+    def report(self) -> str:
+        seen = self.hits + self.rehashed + self.parsed
+        warm = (self.hits / seen * 100) if seen else 0.0
+        return (
+            f"[exchange-index] {len(self)} file(s): {self.hits} unchanged, {self.rehashed} re-hashed, "
+            f"{self.parsed} parsed, {self.removed} removed ({warm:.1f}% warm)"
+        )
+
+
+_SHARED: Dict[Path, ExchangeIndex] = {}
+
+
+def get_index(
+    repo_root: Path = ROOT, index_path: Optional[Path] = None, workers: Optional[int] = None, refresh: bool = True
+) -> ExchangeIndex:
+    """Process-wide index for ``repo_root``: loaded from disk and refreshed on first use only.
+
+    ``workers`` (default ``SHAGI_INDEX_WORKERS`` or 1) only applies to the call that creates it.
+    ``refresh=False`` returns the persisted records without walking the tree,
+    for callers that ``refresh_paths`` what they touched; a later call with
+    ``refresh=True`` still gets the full walk.
+    """
+    key = Path(repo_root).resolve()
+    index = _SHARED.get(key)
+    if index is None:
+        path = index_path if index_path is not None else key / "logs" / "exchange_index.json"
+        count = workers if workers is not None else env_workers()
+        index = _SHARED[key] = ExchangeIndex.load(key, path, workers=count)
+    if refresh and not index.walked:
+        index.refresh()
+    return index
+
+
+def save_shared() -> None:
+    """Persist every index ``get_index`` handed out in this process (no-op if untouched)."""
+    for index in _SHARED.values():
+        index.save()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Refresh the persistent exchange scan index")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the persisted index and re-parse every file")
+    parser.add_argument("--quiet", action="store_true", help="Suppress the stats line")
+    parser.add_argument("--workers", type=int, default=None, help="Parse processes for large batches (default: SHAGI_INDEX_WORKERS or 1)")
+    args = parser.parse_args(argv)
+
+    workers = args.workers if args.workers is not None else env_workers()
+    index = ExchangeIndex(ROOT, INDEX_PATH, workers=workers) if args.rebuild else ExchangeIndex.load(ROOT, INDEX_PATH, workers=workers)
+    index.refresh()
+    index.save(force=args.rebuild)
+    if not args.quiet:
+        print(index.report())
+    invalid = sum(1 for r in index.records() if not r.ok)
+    if invalid and not args.quiet:
+        print(f"[WARN] {invalid} file(s) do not parse as JSON")
+    return 0
+
+
+__all__ = ["ExchangeIndex", "INDEX_PATH", "Record", "env_workers", "get_index", "save_shared"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,475 @@
+"""
+exchange_io.py — Shared file-copy engine and atomic writes for the exchange.
+
+Per-file latency dominates on network or USB hubs, so copies fan out over a
+bounded thread pool. Parent directories are created once per run (not once
+per file), each file is retried with a short backoff, and an optional
+token-bucket cap keeps total throughput under a bytes/sec budget.
+
+Atomicity
+- Every write (``atomic_write_*`` and every engine copy) goes to a hidden
+  temp sibling ``.<name>.<pid>.<thread>.<seq>.tmp`` in the destination directory
+  and is renamed over the final path, so readers see either the old file or
+  the complete new one. Temp names never end in ``.json``, so validators
+  globbing ``*.json`` skip them; ``is_temp_name`` lets walkers do the same.
+- Durability (SHAGI_COPY_FSYNC): ``each`` fsyncs every file and its
+  directory; ``batch`` (default) stages a whole copy run, fsyncs the staged
+  temp files in parallel and their directories once, renames everything,
+  then fsyncs each directory once more; ``none`` only renames.
+
+Links
+- ``link_file`` places a reflink (copy-on-write clone) or hard link of an
+  immutable source, atomically; ``copy_many(pairs, link=True)`` tries the same
+  before falling back to a byte copy. Used to materialize content-addressed
+  hub blobs without moving bytes when source and destination share a
+  filesystem.
+
+Config
+- SHAGI_COPY_WORKERS   thread pool size (default 8)
+- SHAGI_COPY_BPS       aggregate bytes/sec cap (default: unlimited)
+- SHAGI_COPY_FSYNC     each | batch | none (default batch)
+
+Usage
+    engine = CopyEngine.from_env()
+    report = engine.copy_many([(src, dst), ...])
+    print(f"[OK] {report.summary()}")
+"""
+
+from __future__ import annotations
+
+import errno
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 2
+CHUNK_SIZE = 256 * 1024
+TEMP_SUFFIX = ".tmp"
+DURABILITY_MODES = ("each", "batch", "none")
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+# errnos meaning "this pair of filesystems cannot share data", not a transient failure
+_NO_LINK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY, errno.EMLINK}
+
+
+_TEMP_SEQ = itertools.count()
+
+
+def temp_path_for(path: Path) -> Path:
+    # The sequence number keeps two in-flight writes to the same path from one thread
+    # (e.g. two peers' copies of one file in a batch) from sharing a temp file.
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.{next(_TEMP_SEQ)}{TEMP_SUFFIX}")
+
+
+def is_temp_name(name: str) -> bool:
+    """True for in-flight temp files written by this module."""
+    return name.startswith(".") and name.endswith(TEMP_SUFFIX)
+
+
+def fsync_dir(path: Path) -> None:
+    """Persist directory entries (renames); a no-op where directories cannot be opened."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: bytes, *, fsync: bool = True, sync_dir: bool = False) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path_for(path)
+    try:
+        with tmp.open("wb") as handle:
+            handle.write(data)
+            if fsync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if sync_dir:
+        fsync_dir(path.parent)
+
+
+def atomic_write_text(path: Path, text: str, *, encoding: str = "utf-8", fsync: bool = True, sync_dir: bool = False) -> None:
+    atomic_write_bytes(path, text.encode(encoding), fsync=fsync, sync_dir=sync_dir)
+
+
+def atomic_write_json(
+    path: Path,
+    payload: Any,
+    *,
+    indent: Optional[int] = 2,
+    ensure_ascii: bool = True,
+    fsync: bool = True,
+    sync_dir: bool = False,
+) -> None:
+    """Serialize ``payload`` (with a trailing newline) and replace ``path`` atomically."""
+    text = json.dumps(payload, indent=indent, ensure_ascii=ensure_ascii) + "\n"
+    atomic_write_text(path, text, fsync=fsync, sync_dir=sync_dir)
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Clone ``src`` into a new ``dst`` sharing its data blocks (Btrfs, XFS, ...); False if unsupported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with src.open("rb") as fin, dst.open("xb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def link_file(src: Path, dst: Path, *, hardlink: bool = True) -> Optional[str]:
+    """Atomically make ``dst`` a reflink (else hard link) of ``src``.
+
+    Returns ``"reflink"``/``"hardlink"``, or None when neither works here (e.g.
+    different filesystems) so the caller can fall back to copying.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path_for(dst)
+    method: Optional[str] = None
+    if reflink(src, tmp):
+        method = "reflink"
+    elif hardlink:
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            return None
+    if method is None:
+        return None
+    try:
+        os.replace(tmp, dst)
+        if method == "hardlink":
+            tmp.unlink(missing_ok=True)  # rename() is a no-op if dst already links the same inode
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+    return method
+
+
+def _env_int(name: str) -> Optional[int]:
+    raw = os.getenv(name)
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        print(f"[WARN] Ignoring non-integer {name}={raw!r}")
+        return None
+    return value if value > 0 else None
+
+
+def _fsync_file(path: Path) -> None:
+    with path.open("rb+") as handle:
+        os.fsync(handle.fileno())
+
+
+class RateLimiter:
+    """Token bucket shared by all workers; ``acquire`` blocks until ``n`` bytes fit."""
+
+    def __init__(self, bytes_per_sec: int) -> None:
+        self.rate = float(bytes_per_sec)
+        self.capacity = max(float(bytes_per_sec), float(CHUNK_SIZE))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class CopyResult:
+    src: Path
+    dst: Path
+    ok: bool
+    size: int = 0
+    attempts: int = 1
+    error: Optional[str] = None
+    temp: Optional[Path] = None
+    method: str = "copy"
+
+
+@dataclass
+class CopyReport:
+    results: List[CopyResult] = field(default_factory=list)
+    elapsed_s: float = 0.0
+    workers: int = 1
+
+    @property
+    def copied(self) -> int:
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if not r.ok)
+
+    @property
+    def bytes(self) -> int:
+        return sum(r.size for r in self.results if r.ok)
+
+    @property
+    def linked(self) -> int:
+        return sum(1 for r in self.results if r.ok and r.method != "copy")
+
+    @property
+    def retries(self) -> int:
+        return sum(r.attempts - 1 for r in self.results)
+
+    def throughput_bps(self) -> float:
+        return self.bytes / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> str:
+        mib = self.bytes / (1024 * 1024)
+        rate = self.throughput_bps() / (1024 * 1024)
+        text = (
+            f"copied {self.copied} file(s), {mib:.2f} MiB in {self.elapsed_s:.2f}s "
+            f"({rate:.2f} MiB/s, {self.workers} worker(s))"
+        )
+        if self.linked:
+            text += f", {self.linked} linked"
+        if self.retries:
+            text += f", {self.retries} retr{'y' if self.retries == 1 else 'ies'}"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "files": self.copied,
+            "bytes": self.bytes,
+            "failed": self.failed,
+            "retries": self.retries,
+            "linked": self.linked,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "bytes_per_sec": round(self.throughput_bps(), 1),
+            "workers": self.workers,
+        }
+
+
+class CopyEngine:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_bps: Optional[int] = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff_s: float = 0.05,
+        durability: str = "batch",
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.limiter = RateLimiter(max_bps) if max_bps else None
+        self.durability = durability
+        self.retries = max(0, retries)
+        self.backoff_s = backoff_s
+        self._dirs: Set[Path] = set()
+        self._dirs_lock = threading.Lock()
+        # Cleared after the first "not supported here" failure of copy_many(link=True).
+        self._can_reflink = sys.platform.startswith("linux")
+        self._can_hardlink = True
+
+    @classmethod
+    def from_env(cls, workers: Optional[int] = None, max_bps: Optional[int] = None) -> "CopyEngine":
+        """Explicit arguments win over SHAGI_COPY_WORKERS / SHAGI_COPY_BPS."""
+        durability = (os.getenv("SHAGI_COPY_FSYNC") or "batch").strip().lower()
+        if durability not in DURABILITY_MODES:
+            print(f"[WARN] Ignoring unknown SHAGI_COPY_FSYNC={durability!r}")
+            durability = "batch"
+        return cls(
+            workers=workers or _env_int("SHAGI_COPY_WORKERS"),
+            max_bps=max_bps or _env_int("SHAGI_COPY_BPS"),
+            durability=durability,
+        )
+
+    def ensure_dir(self, path: Path) -> None:
+        with self._dirs_lock:
+            if path in self._dirs:
+                return
+        path.mkdir(parents=True, exist_ok=True)
+        with self._dirs_lock:
+            self._dirs.add(path)
+
+    def _copy_data(self, src: Path, tmp: Path) -> None:
+        if self.limiter is None:
+            shutil.copyfile(src, tmp)
+        else:
+            with src.open("rb") as fin, tmp.open("wb") as fout:
+                for chunk in iter(lambda: fin.read(CHUNK_SIZE), b""):
+                    self.limiter.acquire(len(chunk))
+                    fout.write(chunk)
+        if self.durability == "each":
+            _fsync_file(tmp)
+        shutil.copystat(src, tmp)
+
+    def _link(self, src: Path, tmp: Path) -> Optional[str]:
+        """Reflink or hard-link ``src`` to ``tmp``; remembers when the filesystems cannot."""
+        if self._can_reflink:
+            if reflink(src, tmp):
+                return "reflink"
+            if src.exists():
+                self._can_reflink = False  # this filesystem pair cannot clone; stop trying
+        if self._can_hardlink:
+            try:
+                os.link(src, tmp)
+                return "hardlink"
+            except OSError as e:
+                if e.errno in _NO_LINK_ERRNOS:
+                    self._can_hardlink = False
+        return None
+
+    def _stage(self, src: Path, dst: Path, link: bool = False) -> CopyResult:
+        """Copy ``src`` to a temp sibling of ``dst``; nothing is visible at ``dst`` yet."""
+        if link:
+            tmp = temp_path_for(dst)
+            try:
+                self.ensure_dir(dst.parent)
+                method = self._link(src, tmp)
+            except OSError:
+                method = None
+            if method is not None:
+                return CopyResult(src, dst, True, tmp.stat().st_size, 1, temp=tmp, method=method)
+        attempts = 0
+        while True:
+            attempts += 1
+            tmp = temp_path_for(dst)
+            try:
+                self.ensure_dir(dst.parent)
+                self._copy_data(src, tmp)
+                return CopyResult(src, dst, True, tmp.stat().st_size, attempts, temp=tmp)
+            except FileNotFoundError as e:
+                tmp.unlink(missing_ok=True)
+                # Source vanished (e.g. a peer moved it); retrying cannot help.
+                if not src.exists():
+                    return CopyResult(src, dst, False, 0, attempts, str(e))
+                with self._dirs_lock:
+                    self._dirs.discard(dst.parent)
+                error: OSError = e
+            except OSError as e:
+                tmp.unlink(missing_ok=True)
+                error = e
+            if attempts > self.retries:
+                return CopyResult(src, dst, False, 0, attempts, str(error))
+            time.sleep(self.backoff_s * attempts)
+
+    def _commit(self, result: CopyResult) -> None:
+        if not result.ok or result.temp is None:
+            return
+        try:
+            os.replace(result.temp, result.dst)
+            if result.method == "hardlink":
+                # rename() is a no-op when both names already link the same inode.
+                result.temp.unlink(missing_ok=True)
+        except OSError as e:
+            result.temp.unlink(missing_ok=True)
+            result.ok, result.error = False, str(e)
+        result.temp = None
+
+    @staticmethod
+    def _sync_staged(result: CopyResult) -> None:
+        try:
+            _fsync_file(result.temp)  # type: ignore[arg-type]
+        except OSError as e:
+            result.temp.unlink(missing_ok=True)  # type: ignore[union-attr]
+            result.ok, result.error, result.temp = False, f"fsync failed: {e}", None
+
+    def _flush_batch(self, staged: List[CopyResult], pool: Optional[ThreadPoolExecutor]) -> None:
+        """Make a staged batch durable before any rename: its temp files, then their directories.
+
+        Only this batch's files are flushed (not the whole system, as ``sync``
+        would). Hard links share the source inode, whose data is already on disk,
+        so only their directory entries need flushing.
+        """
+        pending = [r for r in staged if r.ok and r.temp is not None]
+        if not pending:
+            return
+        to_sync = [r for r in pending if r.method != "hardlink"]
+        if pool is not None:
+            list(pool.map(self._sync_staged, to_sync))
+        else:
+            for result in to_sync:
+                self._sync_staged(result)
+        for directory in sorted({r.temp.parent for r in pending if r.temp is not None}):
+            fsync_dir(directory)
+
+    def copy(self, src: Path, dst: Path) -> CopyResult:
+        result = self._stage(src, dst)
+        if result.ok and self.durability == "batch" and result.temp is not None:
+            _fsync_file(result.temp)
+        self._commit(result)
+        if result.ok and self.durability != "none":
+            fsync_dir(dst.parent)
+        return result
+
+    def copy_many(self, pairs: Iterable[Tuple[Path, Path]], *, link: bool = False) -> CopyReport:
+        """Copy ``(src, dst)`` pairs concurrently; results keep input order.
+
+        ``link=True`` is for immutable sources (content-addressed blobs): each
+        file is reflinked or hard-linked when the filesystems allow it and
+        copied otherwise.
+        """
+        jobs = list(pairs)
+        workers = min(self.workers, len(jobs)) or 1
+        start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exchange-io") if workers > 1 else None
+        try:
+            if pool is None:
+                results = [self._stage(src, dst, link) for src, dst in jobs]
+            else:
+                results = list(pool.map(lambda job: self._stage(job[0], job[1], link), jobs))
+            if self.durability == "batch":
+                self._flush_batch(results, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        for result in results:
+            self._commit(result)
+        if self.durability != "none":
+            for directory in sorted({r.dst.parent for r in results if r.ok}):
+                fsync_dir(directory)
+        return CopyReport(results=results, elapsed_s=time.perf_counter() - start, workers=workers)
+
+
+__all__ = [
+    "CopyEngine",
+    "CopyReport",
+    "CopyResult",
+    "RateLimiter",
+    "atomic_write_bytes",
+    "atomic_write_json",
+    "atomic_write_text",
+    "fsync_dir",
+    "is_temp_name",
+    "link_file",
+    "reflink",
+    "temp_path_for",
+]
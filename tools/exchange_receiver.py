@@ -14,6 +14,12 @@ from pathlib import Path
 from typing import Iterable, List
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from tools.exchange_db import record_paths  # noqa: E402
+from tools.exchange_io import atomic_write_json  # noqa: E402
+
 EXCHANGE_DIR = BASE_DIR / "exchange"
 ORDERS_PENDING_DIR = EXCHANGE_DIR / "orders" / "pending"
 ORDERS_DISPATCHED_DIR = EXCHANGE_DIR / "orders" / "dispatched"
@@ -69,10 +75,7 @@ def _load_order(order_path: Path) -> dict:
 
 
 def _write_json(path: Path, payload: dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-        handle.write("\n")
+    atomic_write_json(path, payload)
 
 
 def _ack_payload(order: dict) -> dict:
@@ -103,19 +106,24 @@ def _report_payload(order: dict) -> dict:
     }
 
 
-def _move_to_dispatched(order_path: Path) -> Path:
-    destination = ORDERS_DISPATCHED_DIR / order_path.name
+def _rebase(path: Path, base_dir: Path) -> Path:
+    """``path`` (one of the module's exchange folders) under another repo root."""
+    return path if base_dir == BASE_DIR else base_dir / path.relative_to(BASE_DIR)
+
+
+def _move_to_dispatched(order_path: Path, base_dir: Path = BASE_DIR) -> Path:
+    destination = _rebase(ORDERS_DISPATCHED_DIR, base_dir) / order_path.name
     destination.parent.mkdir(parents=True, exist_ok=True)
     order_path.replace(destination)
     return destination
 
 
-def _process_order(order_path: Path) -> str:
+def _process_order(order_path: Path, base_dir: Path = BASE_DIR) -> str:
     order = _load_order(order_path)
     order_id = order["order_id"]
 
-    ack_path = ACK_PENDING_DIR / f"{order_id}-ack.json"
-    report_path = REPORT_INBOX_DIR / f"{order_id}-report.json"
+    ack_path = _rebase(ACK_PENDING_DIR, base_dir) / f"{order_id}-ack.json"
+    report_path = _rebase(REPORT_INBOX_DIR, base_dir) / f"{order_id}-report.json"
 
     if ack_path.exists():
         raise OrderProcessingError(f"Acknowledgement already exists for {order_id}")
@@ -124,33 +132,35 @@ def _process_order(order_path: Path) -> str:
 
     _write_json(ack_path, _ack_payload(order))
     _write_json(report_path, _report_payload(order))
-    dispatched_path = _move_to_dispatched(order_path)
+    dispatched_path = _move_to_dispatched(order_path, base_dir)
+    record_paths(base_dir, [order_path, dispatched_path, ack_path, report_path], source="receiver")
 
     print(
-        f"Order {order_id} dispatched to {dispatched_path.relative_to(EXCHANGE_DIR)}.",
+        f"Order {order_id} dispatched to {dispatched_path.relative_to(_rebase(EXCHANGE_DIR, base_dir))}.",
         file=sys.stderr,
     )
 
     return order_id
 
 
-def _iter_orders(order_ids: Iterable[str] | None = None) -> List[Path]:
+def _iter_orders(order_ids: Iterable[str] | None = None, base_dir: Path = BASE_DIR) -> List[Path]:
+    pending_dir = _rebase(ORDERS_PENDING_DIR, base_dir)
     if order_ids:
         paths = []
         for order_id in order_ids:
-            candidate = ORDERS_PENDING_DIR / f"{order_id}.json"
+            candidate = pending_dir / f"{order_id}.json"
             if not candidate.exists():
                 raise OrderProcessingError(f"Order file {candidate.name} not found in pending queue")
             paths.append(candidate)
         return paths
 
-    return sorted(ORDERS_PENDING_DIR.glob("*.json"))
+    return sorted(pending_dir.glob("*.json"))
 
 
-def process_orders(order_ids: Iterable[str] | None = None) -> List[str]:
+def process_orders(order_ids: Iterable[str] | None = None, base_dir: Path = BASE_DIR) -> List[str]:
     processed: List[str] = []
-    for order_path in _iter_orders(order_ids):
-        processed.append(_process_order(order_path))
+    for order_path in _iter_orders(order_ids, base_dir):
+        processed.append(_process_order(order_path, base_dir))
     return processed
 
 
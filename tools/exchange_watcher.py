@@ -4,15 +4,25 @@ This watcher is meant to reduce manual polling of the exchange by
 recording the last-seen state and printing deltas for pending orders,
 pending acknowledgements, and inbox reports. It relies on the shared
 directory layout used by both High Command and field theatres.
+
+``--watch`` is event driven: on Linux it listens for inotify create, move
+and delete events (see tools/fs_events.py), debounces bursts, and re-parses
+only the files that changed. Elsewhere it falls back to stat-only polling
+every ``--interval`` seconds, still parsing only changed files.
+
+Scans read from the shared exchange index (tools/exchange_index.py): a
+file whose (inode, size, mtime_ns) is unchanged since the last indexed run
+is served from the indexed fields without being opened.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Mapping, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
 
 # Workspace root is the parent of the tools/ folder where this file lives
@@ -22,6 +32,13 @@ ROOT = Path(__file__).resolve().parents[1]
 EXCHANGE_ROOT = ROOT / "exchange"
 STATE_PATH = ROOT / "logs" / "exchange_watcher_state.json"
 
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_index import ExchangeIndex, Record, get_index  # noqa: E402
+from tools.exchange_io import atomic_write_json, is_temp_name  # noqa: E402
+from tools.fs_events import DEFAULT_DEBOUNCE, open_watcher  # noqa: E402
+
 
 class ExchangeWatcherError(RuntimeError):
     """Raised when the watcher cannot recover from an error."""
@@ -48,7 +65,6 @@ class Entry:
 
 Snapshot = Dict[str, Dict[str, Mapping[str, str]]]
 
-
 CATEGORIES = {
     "orders_pending": {
         "path": EXCHANGE_ROOT / "orders" / "pending",
@@ -83,45 +99,101 @@ def load_snapshot(path: Path = STATE_PATH) -> Snapshot:
 
 
 def save_snapshot(snapshot: Snapshot, path: Path = STATE_PATH) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
     payload: Dict[str, Dict[str, Mapping[str, str]]] = {
         name: dict(entries) for name, entries in snapshot.items()
     }
-    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    atomic_write_json(path, payload)
 
 
-def scan_category(category_name: str) -> Dict[str, Mapping[str, str]]:
+def entry_from_record(category_name: str, record: Record) -> Tuple[str, Mapping[str, str]]:
     config = CATEGORIES[category_name]
-    root = config["path"]
+    candidate = record.path
+    if not record.ok:
+        identifier = candidate.stem
+        return identifier, {
+            "id": identifier,
+            "path": str(candidate),
+            "summary": "<unreadable>",
+        }
+    identifier = str(record.get(config["id_field"], candidate.stem))
+    summary = record.get(config["summary_field"]) or None
+    timestamp = record.get(config["timestamp_field"]) or None
+    entry = Entry(identifier=identifier, path=candidate, summary=summary, timestamp=timestamp)
+    return identifier, dict(entry.to_snapshot())
+
+
+def scan_file(category_name: str, candidate: Path, index: Optional[ExchangeIndex] = None) -> Tuple[str, Mapping[str, str]]:
+    index = index or get_index(ROOT)
+    index.refresh_paths([candidate])
+    record = index.get(candidate)
+    if record is None:
+        raise FileNotFoundError(candidate)
+    return entry_from_record(category_name, record)
+
+
+def scan_category(category_name: str, index: Optional[ExchangeIndex] = None) -> Dict[str, Mapping[str, str]]:
+    index = index or get_index(ROOT)
     results: Dict[str, Mapping[str, str]] = {}
-    if not root.exists():
-        return results
-    for candidate in sorted(root.glob("*.json")):
-        try:
-            data = json.loads(candidate.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            identifier = candidate.stem
-            results[identifier] = {
-                "id": identifier,
-                "path": str(candidate),
-                "summary": "<unreadable>",
-            }
-            continue
-        identifier = str(data.get(config["id_field"], candidate.stem))
-        summary = data.get(config["summary_field"]) or None
-        timestamp = data.get(config["timestamp_field"]) or None
-        entry = Entry(identifier=identifier, path=candidate, summary=summary, timestamp=timestamp)
-        results[identifier] = dict(entry.to_snapshot())
+    for record in index.files_in(CATEGORIES[category_name]["path"]):
+        identifier, info = entry_from_record(category_name, record)
+        results[identifier] = info
     return results
 
 
-def collect_snapshot() -> Snapshot:
+def collect_snapshot(index: Optional[ExchangeIndex] = None) -> Snapshot:
     snapshot: Snapshot = {}
     for category in CATEGORIES.keys():
-        snapshot[category] = scan_category(category)
+        snapshot[category] = scan_category(category, index)
     return snapshot
 
 
+def _category_for(path: Path) -> Optional[str]:
+    for name, config in CATEGORIES.items():
+        if path == config["path"] or path.parent == config["path"]:
+            return name
+    return None
+
+
+def apply_file_changes(
+    snapshot: Snapshot, changed_paths: Iterable[Path], index: Optional[ExchangeIndex] = None
+) -> Snapshot:
+    """Return a copy of ``snapshot`` updated for ``changed_paths`` only.
+
+    A path naming a category directory rescans that category; any other path
+    is re-indexed if it still exists and dropped from the snapshot otherwise.
+    """
+    index = index or get_index(ROOT)
+    changed_paths = sorted(set(changed_paths))
+    index.refresh_paths(changed_paths)
+    updated: Snapshot = {name: dict(snapshot.get(name, {})) for name in CATEGORIES.keys()}
+    by_path: Dict[str, Dict[str, str]] = {name: {} for name in CATEGORIES.keys()}
+    for name, entries in updated.items():
+        for identifier, info in entries.items():
+            by_path[name][str(info.get("path"))] = identifier
+
+    for path in changed_paths:
+        category = _category_for(path)
+        if category is None:
+            continue
+        if path == CATEGORIES[category]["path"]:
+            updated[category] = scan_category(category, index)
+            by_path[category] = {str(info.get("path")): ident for ident, info in updated[category].items()}
+            continue
+        if path.suffix != ".json" or is_temp_name(path.name):
+            continue
+        key = str(path)
+        previous_id = by_path[category].pop(key, None)
+        if previous_id is not None:
+            updated[category].pop(previous_id, None)
+        record = index.get(path)
+        if record is None:
+            continue
+        identifier, info = entry_from_record(category, record)
+        updated[category][identifier] = info
+        by_path[category][key] = identifier
+    return updated
+
+
 def compute_changes(previous: Snapshot, current: Snapshot) -> Dict[str, Dict[str, List[str]]]:
     changes: Dict[str, Dict[str, List[str]]] = {}
     for category in CATEGORIES.keys():
@@ -166,11 +238,12 @@ def render_changes(changes: Dict[str, Dict[str, List[str]]], snapshot: Snapshot,
     return emitted
 
 
-def process_once(quiet: bool = False) -> None:
+def process_once(quiet: bool = False, reset: bool = False, index: Optional[ExchangeIndex] = None) -> Snapshot:
     if not EXCHANGE_ROOT.exists():
         raise ExchangeWatcherError(f"Exchange directory missing at {EXCHANGE_ROOT}")
-    previous = load_snapshot() if not args.reset else {name: {} for name in CATEGORIES.keys()}  # type: ignore[name-defined]
-    current = collect_snapshot()
+    previous = load_snapshot() if not reset else {name: {} for name in CATEGORIES.keys()}
+    index = index or get_index(ROOT)
+    current = collect_snapshot(index)
     changes = compute_changes(previous, current)
     emitted = render_changes(changes, current, quiet=quiet)
     if emitted == 0 and not STATE_PATH.exists():
@@ -181,32 +254,68 @@ def process_once(quiet: bool = False) -> None:
             print(f"[exchange] Current {label.lower()}:")
             for identifier, info in data.items():
                 print(f"  - {format_entry(identifier, info)}")
-    save_snapshot(current)
+    if reset or current != previous or not STATE_PATH.exists():
+        save_snapshot(current)
+    index.save()
+    if not quiet:
+        print(index.report())
+    return current
+
+
+def process_changes(
+    previous: Snapshot, changed_paths: Iterable[Path], quiet: bool = True, index: Optional[ExchangeIndex] = None
+) -> Snapshot:
+    """Apply one batch of file events; state is rewritten only when something changed."""
+    index = index or get_index(ROOT)
+    current = apply_file_changes(previous, changed_paths, index)
+    if current != previous:
+        render_changes(compute_changes(previous, current), current, quiet=quiet)
+        save_snapshot(current)
+    index.save()
+    return current
+
+
+def watch(interval: float, quiet: bool, reset: bool, backend: str = "auto", debounce: float = DEFAULT_DEBOUNCE) -> None:
+    index = get_index(ROOT)
+    snapshot = process_once(quiet=quiet, reset=reset, index=index)
+    directories = [config["path"] for config in CATEGORIES.values()]
+    with open_watcher(directories, backend=backend, interval=interval, debounce=debounce) as watcher:
+        if not quiet:
+            print(f"[exchange] Watching {len(directories)} queue(s) via {watcher.backend}")
+        while True:
+            changed = watcher.wait()
+            if changed:
+                snapshot = process_changes(snapshot, changed, quiet=quiet, index=index)
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Surface new exchange artefacts")
-    parser.add_argument("--watch", action="store_true", help="Poll continuously for changes")
-    parser.add_argument("--interval", type=float, default=30.0, help="Polling interval when --watch is enabled")
+    parser.add_argument("--watch", action="store_true", help="Watch continuously for changes")
+    parser.add_argument("--interval", type=float, default=30.0, help="Polling interval when --watch falls back to polling")
+    parser.add_argument(
+        "--backend",
+        choices=("auto", "inotify", "poll"),
+        default="auto",
+        help="Change-detection backend for --watch (auto prefers inotify)",
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEFAULT_DEBOUNCE, help="Seconds of quiet before a burst of events is processed"
+    )
     parser.add_argument("--quiet", action="store_true", help="Suppress \"no changes\" messages")
     parser.add_argument("--reset", action="store_true", help="Clear the stored watcher state before running")
     return parser
 
 
 def main(argv: Optional[Iterable[str]] = None) -> int:
-    global args
     parser = build_parser()
     args = parser.parse_args(argv)
     if args.watch:
-        import time
         try:
-            while True:
-                process_once(quiet=args.quiet)
-                time.sleep(args.interval)
+            watch(args.interval, args.quiet, args.reset, backend=args.backend, debounce=args.debounce)
         except KeyboardInterrupt:
             return 130
     else:
-        process_once(quiet=args.quiet)
+        process_once(quiet=args.quiet, reset=args.reset)
     return 0
 
 
@@ -19,6 +19,8 @@ from typing import Iterable, List, Tuple
 
 from tools.emoji_translator import (
     FACTORY_ORDER_SCHEMA,
+    GlyphIndex,
+    lexicon_cache_stats,
     load_lexicon,
     validate_factory_order,
 )
@@ -39,7 +41,7 @@ def load_payload(path: Path) -> dict:
         raise ValueError(f"{path.name}: Invalid JSON ({exc})") from exc
 
 
-def validate_payload(path: Path, payload: dict) -> Tuple[List[str], List[str]]:
+def validate_payload(path: Path, payload: dict, lexicon: GlyphIndex | None = None) -> Tuple[List[str], List[str]]:
     errors_schema: List[str] = []
     errors_dq: List[str] = []
 
@@ -47,8 +49,7 @@ def validate_payload(path: Path, payload: dict) -> Tuple[List[str], List[str]]:
     if schema != FACTORY_ORDER_SCHEMA:
         errors_schema.append(f"Expected schema '{FACTORY_ORDER_SCHEMA}', got '{schema}'")
 
-    lexicon = load_lexicon()
-    result = validate_factory_order(payload, lexicon)
+    result = validate_factory_order(payload, lexicon or load_lexicon())
     errors_schema.extend(result["schema_errors"])
     errors_dq.extend(result["dq_errors"])
 
@@ -96,6 +97,7 @@ def main(argv: List[str] | None = None) -> int:
         f"[{timestamp}] Monitoring run for {sample_root} — {len(payloads)} payload(s)"
     ]
 
+    lexicon = load_lexicon()
     failures = 0
     for payload_path in payloads:
         try:
@@ -105,7 +107,7 @@ def main(argv: List[str] | None = None) -> int:
             failures += 1
             continue
 
-        schema_errors, dq_errors = validate_payload(payload_path, payload)
+        schema_errors, dq_errors = validate_payload(payload_path, payload, lexicon)
         if schema_errors or dq_errors:
             failures += 1
             log_lines.append(f"  [FAIL] {payload_path.name}")
@@ -117,6 +119,10 @@ def main(argv: List[str] | None = None) -> int:
             log_lines.append(f"  [OK] {payload_path.name} ({payload.get('summary')})")
 
     status = "OK" if failures == 0 else "FAIL"
+    cache = lexicon_cache_stats()
+    log_lines.append(
+        f"  lexicon cache: hits={cache['hits']}, misses={cache['misses']}, reloads={cache['reloads']}"
+    )
     log_lines.append(f"[{timestamp}] Monitoring complete — status={status}, failures={failures}")
     write_log(log_path, log_lines)
 
@@ -0,0 +1,240 @@
+"""
+fs_events.py — Directory change notifications for the exchange tools.
+
+Two backends share one interface, ``wait(timeout) -> set of changed paths``:
+
+- ``InotifyWatcher``: Linux inotify through ctypes (no third-party deps).
+  Reacts to create / close-after-write / move / delete within milliseconds.
+- ``PollingWatcher``: stat-only rescans (``os.scandir``) every ``interval``
+  seconds; used wherever inotify is unavailable (Windows, macOS, some
+  network mounts) or when explicitly requested.
+
+Bursts are debounced: after the first event, changes keep accumulating until
+the directories have been quiet for ``debounce`` seconds (capped at
+``max_delay``), so a pull landing fifty files yields one wakeup.
+
+A returned path equal to one of the watched directories means "rescan this
+directory" (the kernel queue overflowed, or the directory itself appeared).
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+_EVENT = struct.Struct("iIII")
+
+DEFAULT_DEBOUNCE = 0.2
+
+
+class PollingWatcher:
+    backend = "poll"
+
+    def __init__(self, directories: Iterable[Path], interval: float = 30.0, debounce: float = DEFAULT_DEBOUNCE) -> None:
+        self.directories = [Path(d) for d in directories]
+        self.interval = interval
+        self.debounce = debounce
+        self._state: Dict[Path, Tuple[int, int]] = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        state: Dict[Path, Tuple[int, int]] = {}
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                st = entry.stat()
+                                state[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return state
+
+    def poll(self) -> Set[Path]:
+        current = self._scan()
+        previous, self._state = self._state, current
+        changed = {p for p, sig in current.items() if previous.get(p) != sig}
+        changed.update(p for p in previous if p not in current)
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return self.poll()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PollingWatcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class InotifyWatcher:
+    backend = "inotify"
+
+    def __init__(
+        self,
+        directories: Iterable[Path],
+        interval: float = 30.0,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.directories = [Path(d) for d in directories]
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay if max_delay is not None else max(1.0, debounce * 10)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._fd = fd
+        self._wds: Dict[int, Path] = {}
+        self._missing: List[Path] = []
+        for directory in self.directories:
+            if not self._add(directory):
+                self._missing.append(directory)
+
+    def _add(self, directory: Path) -> bool:
+        if not directory.is_dir():
+            return False
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._wds[wd] = directory
+        return True
+
+    def _recheck_missing(self) -> Set[Path]:
+        appeared = {d for d in self._missing if self._add(d)}
+        self._missing = [d for d in self._missing if d not in appeared]
+        return appeared
+
+    def _read(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            if not buf:
+                return changed
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                name = buf[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self._wds.values())
+                    continue
+                directory = self._wds.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # Directory went away: forget the watch and pick it up again if it returns.
+                    self._wds.pop(wd, None)
+                    if directory not in self._missing:
+                        self._missing.append(directory)
+                    changed.add(directory)
+                    continue
+                if name:
+                    changed.add(directory / os.fsdecode(name))
+
+    def _readable(self, timeout: Optional[float]) -> bool:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        return bool(ready)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Block until something changes (or ``timeout``/``interval`` elapses), then debounce."""
+        limit = self.interval if timeout is None else timeout
+        changed = self._recheck_missing()
+        if not changed and not self._readable(limit):
+            return self._recheck_missing()
+        start = time.monotonic()
+        changed |= self._read()
+        while time.monotonic() - start < self.max_delay:
+            remaining = self.max_delay - (time.monotonic() - start)
+            if not self._readable(min(self.debounce, remaining)):
+                break
+            changed |= self._read()
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def inotify_available() -> bool:
+    return _load_libc() is not None
+
+
+def open_watcher(
+    directories: Iterable[Path],
+    *,
+    backend: str = "auto",
+    interval: float = 30.0,
+    debounce: float = DEFAULT_DEBOUNCE,
+):
+    """Return an inotify watcher when possible (``auto``/``inotify``), else a polling one."""
+    directories = list(directories)
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(directories, interval=interval, debounce=debounce)
+        except OSError as exc:
+            if backend == "inotify":
+                raise
+            print(f"[INFO] inotify unavailable ({exc}); polling every {interval:g}s")
+    return PollingWatcher(directories, interval=interval, debounce=debounce)
+
+
+__all__ = ["InotifyWatcher", "PollingWatcher", "inotify_available", "open_watcher"]
@@ -0,0 +1,577 @@
+"""
+ledger_store.py — Append-only, sharded storage for the exchange ledger.
+
+Layout
+The store is per-front state under logs/ledger/ (ignored by git):
+- journal.jsonl        header line ``{"schema", "generation"}`` followed by one
+                       line per change: ``{"at", "section", "key", "value"}``
+                       (``section`` is orders / reports / acks; a null value
+                       deletes the key). Order entries carry their status, so
+                       the journal doubles as a log of status transitions.
+- shards/<YYYY-MM>.json  compacted snapshots, one per order month (taken from
+                       the order id; anything else lands in ``misc``).
+- .index.base.json     exchange/ledger/index.json as this clone last wrote
+                       or imported it.
+- .ledger.lock         advisory lock for the files above.
+
+exchange/ledger/index.json, the legacy single-file ledger, is the only file
+shared with other fronts (through the exchange submodule). It is a
+materialized view of the store (``materialize``) for readers such as
+tools/validate_ledger.ps1. Fronts never share journals, so their appends
+cannot conflict; they exchange ledger state only through index.json.
+
+Writes append only the changed keys, so they cost O(changes). Once the
+journal grows past SHAGI_LEDGER_COMPACT_LINES lines (default 1000) it is
+folded into the shards it touches and restarted with the next generation.
+
+Concurrency: appends and compaction hold an exclusive lock on
+``.ledger.lock``; reads hold it shared. Shards are loaded lazily, and a reader
+that notices a newer journal generation re-reads the journal before using a
+shard, so concurrent tools never clobber or half-see each other's changes.
+
+On first use, an existing index.json with no journal or shards is imported
+as the initial snapshot. Other fronts may edit index.json: whenever its size
+or mtime no longer matches the base copy, the edits (index.json diffed
+against the base) are merged into the journal before anything rewrites the
+view. A store left in exchange/ledger/ by an earlier layout is moved to
+logs/ledger/ on first use.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+    import msvcrt  # type: ignore
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_io import atomic_write_bytes, atomic_write_json, atomic_write_text  # noqa: E402
+
+JOURNAL_NAME = "journal.jsonl"
+SHARDS_DIR = "shards"
+VIEW_NAME = "index.json"
+VIEW_BASE_NAME = ".index.base.json"
+LOCK_NAME = ".ledger.lock"
+JOURNAL_SCHEMA = "ledger-journal@1.0"
+SHARD_SCHEMA = "ledger-shard@1.0"
+SECTIONS = ("orders", "reports", "acks")
+DEFAULT_COMPACT_LINES = 1000
+
+_MONTH = re.compile(r"^order-(\d{4})-(\d{2})-")
+
+Key = Tuple[str, str]  # (section, key)
+
+
+def ledger_dir(repo_root: Path) -> Path:
+    """Shared folder holding the index.json view."""
+    return repo_root / "exchange" / "ledger"
+
+
+def store_dir(repo_root: Path) -> Path:
+    """This front's journal, shards and local state."""
+    return repo_root / "logs" / "ledger"
+
+
+def shard_for(key: str) -> str:
+    """Shard name for a ledger key (``order-2025-10-...`` -> ``2025-10``)."""
+    match = _MONTH.match(key)
+    return f"{match.group(1)}-{match.group(2)}" if match else "misc"
+
+
+def _compact_threshold() -> int:
+    raw = os.getenv("SHAGI_LEDGER_COMPACT_LINES")
+    try:
+        return max(1, int(raw)) if raw else DEFAULT_COMPACT_LINES
+    except ValueError:
+        print(f"[WARN] Ignoring non-integer SHAGI_LEDGER_COMPACT_LINES={raw!r}")
+        return DEFAULT_COMPACT_LINES
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def _empty() -> Dict[str, Dict[str, Any]]:
+    return {section: {} for section in SECTIONS}
+
+
+def _parse_view(raw: bytes) -> Dict[str, Any]:
+    """Parse an index.json payload (every top-level key, in file order)."""
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("not a JSON object")
+    return data
+
+
+def _sections(raw: bytes) -> Dict[str, Dict[str, Any]]:
+    """The ledger sections of an index.json payload."""
+    return _view_sections(_parse_view(raw))
+
+
+def _view_sections(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {section: dict(data.get(section) or {}) for section in SECTIONS}
+
+
+@contextmanager
+def ledger_lock(directory: Path, shared: bool = False) -> Iterator[None]:
+    """Advisory lock on the ledger directory (shared for readers; exclusive on Windows)."""
+    if shared and not directory.is_dir():
+        yield  # nothing to read yet; do not create the directory just to lock it
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(directory / LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+class Ledger:
+    """Lazily loaded ledger view; ``set`` stages changes and ``save`` appends them to the journal."""
+
+    def __init__(self, directory: Path, blank: bool = False, view_path: Optional[Path] = None) -> None:
+        self.directory = Path(directory)  # the store (see store_dir)
+        self.journal_path = self.directory / JOURNAL_NAME
+        self.shards_path = self.directory / SHARDS_DIR
+        self.view_path = Path(view_path) if view_path is not None else self.directory / VIEW_NAME
+        self.base_path = self.directory / VIEW_BASE_NAME
+        self.blank = blank  # start from nothing; save() replaces everything (full rebuild)
+        self.generation = 0
+        self.journal_lines = 0
+        self._journal: Dict[str, Dict[Key, Any]] = {}
+        self._shards: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pending: Dict[Key, Any] = {}
+        if not blank:
+            with ledger_lock(self.directory, shared=True):
+                self._read_journal()
+
+    # -- reading ---------------------------------------------------------------
+
+    def _journal_generation(self) -> int:
+        try:
+            with self.journal_path.open("r", encoding="utf-8") as handle:
+                header = json.loads(handle.readline() or "{}")
+        except (OSError, ValueError):
+            return 0
+        return int(header.get("generation", 0)) if isinstance(header, dict) else 0
+
+    def _read_journal(self) -> None:
+        """Parse the journal into per-shard overlays (caller holds the lock)."""
+        self._journal = {}
+        self._shards = {}
+        self.generation = 0
+        self.journal_lines = 0
+        try:
+            handle = self.journal_path.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with handle:
+            for number, line in enumerate(handle):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    print(f"[WARN] Skipping unreadable ledger journal line {number + 1}")
+                    continue
+                if number == 0 and item.get("schema") == JOURNAL_SCHEMA:
+                    self.generation = int(item.get("generation", 0))
+                    continue
+                section, key = item.get("section"), item.get("key")
+                if section not in SECTIONS or not isinstance(key, str):
+                    continue
+                self._journal.setdefault(shard_for(key), {})[(section, key)] = item.get("value")
+                self.journal_lines += 1
+
+    def _read_shard_file(self, name: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads((self.shards_path / f"{name}.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return _empty()
+        except ValueError as exc:
+            raise ValueError(f"Corrupt ledger shard {name}.json: {exc}") from exc
+        return {section: dict(data.get(section) or {}) for section in SECTIONS}
+
+    def _shard(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """Shard snapshot with journal changes applied, loaded on first use."""
+        shard = self._shards.get(name)
+        if shard is not None:
+            return shard
+        if self.blank:
+            shard = self._shards[name] = _empty()
+            return shard
+        with ledger_lock(self.directory, shared=True):
+            if self._journal_generation() != self.generation:
+                # Compacted since we read the journal: start over from the new generation.
+                self._read_journal()
+            shard = self._read_shard_file(name)
+        for (section, key), value in self._journal.get(name, {}).items():
+            if value is None:
+                shard[section].pop(key, None)
+            else:
+                shard[section][key] = value
+        self._shards[name] = shard
+        return shard
+
+    def shard_names(self) -> List[str]:
+        names = {p.stem for p in self.shards_path.glob("*.json")} if not self.blank else set()
+        names.update(self._journal)
+        names.update(shard_for(key) for _, key in self._pending)
+        return sorted(names)
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        """Current value (including staged changes); treat it as read-only and use ``set``."""
+        if (section, key) in self._pending:
+            value = self._pending[(section, key)]
+            return default if value is None else value
+        return self._shard(shard_for(key))[section].get(key, default)
+
+    def section(self, section: str) -> Dict[str, Any]:
+        """Every entry of one section (loads all shards)."""
+        out: Dict[str, Any] = {}
+        for name in self.shard_names():
+            out.update(self._shard(name)[section])
+        for (sec, key), value in self._pending.items():
+            if sec != section:
+                continue
+            if value is None:
+                out.pop(key, None)
+            else:
+                out[key] = value
+        return dict(sorted(out.items()))
+
+    @property
+    def orders(self) -> Dict[str, Any]:
+        return self.section("orders")
+
+    @property
+    def reports(self) -> Dict[str, Any]:
+        return self.section("reports")
+
+    @property
+    def acks(self) -> Dict[str, Any]:
+        return self.section("acks")
+
+    @property
+    def data(self) -> Dict[str, Dict[str, Any]]:
+        """The whole ledger in the legacy index.json shape."""
+        return {section: self.section(section) for section in SECTIONS}
+
+    # -- writing ---------------------------------------------------------------
+
+    def set(self, section: str, key: str, value: Any) -> int:
+        """Stage a change; returns 1 if it differs from the current value, else 0."""
+        if self.get(section, key) == value:
+            return 0
+        self._pending[(section, key)] = value
+        return 1
+
+    @property
+    def pending(self) -> Dict[Key, Any]:
+        return dict(self._pending)
+
+    def save(self) -> int:
+        """Append staged changes to the journal (compacting if it is long); returns the count."""
+        if self.blank:
+            count = len(self._pending)
+            self.compact(replace=True)
+            return count
+        if not self._pending:
+            return 0
+        at = _utc_now()
+        lines = "".join(
+            json.dumps({"at": at, "section": s, "key": k, "value": v}, ensure_ascii=False) + "\n"
+            for (s, k), v in sorted(self._pending.items())
+        )
+        count = len(self._pending)
+        with ledger_lock(self.directory):
+            generation = self._journal_generation()
+            header = ""
+            if not self.journal_path.exists():
+                header = json.dumps({"schema": JOURNAL_SCHEMA, "generation": generation}) + "\n"
+            fd = os.open(str(self.journal_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (header + lines).encode("utf-8"))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if generation != self.generation:
+                self._read_journal()  # someone compacted meanwhile; our view is stale anyway
+            else:
+                for (section, key), value in self._pending.items():
+                    name = shard_for(key)
+                    self._journal.setdefault(name, {})[(section, key)] = value
+                    shard = self._shards.get(name)
+                    if shard is not None:
+                        if value is None:
+                            shard[section].pop(key, None)
+                        else:
+                            shard[section][key] = value
+                self.journal_lines += count
+        self._pending = {}
+        if self.journal_lines >= _compact_threshold():
+            self.compact()
+        return count
+
+    def compact(self, replace: bool = False) -> int:
+        """Fold the journal (and staged changes) into shards; ``replace`` drops everything else.
+
+        Returns the number of shards written.
+        """
+        with ledger_lock(self.directory):
+            return self._compact_locked(replace)
+
+    def _compact_locked(self, replace: bool) -> int:
+        staged = dict(self._pending)
+        if replace:
+            overlay: Dict[str, Dict[Key, Any]] = {}
+            generation = self._journal_generation()
+        else:
+            self._read_journal()
+            overlay = self._journal
+            generation = self.generation
+        for (section, key), value in staged.items():
+            overlay.setdefault(shard_for(key), {})[(section, key)] = value
+
+        existing = {p.stem for p in self.shards_path.glob("*.json")}
+        targets = sorted(set(overlay) | (existing if replace else set()))
+        for name in targets:
+            shard = _empty() if replace else self._read_shard_file(name)
+            for (section, key), value in overlay.get(name, {}).items():
+                if value is None:
+                    shard[section].pop(key, None)
+                else:
+                    shard[section][key] = value
+            path = self.shards_path / f"{name}.json"
+            if not any(shard.values()):
+                path.unlink(missing_ok=True)
+                continue
+            payload = {"schema": SHARD_SCHEMA, "shard": name}
+            payload.update({section: dict(sorted(shard[section].items())) for section in SECTIONS})
+            atomic_write_json(path, payload, ensure_ascii=False)
+
+        # Shards first, then restart the journal: a crash in between only replays
+        # changes that are already in the shards.
+        header = json.dumps({"schema": JOURNAL_SCHEMA, "generation": generation + 1}) + "\n"
+        atomic_write_text(self.journal_path, header)
+        self._read_journal()
+        self._pending = {}
+        self.blank = False
+        return len(targets)
+
+    def exists(self) -> bool:
+        return bool(self._pending) or self.journal_path.exists() or any(self.shards_path.glob("*.json"))
+
+    # -- the index.json view ---------------------------------------------------
+
+    def read_view(self, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+        """The current index.json (default ``view_path``) as parsed JSON, or None if missing/unreadable."""
+        try:
+            return _parse_view((path or self.view_path).read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def view_matches(self, current: Optional[Dict[str, Any]]) -> bool:
+        """True if the parsed view ``current`` holds exactly the ledger's entries (layout is ignored)."""
+        return current is not None and _view_sections(current) == self.data
+
+    def render_view(self, current: Optional[Dict[str, Any]] = None) -> str:
+        """index.json text for the ledger; top-level keys of ``current`` other than the
+        sections (e.g. ``meta``) are kept, in their original position.
+        """
+        data = dict(self.data)
+        out: Dict[str, Any] = {}
+        for key, value in (current or {}).items():
+            out[key] = data.pop(key) if key in data else value
+        out.update(data)
+        return json.dumps(out, indent=2, ensure_ascii=False) + "\n"
+
+    def record_view(self) -> None:
+        """Keep a copy of index.json as it is now, as the base for ``merge_view``."""
+        try:
+            st = self.view_path.stat()
+            data = self.view_path.read_bytes()
+        except FileNotFoundError:
+            self.base_path.unlink(missing_ok=True)
+            return
+        atomic_write_bytes(self.base_path, data, fsync=False)
+        os.utime(self.base_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def merge_view(self, save: bool = True) -> int:
+        """Stage edits made to index.json by others since ``record_view``; returns the count.
+
+        The edits are index.json diffed against the base copy, so journal changes
+        newer than the view are not rolled back. Without a base copy only keys
+        the ledger lacks are taken over. With ``save`` the edits are appended to
+        the journal and the current index.json becomes the new base.
+        """
+        if self.blank:
+            return 0
+        try:
+            view_st = self.view_path.stat()
+        except FileNotFoundError:
+            return 0
+        try:
+            base_st = self.base_path.stat()
+        except FileNotFoundError:
+            base_st = None
+        if base_st is not None and (base_st.st_size, base_st.st_mtime_ns) == (view_st.st_size, view_st.st_mtime_ns):
+            return 0
+        try:
+            raw = self.view_path.read_bytes()
+            view = _sections(raw)
+        except (OSError, ValueError) as exc:
+            print(f"[WARN] Ledger view {self.view_path} unreadable ({exc}); not merged")
+            return 0
+        base: Optional[Dict[str, Dict[str, Any]]] = None
+        if base_st is not None:
+            try:
+                base_raw: Optional[bytes] = self.base_path.read_bytes()
+            except OSError:
+                base_raw = None
+            if base_raw == raw:  # touched but unchanged
+                if save:
+                    os.utime(self.base_path, ns=(view_st.st_atime_ns, view_st.st_mtime_ns))
+                return 0
+            try:
+                base = _sections(base_raw) if base_raw is not None else None
+            except ValueError:
+                base = None
+
+        changed = 0
+        for section in SECTIONS:
+            now = view[section]
+            if base is None:
+                for key, value in now.items():
+                    if value is not None and self.get(section, key) is None:
+                        changed += self.set(section, key, value)
+                continue
+            before = base[section]
+            for key in sorted(set(now) | set(before)):
+                if now.get(key) != before.get(key):
+                    changed += self.set(section, key, now.get(key))
+        if save:
+            if changed:
+                self.save()
+                print(f"[OK] Merged {changed} outside edit(s) of {VIEW_NAME} into the ledger")
+            self.record_view()
+        return changed
+
+    def materialize(self, path: Optional[Path] = None) -> bool:
+        """Write the legacy single-file view (default index.json); returns True if it changed.
+
+        The file is only rewritten when its entries differ from the ledger, so a view
+        in an older layout (e.g. a single line) is left as is while it is current.
+
+        Outside edits to index.json are merged first, so they are never overwritten,
+        and top-level keys other than the ledger sections are carried over.
+        """
+        target = path or self.view_path
+        if target == self.view_path:
+            self.merge_view()
+        current = self.read_view(target)
+        changed = not self.view_matches(current)
+        if changed:
+            atomic_write_text(target, self.render_view(current))
+        if target == self.view_path:
+            self.record_view()
+        return changed
+
+
+def _migrate_store(old: Path, new: Path) -> None:
+    """Move a journal/shards store from the shared folder (earlier layout) to ``new``."""
+    if not (old / JOURNAL_NAME).exists() or (new / JOURNAL_NAME).exists():
+        return
+    new.mkdir(parents=True, exist_ok=True)
+    for name in (JOURNAL_NAME, SHARDS_DIR, VIEW_BASE_NAME):
+        if (old / name).exists() and not (new / name).exists():
+            shutil.move(str(old / name), str(new / name))
+    (old / LOCK_NAME).unlink(missing_ok=True)
+    print(f"[OK] Moved ledger journal and shards from {old} to {new}")
+
+
+def _legacy_data(directory: Path, legacy: Path) -> Optional[Dict[str, Any]]:
+    """Contents of a legacy index.json when the store has no journal or shards yet."""
+    if (directory / JOURNAL_NAME).exists() or any((directory / SHARDS_DIR).glob("*.json")) or not legacy.exists():
+        return None
+    try:
+        data = json.loads(legacy.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"[WARN] Legacy ledger {legacy} unreadable ({exc}); starting empty")
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def load_ledger(repo_root: Path = ROOT, bootstrap: bool = True) -> Ledger:
+    """Open the ledger; a legacy index.json is imported as the first snapshot.
+
+    Later outside edits to index.json are merged in (``Ledger.merge_view``).
+    With ``bootstrap=False`` (read-only callers) the legacy data and those
+    edits are only held in memory and nothing is written.
+    """
+    directory = store_dir(repo_root)
+    view_path = ledger_dir(repo_root) / VIEW_NAME
+    if bootstrap:
+        _migrate_store(ledger_dir(repo_root), directory)
+    legacy = _legacy_data(directory, view_path)
+    if legacy is None:
+        ledger = Ledger(directory, view_path=view_path)
+        ledger.merge_view(save=bootstrap)
+        return ledger
+    ledger = Ledger(directory, blank=True, view_path=view_path)
+    for section in SECTIONS:
+        for key, value in (legacy.get(section) or {}).items():
+            if value is not None:
+                ledger.set(section, key, value)
+    if not bootstrap:
+        return ledger
+    with ledger_lock(directory):
+        if (directory / JOURNAL_NAME).exists():
+            ledger = Ledger(directory, view_path=view_path)  # another process imported it first
+            ledger.merge_view()
+            return ledger
+        ledger._compact_locked(replace=True)
+    ledger.record_view()
+    print(f"[OK] Imported legacy ledger {VIEW_NAME} into {SHARDS_DIR}/")
+    return ledger
+
+
+__all__ = [
+    "JOURNAL_NAME",
+    "Ledger",
+    "SECTIONS",
+    "SHARDS_DIR",
+    "VIEW_BASE_NAME",
+    "VIEW_NAME",
+    "ledger_dir",
+    "ledger_lock",
+    "load_ledger",
+    "shard_for",
+    "store_dir",
+]
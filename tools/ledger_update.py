@@ -1,6 +1,8 @@
 """Ledger updater — records receipts and completion after pulls.
 
-Updates exchange/ledger/index.json based on files present on disk:
+Updates the exchange ledger (tools/ledger_store.py: journal + monthly shards
+under logs/ledger/, with exchange/ledger/index.json as a materialized view) based on files
+present on disk:
 - Reports under exchange/reports/{inbox,archived}/order-*-report.json
 - Acks under exchange/acknowledgements/logged/order-*-ack.json
 - Orders under exchange/orders/{completed,dispatched}/order-*.json
@@ -10,54 +12,41 @@ Status rules:
 - received: report_path present (but not all of the above)
 - acknowledged: ack_path present (but not closed/received)
 Leaves existing status otherwise.
-"""
-
-from __future__ import annotations
-
-import json
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, Optional, Tuple
-
 
-@dataclass
-class Ledger:
-    path: Path
-    data: Dict[str, dict]
+File listings come from the shared exchange index (tools/exchange_index.py)
+rather than separate globs per folder.
 
-    @property
-    def orders(self) -> Dict[str, dict]:
-        return self.data.setdefault("orders", {})
+Incremental mode (``update_ledger_paths``) takes the change set from a pull
+or the inbox sorter and touches only the orders it names; the full pass is
+kept for recovery.
 
-    @property
-    def reports(self) -> Dict[str, str]:
-        return self.data.setdefault("reports", {})
+CLI
+    python tools/ledger_update.py                      # full pass
+    python tools/ledger_update.py PATH [PATH ...]      # only these changes
+    python tools/ledger_update.py --full-rebuild       # rebuild from scratch
+    python tools/ledger_update.py --compact            # fold the journal into shards
+    python tools/ledger_update.py --materialize        # regenerate index.json
+    python tools/ledger_update.py --check              # exit 1 if index.json is stale (no writes)
+"""
 
-    @property
-    def acks(self) -> Dict[str, str]:
-        return self.data.setdefault("acks", {})
+from __future__ import annotations
 
-    def save(self) -> None:
-        self.path.write_text(json.dumps(self.data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+import argparse
+import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+try:
+    from tools.exchange_db import best_effort
+    from tools.exchange_index import ExchangeIndex, get_index, save_shared
+    from tools.ledger_store import VIEW_NAME, Ledger, ledger_dir, load_ledger, store_dir
+except ModuleNotFoundError:
+    import sys as _sys
 
-def load_ledger(repo_root: Path) -> Ledger:
-    ledger_path = repo_root / "exchange" / "ledger" / "index.json"
-    # Ensure parent exists and bootstrap an empty ledger if missing
-    ledger_path.parent.mkdir(parents=True, exist_ok=True)
-    if not ledger_path.exists():
-        data: Dict[str, dict] = {"orders": {}, "reports": {}, "acks": {}}
-        led = Ledger(path=ledger_path, data=data)
-        led.save()
-        return led
-    try:
-        data = json.loads(ledger_path.read_text(encoding="utf-8"))
-        if not isinstance(data, dict):
-            data = {"orders": {}, "reports": {}, "acks": {}}
-    except Exception:
-        # Corrupt or unreadable file: reset to empty structure (conservative)
-        data = {"orders": {}, "reports": {}, "acks": {}}
-    return Ledger(path=ledger_path, data=data)
+    _sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from tools.exchange_db import best_effort
+    from tools.exchange_index import ExchangeIndex, get_index, save_shared
+    from tools.ledger_store import VIEW_NAME, Ledger, ledger_dir, load_ledger, store_dir
 
 
 def _order_id_from_filename(name: str) -> Optional[str]:
@@ -77,85 +66,183 @@ def _relpath(repo_root: Path, path: Path) -> str:
     return str(path.relative_to(repo_root / "exchange")).replace("\\", "/") if path.is_relative_to(repo_root / "exchange") else str(path)
 
 
-def update_ledger(repo_root: Path) -> int:
-    ledger = load_ledger(repo_root)
+# (folder under exchange/, filename pattern, ledger field, status for new entries) in
+# application order; for each field the last folder holding the order's file wins.
+SOURCES: Tuple[Tuple[str, str, str, str], ...] = (
+    ("acknowledgements/logged", "order-*-ack.json", "ack_path", "acknowledged"),
+    ("reports/inbox", "order-*-report.json", "report_path", "received"),
+    ("reports/archived", "order-*-report.json", "report_path", "received"),
+    ("orders/completed", "order-*.json", "order_path", "received"),
+    ("orders/dispatched", "order-*.json", "order_path", "received"),
+)
+_SUFFIXES = ("", "-policy-update-report", "-report", "-ack", "-result")
+
+
+def _apply(ledger: Ledger, oid: str, rel: str, field: str, initial: str) -> int:
+    changed = 0
+    if field == "ack_path":
+        changed += ledger.set("acks", f"{oid}-ack", rel)
+    elif field == "report_path":
+        changed += ledger.set("reports", f"{oid}-report", rel)
+    entry = ledger.get("orders", oid)
+    if entry is None or entry.get(field) != rel:
+        entry = dict(entry or {"status": initial})
+        entry[field] = rel
+        changed += ledger.set("orders", oid, entry)
+    return changed
+
+
+def _recompute_status(ledger: Ledger, oid: str) -> int:
+    """Apply the location-aware status rules to one order; returns 1 if its status changed."""
+    entry = ledger.get("orders", oid)
+    if entry is None:
+        return 0
+    order_path = entry.get("order_path") or ""
+    ack_path = entry.get("ack_path") or ""
+    report_path = entry.get("report_path") or ""
+
+    closed = (
+        (order_path.startswith("orders/completed/") or order_path.startswith("orders/dispatched/"))
+        and ack_path.startswith("acknowledgements/logged/")
+        and report_path.startswith("reports/archived/")
+    )
+    new_status = entry.get("status")
+    if closed:
+        new_status = "closed"
+    elif report_path:
+        new_status = "received"
+    elif ack_path.startswith("acknowledgements/logged/"):
+        new_status = "acknowledged"
+    if new_status != entry.get("status"):
+        return ledger.set("orders", oid, dict(entry, status=new_status))
+    return 0
+
+
+def _save(repo_root: Path, ledger: Ledger) -> None:
+    """Append the staged changes, refresh index.json and mirror the touched orders into the SQLite index."""
+    order_ids = sorted({key for section, key in ledger.pending if section == "orders"})
+    ledger.save()
+    ledger.materialize()
+    with best_effort("ledger", repo_root / "logs" / "exchange.sqlite3") as db:
+        if db is not None:
+            orders = {oid: ledger.get("orders", oid) for oid in order_ids}
+            db.sync_ledger({"orders": orders}, order_ids=order_ids, exchange=repo_root / "exchange")
+
+
+def update_ledger(repo_root: Path, index: Optional[ExchangeIndex] = None, rebuild: bool = False) -> int:
+    """Full pass over every tracked folder (``rebuild`` starts from an empty ledger)."""
+    if rebuild:
+        ledger = Ledger(store_dir(repo_root), blank=True, view_path=ledger_dir(repo_root) / VIEW_NAME)
+    else:
+        ledger = load_ledger(repo_root)
     exchange = repo_root / "exchange"
+    index = index or get_index(repo_root)
+
+    # Resolve the winning path per (order, field) first so a report present in both
+    # inbox and archived is not counted as two changes on every pass.
+    latest: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for folder, pattern, field, initial in SOURCES:
+        for record in index.files_in(exchange / folder, pattern):
+            oid = _order_id_from_filename(record.name)
+            if oid:
+                first = latest.get((oid, field))
+                latest[(oid, field)] = (_relpath(repo_root, record.path), first[1] if first else initial)
 
     changed = 0
+    for (oid, field), (rel, initial) in latest.items():
+        changed += _apply(ledger, oid, rel, field, initial)
 
-    # Index acks
-    for f in (exchange / "acknowledgements" / "logged").glob("order-*-ack.json"):
-        oid = _order_id_from_filename(f.name)
-        if not oid:
+    for oid in ledger.orders:
+        changed += _recompute_status(ledger, oid)
+
+    if changed or rebuild:
+        _save(repo_root, ledger)
+    return changed
+
+
+def update_ledger_paths(repo_root: Path, paths: Iterable[Path], index: Optional[ExchangeIndex] = None) -> int:
+    """Incremental update for a change set (paths added, moved or removed).
+
+    Only the orders those paths belong to are re-resolved, each with a handful
+    of index lookups, so the cost follows the change set rather than the
+    ledger's history. The result matches what ``update_ledger`` would produce.
+    """
+    exchange = repo_root / "exchange"
+    tracked = {exchange / folder: pattern for folder, pattern, _, _ in SOURCES}
+    affected: Set[str] = set()
+    for raw in paths:
+        path = Path(raw)
+        pattern = tracked.get(path.parent)
+        if pattern is None or not fnmatch.fnmatchcase(path.name, pattern):
             continue
-        rel = _relpath(repo_root, f)
-        key = f"{oid}-ack"
-        if ledger.acks.get(key) != rel:
-            ledger.acks[key] = rel
-            changed += 1
-        entry = ledger.orders.setdefault(oid, {"status": "acknowledged"})
-        if entry.get("ack_path") != rel:
-            entry["ack_path"] = rel
-            changed += 1
-
-    # Index reports (inbox + archived)
-    for bucket in ("inbox", "archived"):
-        for f in (exchange / "reports" / bucket).glob("order-*-report.json"):
-            oid = _order_id_from_filename(f.name)
-            if not oid:
-                continue
-            rel = _relpath(repo_root, f)
-            key = f"{oid}-report"
-            if ledger.reports.get(key) != rel:
-                ledger.reports[key] = rel
-                changed += 1
-            entry = ledger.orders.setdefault(oid, {"status": "received"})
-            if entry.get("report_path") != rel:
-                entry["report_path"] = rel
-                changed += 1
-
-    # Link orders (completed > dispatched preference)
-    for state in ("completed", "dispatched"):
-        for f in (exchange / "orders" / state).glob("order-*.json"):
-            oid = _order_id_from_filename(f.name)
-            if not oid:
-                continue
-            rel = _relpath(repo_root, f)
-            entry = ledger.orders.setdefault(oid, {"status": "received"})
-            if entry.get("order_path") != rel:
-                entry["order_path"] = rel
-                changed += 1
-
-    # Recompute statuses with location-aware rules
-    for oid, entry in list(ledger.orders.items()):
-        order_path = entry.get("order_path") or ""
-        ack_path = entry.get("ack_path") or ""
-        report_path = entry.get("report_path") or ""
-
-        def _is_closed() -> bool:
-            return (
-                (order_path.startswith("orders/completed/") or order_path.startswith("orders/dispatched/"))
-                and ack_path.startswith("acknowledgements/logged/")
-                and report_path.startswith("reports/archived/")
-            )
-
-        new_status = entry.get("status")
-        if _is_closed():
-            new_status = "closed"
-        elif report_path:
-            new_status = "received"
-        elif ack_path.startswith("acknowledgements/logged/"):
-            new_status = "acknowledged"
-        if new_status != entry.get("status"):
-            entry["status"] = new_status
-            changed += 1
+        oid = _order_id_from_filename(path.name)
+        if oid:
+            affected.add(oid)
+    if not affected:
+        return 0
+
+    index = index or get_index(repo_root)
+    candidates = [exchange / folder for folder, _, _, _ in SOURCES]
+    index.refresh_paths(folder / f"{oid}{suffix}.json" for oid in affected for folder in candidates for suffix in _SUFFIXES)
+
+    ledger = load_ledger(repo_root)
+    changed = 0
+    for oid in sorted(affected):
+        names = sorted(f"{oid}{suffix}.json" for suffix in _SUFFIXES)  # same order as a folder listing
+        latest: Dict[str, Tuple[str, str]] = {}
+        for folder, pattern, field, initial in SOURCES:
+            for name in names:
+                if not fnmatch.fnmatchcase(name, pattern) or _order_id_from_filename(name) != oid:
+                    continue
+                record = index.get(exchange / folder / name)
+                if record is not None:
+                    first = latest.get(field)
+                    latest[field] = (_relpath(repo_root, record.path), first[1] if first else initial)
+        for field, (rel, initial) in latest.items():
+            changed += _apply(ledger, oid, rel, field, initial)
+        changed += _recompute_status(ledger, oid)
 
     if changed:
-        ledger.save()
+        _save(repo_root, ledger)
     return changed
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Update the exchange ledger from artefacts on disk")
+    parser.add_argument("paths", nargs="*", help="Changed files (incremental update); default: scan every tracked folder")
+    parser.add_argument("--full-rebuild", action="store_true", help="Discard the ledger and rebuild it from a full scan")
+    parser.add_argument("--compact", action="store_true", help="Fold the journal into the monthly shards")
+    parser.add_argument("--materialize", action="store_true", help="Regenerate exchange/ledger/index.json from journal + shards")
+    parser.add_argument("--check", action="store_true", help="Fail if exchange/ledger/index.json is out of date; writes nothing")
+    args = parser.parse_args(argv)
+
     root = Path(__file__).resolve().parents[1]
-    n = update_ledger(root)
+    if args.check:
+        ledger = load_ledger(root, bootstrap=False)
+        if not ledger.view_matches(ledger.read_view()):
+            print(f"[WARN] {ledger.view_path} is out of date; run: python tools/ledger_update.py --materialize")
+            return 1
+        print(f"[OK] {ledger.view_path.name} up to date")
+        return 0
+    if args.compact or args.materialize:
+        ledger = load_ledger(root)
+        if args.compact:
+            shards = ledger.compact()
+            print(f"[OK] Ledger journal compacted into {shards} shard(s)")
+        if args.materialize:
+            changed = ledger.materialize()
+            print(f"[OK] {ledger.view_path.name} {'regenerated' if changed else 'up to date'}")
+        return 0
+    if args.full_rebuild:
+        n = update_ledger(root, rebuild=True)
+    elif args.paths:
+        n = update_ledger_paths(root, [Path(p).resolve() for p in args.paths])
+    else:
+        n = update_ledger(root)
+    save_shared()
     print(f"[OK] Ledger updated, {n} change(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -20,7 +20,13 @@ Routing rules (pull)
 - Any peer <front>/outbox/acknowledgements/**     -> exchange/acknowledgements/**
 - Any peer <front>/outbox/telemetry/emoji_runtime/promoted_samples/**
                                                 -> telemetry/emoji_runtime/promoted_samples/**
+- Otherwise by name: order-*-report.json -> exchange/reports/inbox/,
+  order-*-ack.json -> exchange/acknowledgements/logged/, TF-EMOJI-DRYRUN*
+  -> telemetry/emoji_runtime/promoted_samples/, router_rules.json globs
 - Otherwise                                      -> exchange/inbox/**
+  Routing is compiled once per run (tools/pull_router.py) and files are
+  copied straight to their final folder; ``pull --sort-inbox`` re-routes
+  leftovers already sitting in exchange/inbox.
 
 Front identity
 - SHAGI_FRONT env var, or workspace folder name.
@@ -28,21 +34,85 @@ Front identity
 Hub path
 - SHAGI_EXCHANGE_PATH env var, or exchange/config.json.upstream_root,
   or default: C:/Users/Admin/high_command_exchange
+
+Push manifests
+- logs/offline_bridge/push-<front>.json      (local: rel -> size, mtime_ns, sha256)
+- <hub>/<front>/push_manifest.json           (hub: what the hub outbox holds)
+  Files whose size+mtime match the local manifest reuse the recorded hash
+  without being opened; files whose hash matches the hub manifest are
+  skipped. ``push --full`` ignores both and re-copies everything.
+
+Pull cursors
+- logs/offline_bridge/pull-<peer>.json       (rel -> what we last pulled)
+  When a peer publishes push_manifest.json, pull diffs it against the
+  cursor (and skips the peer outright if the manifest has not changed);
+  otherwise it walks the peer outbox and compares size+mtime. A cursor is
+  replaced atomically only after its peer's files have landed, so an
+  interrupted pull simply retries the remainder. ``pull --full`` ignores
+  cursors.
+
+Blob store (opt-in: push --blobs or SHAGI_BRIDGE_BLOBS=1)
+- <hub>/.blobs/<ab>/<sha256>                 (content-addressed, shared by fronts)
+  Push uploads each distinct content once; a front's outbox entry becomes a
+  hard link/reflink of the blob (or, where the hub cannot link, only a
+  ``"blob": true`` entry in its push manifest). Pull reads blob-backed files
+  from the blob and materializes them by reflink/hard link when the hub and
+  the workspace share a filesystem, copying otherwise. ``gc-blobs`` deletes
+  blobs that no manifest references.
+
+Bundles (opt-in: push --bundle or SHAGI_BRIDGE_BUNDLE=1)
+- <hub>/<front>/bundles/<block>.pack         (gzip members, one per push)
+- <hub>/<front>/bundles/<block>.idx.jsonl    (one line per file; tools/exchange_bundle.py)
+  Push appends every changed file to the current cadence block's pack in
+  one sequential write instead of one hub file each (block name:
+  SHAGI_BUNDLE_BLOCK, default the UTC date); the hub manifest marks those
+  entries ``"bundle": "<block>"``. Pull reads only the index lines added
+  since its cursor and stream-extracts the entries the manifest still
+  points at and the cursor has not seen. Bundles are append-only, so
+  ``pull --move`` leaves them in place.
+
+Copy engine
+- Copies run through tools/exchange_io.CopyEngine (thread pool, per-file
+  retry, optional bytes/sec cap). Tune with --workers/--max-bps or
+  SHAGI_COPY_WORKERS/SHAGI_COPY_BPS.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import os
 import shutil
+import time
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Optional, Tuple, List, Dict
+from typing import Iterable, Optional, Set, Tuple, List, Dict
 import json
-import fnmatch
+
+try:
+    from tools.exchange_bundle import BUNDLE_DIR, BundleEntry, BundleWriter, current_block, extract, latest_entries, read_index
+    from tools.exchange_db import record_paths
+    from tools.exchange_index import ExchangeIndex, get_index
+    from tools.exchange_io import CopyEngine, CopyReport, atomic_write_json, is_temp_name, link_file
+    from tools.pull_router import PullRouter, is_safe_rel
+except ModuleNotFoundError:
+    import sys as _sys
+
+    _sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from tools.exchange_bundle import BUNDLE_DIR, BundleEntry, BundleWriter, current_block, extract, latest_entries, read_index
+    from tools.exchange_db import record_paths
+    from tools.exchange_index import ExchangeIndex, get_index
+    from tools.exchange_io import CopyEngine, CopyReport, atomic_write_json, is_temp_name, link_file
+    from tools.pull_router import PullRouter, is_safe_rel
 
 
 DEFAULT_HUB = Path("C:/Users/Admin/high_command_exchange")
+MANIFEST_SCHEMA = "bridge-manifest@1.0"
+CURSOR_SCHEMA = "bridge-cursor@1.0"
+HUB_MANIFEST_NAME = "push_manifest.json"
+BLOB_DIR = ".blobs"
+BLOB_GC_GRACE_S = 3600
 
 
 @dataclass
@@ -90,172 +160,604 @@ def _iter_files(root: Path) -> Iterable[Path]:
     if not root.exists():
         return []
     for p in root.rglob("*"):
-        if p.is_file():
+        # Skip another writer's in-flight temp files; only renamed artefacts are complete.
+        if p.is_file() and not is_temp_name(p.name):
             yield p
 
 
-def _copy_file(src: Path, dst: Path) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst)
-
-
 def _move_file(src: Path, dst: Path) -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
     shutil.move(str(src), str(dst))
 
 
-def push(cfg: BridgeConfig) -> int:
+def _sha256_of(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _state_dir(cfg: BridgeConfig) -> Path:
+    return cfg.repo_root / "logs" / "offline_bridge"
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, object]]:
+    """Return ``rel -> {size, mtime_ns, sha256}``; missing or corrupt manifests are empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    files = data.get("files") if isinstance(data, dict) else None
+    return dict(files) if isinstance(files, dict) else {}
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _write_state(path: Path, payload: Dict[str, object]) -> None:
+    atomic_write_json(path, payload)
+
+
+def save_manifest(path: Path, front: str, files: Dict[str, Dict[str, object]]) -> None:
+    _write_state(
+        path,
+        {"schema": MANIFEST_SCHEMA, "front": front, "updated": _utc_now(), "files": dict(sorted(files.items()))},
+    )
+
+
+def _cursor_path(cfg: BridgeConfig, peer: str) -> Path:
+    return _state_dir(cfg) / f"pull-{peer}.json"
+
+
+def load_cursor(
+    path: Path,
+) -> Tuple[Optional[Dict[str, object]], Dict[str, Dict[str, object]], Dict[str, int]]:
+    """Return ``(manifest_stamp, files, bundle index offsets)`` from a pull cursor; missing cursors are empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None, {}, {}
+    if not isinstance(data, dict):
+        return None, {}, {}
+    stamp = data.get("manifest")
+    files = data.get("files")
+    bundles = data.get("bundles")
+    return (
+        (stamp if isinstance(stamp, dict) else None),
+        (dict(files) if isinstance(files, dict) else {}),
+        ({str(k): int(v) for k, v in bundles.items() if isinstance(v, int)} if isinstance(bundles, dict) else {}),
+    )
+
+
+def save_cursor(
+    path: Path,
+    peer: str,
+    stamp: Optional[Dict[str, object]],
+    files: Dict[str, Dict[str, object]],
+    bundles: Optional[Dict[str, int]] = None,
+) -> None:
+    payload: Dict[str, object] = {
+        "schema": CURSOR_SCHEMA,
+        "peer": peer,
+        "updated": _utc_now(),
+        "manifest": stamp,
+        "files": dict(sorted(files.items())),
+    }
+    if bundles:
+        payload["bundles"] = dict(sorted(bundles.items()))
+    _write_state(path, payload)
+
+
+def _stat_entry(path: Path) -> Optional[Dict[str, object]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def blob_path(hub: Path, digest: str) -> Path:
+    return hub / BLOB_DIR / digest[:2] / digest
+
+
+def blobs_enabled(flag: bool = False) -> bool:
+    return flag or (os.getenv("SHAGI_BRIDGE_BLOBS") or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def bundles_enabled(flag: bool = False) -> bool:
+    return flag or (os.getenv("SHAGI_BRIDGE_BUNDLE") or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _pull_source(peer_outbox: Path, rel: str, entry: Dict[str, object]) -> Optional[Path]:
+    """Where to read a peer file from: its blob if the manifest references one, else the outbox.
+
+    Bundled entries have no file source; pull extracts them from the peer's bundles.
+    """
+    if entry.get("bundle"):
+        return None
+    if entry.get("blob") and isinstance(entry.get("sha256"), str):
+        blob = blob_path(peer_outbox.parent.parent, str(entry["sha256"]))
+        if blob.is_file():
+            return blob
+    candidate = peer_outbox / rel
+    return candidate if candidate.is_file() else None
+
+
+def _peer_changes(
+    peer_outbox: Path, stamp: Optional[Dict[str, object]], cursor: Dict[str, Dict[str, object]]
+) -> Iterable[Tuple[str, Dict[str, object]]]:
+    """Yield ``(rel, entry)`` for peer files not yet recorded in ``cursor``."""
+    manifest_path = peer_outbox.parent / HUB_MANIFEST_NAME
+    if stamp is not None:
+        for rel, entry in sorted(load_manifest(manifest_path).items()):
+            if not isinstance(entry, dict):
+                continue
+            if not is_safe_rel(rel):
+                print(f"[WARN] Ignoring unsafe path in {manifest_path}: {rel!r}")
+                continue
+            seen = cursor.get(rel)
+            if seen and seen.get("sha256") == entry.get("sha256"):
+                continue
+            if _pull_source(peer_outbox, rel, entry) is not None:
+                yield rel, dict(entry)
+        return
+    for f in _iter_files(peer_outbox):
+        entry = _stat_entry(f)
+        if entry is None:
+            continue
+        rel = f.relative_to(peer_outbox).as_posix()
+        seen = cursor.get(rel)
+        if seen and seen.get("size") == entry["size"] and seen.get("mtime_ns") == entry["mtime_ns"]:
+            continue
+        yield rel, entry
+
+
+def _route_peer(router: PullRouter, peer: str, rel: str) -> Optional[Tuple[Path, str]]:
+    """Destination and bucket for a peer file, or None (with a warning) if it would land outside the repo."""
+    try:
+        dst, bucket = router.route(rel)
+    except ValueError as e:
+        print(f"[WARN] Skipping {peer}:{rel}: {e}")
+        return None
+    if not router.contains(dst):
+        print(f"[WARN] Skipping {peer}:{rel}: {dst} resolves outside the repo")
+        return None
+    return dst, bucket
+
+
+def _push_blobs(
+    cfg: BridgeConfig,
+    pending: List[Tuple[str, Path, Path]],
+    seen: Dict[str, Dict[str, object]],
+    hub_manifest: Dict[str, Dict[str, object]],
+    engine: CopyEngine,
+) -> Tuple[int, int, CopyReport]:
+    """Upload each distinct content once to <hub>/.blobs and reference it from our outbox.
+
+    The outbox entry is a hard link/reflink of the blob where the hub filesystem
+    allows it (so peers without blob support still see a normal file), and
+    otherwise only the hub manifest entry (``"blob": true``) references it.
+    Returns ``(files pushed, bytes uploaded, upload report)``.
+    """
+    uploads: Dict[str, Tuple[Path, Path]] = {}
+    shared = 0
+    for key, src, _ in pending:
+        digest = str(seen[key]["sha256"])
+        blob = blob_path(cfg.hub, digest)
+        if digest in uploads:
+            continue
+        try:
+            if blob.stat().st_size == seen[key]["size"]:
+                shared += 1  # already on the hub (another front, or another path of ours)
+                continue
+        except OSError:
+            pass
+        uploads[digest] = (src, blob)
+
+    report = engine.copy_many(uploads.values())
+    failed = set()
+    for digest, result in zip(uploads, report.results):
+        if not result.ok:
+            failed.add(digest)
+            print(f"[WARN] Failed to upload blob for {result.src}: {result.error}")
+
+    count = 0
+    can_link = True
+    for key, src, hub_dst in pending:
+        digest = str(seen[key]["sha256"])
+        if digest in failed:
+            continue  # not in the hub manifest, so the next push retries it
+        method: Optional[str] = None
+        if can_link:
+            try:
+                method = link_file(blob_path(cfg.hub, digest), hub_dst)
+            except OSError as e:
+                print(f"[WARN] Failed to link {hub_dst}: {e}")
+            can_link = method is not None
+        if method is None:
+            # An older full copy would disagree with the manifest; the blob is authoritative.
+            hub_dst.unlink(missing_ok=True)
+        hub_manifest[key] = dict(seen[key], blob=True)
+        print(f"PUSH {src} -> blob {digest[:12]} ({method or 'manifest reference'})")
+        count += 1
+    print(f"[OK] Blobs: {len(uploads) - len(failed)} uploaded, {shared} already on hub")
+    return count, report.bytes, report
+
+
+def _push_bundle(
+    cfg: BridgeConfig,
+    pending: List[Tuple[str, Path, Path]],
+    seen: Dict[str, Dict[str, object]],
+    hub_manifest: Dict[str, Dict[str, object]],
+) -> Tuple[int, int]:
+    """Append every pending file to this block's pack as one member; returns ``(files, bytes)``.
+
+    Hub outbox copies left by earlier file-mode pushes would disagree with
+    the manifest, so they are removed (only for keys the manifest says were
+    pushed as files, to avoid a stat per bundled file).
+    """
+    if not pending:
+        return 0, 0
+    block = current_block()
+    writer = BundleWriter(cfg.hub / cfg.front / BUNDLE_DIR / f"{block}.pack")
+    started = time.perf_counter()
+    try:
+        entries = writer.append([(key, src) for key, src, _ in pending])
+    except OSError as e:
+        # Nothing reaches the hub manifest, so the next push retries every file.
+        print(f"[WARN] Failed to append bundle {writer.pack}: {e}")
+        return 0, 0
+    elapsed = time.perf_counter() - started
+    total = 0
+    for (key, src, hub_dst), entry in zip(pending, entries):
+        previous = hub_manifest.get(key)
+        if previous and not previous.get("bundle") and not previous.get("blob"):
+            try:
+                hub_dst.unlink(missing_ok=True)
+            except OSError as e:
+                print(f"[WARN] Failed to remove superseded {hub_dst}: {e}")
+        # Size/hash as packed: the file may have changed since the manifest scan.
+        seen[key] = {"size": entry.size, "mtime_ns": entry.mtime_ns, "sha256": entry.sha256}
+        hub_manifest[key] = dict(seen[key], bundle=block)
+        total += entry.size
+        print(f"PUSH {src} -> bundle {block}")
+    packed = entries[-1].member_length if entries else 0
+    rate = total / elapsed / 1e6 if elapsed > 0 else 0.0
+    print(f"[OK] Bundle {writer.pack.name}: {len(entries)} file(s), {total} -> {packed} bytes in {elapsed:.2f}s ({rate:.1f} MB/s)")
+    return len(entries), total
+
+
+def gc_blobs(cfg: BridgeConfig, grace_s: float = BLOB_GC_GRACE_S) -> int:
+    """Delete hub blobs no front's push manifest references (older than ``grace_s``)."""
+    root = cfg.hub / BLOB_DIR
+    if not root.exists():
+        return 0
+    referenced = set()
+    for front in cfg.hub.iterdir():
+        if not front.is_dir() or front.name.startswith("."):
+            continue
+        for entry in load_manifest(front / HUB_MANIFEST_NAME).values():
+            if isinstance(entry, dict) and entry.get("blob"):
+                referenced.add(entry.get("sha256"))
+    cutoff = time.time() - grace_s
+    removed = 0
+    for blob in _iter_files(root):
+        try:
+            # The grace period covers a push that uploaded blobs but has not written its manifest yet.
+            if blob.name not in referenced and blob.stat().st_mtime < cutoff:
+                blob.unlink()
+                removed += 1
+        except OSError as e:
+            print(f"[WARN] Failed to remove blob {blob}: {e}")
+    print(f"[OK] Removed {removed} unreferenced blob(s) from {root}")
+    return removed
+
+
+def push(
+    cfg: BridgeConfig,
+    *,
+    full: bool = False,
+    engine: Optional[CopyEngine] = None,
+    blobs: bool = False,
+    bundle: bool = False,
+) -> int:
     local_outbox = cfg.repo_root / "exchange" / "outbox"
     if not local_outbox.exists():
         print(f"[WARN] Local outbox not found: {local_outbox}")
         return 0
 
     hub_outbox = cfg.hub / cfg.front / "outbox"
-    count = 0
+    local_manifest_path = _state_dir(cfg) / f"push-{cfg.front}.json"
+    hub_manifest_path = cfg.hub / cfg.front / HUB_MANIFEST_NAME
+    local_manifest = {} if full else load_manifest(local_manifest_path)
+    hub_manifest = {} if full else load_manifest(hub_manifest_path)
+    seen: Dict[str, Dict[str, object]] = {}
+
+    skipped = skipped_bytes = 0
+    pending: List[Tuple[str, Path, Path]] = []
     for f in _iter_files(local_outbox):
         rel = f.relative_to(local_outbox)
-        dst = hub_outbox / rel
-        _copy_file(f, dst)
-        print(f"PUSH {f} -> {dst}")
-        count += 1
-
-    print(f"[OK] Pushed {count} file(s) to hub: {hub_outbox}")
-    return count
-
-
-def _route_pull_destination(cfg: BridgeConfig, peer_rel_under_outbox: Path) -> Tuple[Path, str]:
-    parts = tuple(part.lower() for part in peer_rel_under_outbox.parts)
-
-    # reports -> exchange/reports/inbox/[rest after 'reports']
-    if "reports" in parts:
-        idx = parts.index("reports")
-        tail = Path(*peer_rel_under_outbox.parts[idx + 1 :])
-        dest = cfg.repo_root / "exchange" / "reports" / "inbox" / tail
-        return dest, "reports/inbox"
-
-    # acknowledgements -> exchange/acknowledgements/[same structure]
-    if "acknowledgements" in parts:
-        idx = parts.index("acknowledgements")
-        tail = Path(*peer_rel_under_outbox.parts[idx + 1 :])
-        dest = cfg.repo_root / "exchange" / "acknowledgements" / tail
-        return dest, "acknowledgements"
-
-    # orders/<state> -> exchange/orders/<state>/[rest after state]
-    if len(parts) >= 2 and parts[0] == "orders" and parts[1] in {"pending", "dispatched", "completed"}:
-        state = parts[1]
-        tail = Path(*peer_rel_under_outbox.parts[2:])
-        dest = cfg.repo_root / "exchange" / "orders" / state / tail
-        return dest, f"orders/{state}"
+        key = rel.as_posix()
+        st = f.stat()
+        prev = local_manifest.get(key)
+        if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+            digest = str(prev.get("sha256"))
+        else:
+            digest = _sha256_of(f)
+        entry: Dict[str, object] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        seen[key] = entry
+
+        hub_entry = hub_manifest.get(key)
+        if hub_entry and hub_entry.get("sha256") == digest:
+            skipped += 1
+            skipped_bytes += st.st_size
+            continue
 
-    # telemetry/emoji_runtime/promoted_samples -> telemetry/emoji_runtime/promoted_samples/[tail]
-    if len(parts) >= 3 and parts[0] == "telemetry" and parts[1] == "emoji_runtime" and parts[2] == "promoted_samples":
-        tail = Path(*peer_rel_under_outbox.parts[3:])
-        dest = cfg.repo_root / "telemetry" / "emoji_runtime" / "promoted_samples" / tail
-        return dest, "telemetry/emoji_runtime/promoted_samples"
+        pending.append((key, f, hub_outbox / rel))
 
-    # default inbox catch-all under exchange/inbox
-    dest = cfg.repo_root / "exchange" / "inbox" / peer_rel_under_outbox
-    return dest, "exchange/inbox"
+    engine = engine or CopyEngine.from_env()
+    report: Optional[CopyReport] = None
+    if bundles_enabled(bundle):
+        count, copied_bytes = _push_bundle(cfg, pending, seen, hub_manifest)
+    elif blobs_enabled(blobs):
+        count, copied_bytes, report = _push_blobs(cfg, pending, seen, hub_manifest, engine)
+    else:
+        report = engine.copy_many((src, dst) for _, src, dst in pending)
+        count = copied_bytes = 0
+        for (key, _, _), result in zip(pending, report.results):
+            if not result.ok:
+                # Not recorded in the hub manifest, so the next push retries it.
+                print(f"[WARN] Failed to push {result.src}: {result.error}")
+                continue
+            hub_manifest[key] = seen[key]
+            print(f"PUSH {result.src} -> {result.dst}")
+            count += 1
+            copied_bytes += result.size
+
+    save_manifest(local_manifest_path, cfg.front, seen)
+    if count or full or not hub_manifest_path.exists():
+        save_manifest(hub_manifest_path, cfg.front, hub_manifest)
+
+    print(
+        f"[OK] Pushed {count} file(s) ({copied_bytes} bytes) to hub: {hub_outbox}; "
+        f"skipped {skipped} unchanged file(s) ({skipped_bytes} bytes)"
+    )
+    if pending and report is not None:
+        print(f"[OK] Push {report.summary()}")
+    return count
 
 
-def pull(cfg: BridgeConfig, *, move: bool = False) -> int:
+def _plan_unpack(
+    peer: str,
+    bundle_dir: Path,
+    manifest: Dict[str, Dict[str, object]],
+    cursor: Dict[str, Dict[str, object]],
+    offsets: Dict[str, int],
+    router: PullRouter,
+) -> List[Tuple[str, Path, int, List[Tuple[str, Dict[str, object], BundleEntry, Path, str]]]]:
+    """Entries to extract from each of a peer's packs, from the index lines added since ``offsets``.
+
+    Only entries the peer's manifest still points at (same sha256, marked as
+    bundled) and the cursor has not recorded are planned; a stale copy in an
+    older pack never overwrites a newer file. Paths that would land outside
+    the repo are skipped.
+    """
+    plans = []
+    for pack in sorted(bundle_dir.glob("*.pack")):
+        new_entries, next_offset = read_index(pack, offsets.get(pack.name, 0))
+        items = []
+        for bundle_entry in latest_entries(new_entries):
+            rel_key = bundle_entry.path
+            entry = manifest.get(rel_key)
+            if not isinstance(entry, dict) or not entry.get("bundle") or entry.get("sha256") != bundle_entry.sha256:
+                continue
+            seen = cursor.get(rel_key)
+            if seen and seen.get("sha256") == bundle_entry.sha256:
+                continue
+            routed = _route_peer(router, peer, rel_key)
+            if routed is None:
+                continue
+            dst, bucket = routed
+            items.append((rel_key, dict(entry), bundle_entry, dst, bucket))
+        if items or next_offset != offsets.get(pack.name, 0):
+            plans.append((peer, pack, next_offset, items))
+    return plans
+
+
+def sort_inbox(cfg: BridgeConfig, router: PullRouter) -> List[Path]:
+    """Move leftovers in exchange/inbox (e.g. from older pulls) to where the router sends them.
+
+    Returns the moved source and destination paths.
+    """
+    inbox_root = cfg.repo_root / "exchange" / "inbox"
+    moved: List[Path] = []
+    if not inbox_root.exists():
+        return moved
+    for f in sorted(inbox_root.rglob("*")):
+        if not f.is_file() or is_temp_name(f.name):
+            continue
+        named = router.route_name(f.name)
+        if named is None:
+            continue
+        dest = named[0] / f.name
+        _move_file(f, dest)
+        moved.extend((f, dest))
+        print(f"SORT MOVE {f} -> {dest} [{named[1]}]")
+    print(f"[OK] Sorted {len(moved) // 2} inbox file(s)")
+    return moved
+
+
+def pull(
+    cfg: BridgeConfig,
+    *,
+    move: bool = False,
+    full: bool = False,
+    engine: Optional[CopyEngine] = None,
+    index: Optional[ExchangeIndex] = None,
+    sort_existing: bool = False,
+) -> int:
     if not cfg.hub.exists():
         print(f"[WARN] Hub path does not exist: {cfg.hub}")
         return 0
 
-    count = 0
-    for peer in sorted(p for p in cfg.hub.iterdir() if p.is_dir() and p.name != cfg.front):
+    router = PullRouter.load(cfg.repo_root)
+    unchanged_peers = 0
+    # peer -> (cursor path, manifest stamp, stamp the cursor was saved with, entries, dirty)
+    cursors: Dict[
+        str, Tuple[Path, Optional[Dict[str, object]], Optional[Dict[str, object]], Dict[str, Dict[str, object]], bool]
+    ] = {}
+    failed: Set[str] = set()
+    bundle_offsets: Dict[str, Dict[str, int]] = {}
+    # (peer, pack, new index offset, [(rel, entry, bundle entry, dst, bucket)]) per peer bundle.
+    unpack: List[Tuple[str, Path, int, List[Tuple[str, Dict[str, object], BundleEntry, Path, str]]]] = []
+    # (peer, rel, entry, bucket) per planned copy; copied together across peers.
+    # Blob-backed files are immutable, so they may be linked instead of copied.
+    planned: List[Tuple[str, str, Dict[str, object], str]] = []
+    pairs: List[Tuple[Path, Path]] = []
+    blob_planned: List[Tuple[str, str, Dict[str, object], str]] = []
+    blob_pairs: List[Tuple[Path, Path]] = []
+    for peer in sorted(p for p in cfg.hub.iterdir() if p.is_dir() and p.name != cfg.front and not p.name.startswith(".")):
         peer_outbox = peer / "outbox"
+        peer_bundles = peer / BUNDLE_DIR
+        if not peer_outbox.exists() and not peer_bundles.exists():
+            continue
+        cursor_path = _cursor_path(cfg, peer.name)
+        last_stamp, cursor, offsets = (None, {}, {}) if full else load_cursor(cursor_path)
+        stamp = _stat_entry(peer / HUB_MANIFEST_NAME)
+        if stamp is not None and stamp == last_stamp:
+            unchanged_peers += 1
+            continue
+        dirty = full or stamp != last_stamp or not cursor_path.exists()
+        cursors[peer.name] = (cursor_path, stamp, last_stamp, cursor, dirty)
+        bundle_offsets[peer.name] = offsets
+        if stamp is not None and peer_bundles.exists():
+            unpack.extend(_plan_unpack(peer.name, peer_bundles, load_manifest(peer / HUB_MANIFEST_NAME), cursor, offsets, router))
         if not peer_outbox.exists():
             continue
-        for f in _iter_files(peer_outbox):
-            rel = f.relative_to(peer_outbox)
-            dst, bucket = _route_pull_destination(cfg, rel)
-            _copy_file(f, dst)
-            action = "MOVE" if move else "COPY"
-            print(f"PULL {action} {peer.name}:{rel} -> {dst} [{bucket}]")
-            if move:
-                try:
-                    f.unlink(missing_ok=True)
-                except Exception as e:
-                    print(f"[WARN] Failed to remove {f}: {e}")
-            count += 1
-
-    print(f"[OK] Pulled {count} file(s) from hub into local inboxes")
+        for rel_key, entry in _peer_changes(peer_outbox, stamp, cursor):
+            routed = _route_peer(router, peer.name, rel_key)
+            if routed is None:
+                continue
+            dst, bucket = routed
+            src = _pull_source(peer_outbox, rel_key, entry) or peer_outbox / rel_key
+            if src != peer_outbox / rel_key:
+                blob_planned.append((peer.name, rel_key, entry, bucket))
+                blob_pairs.append((src, dst))
+            else:
+                planned.append((peer.name, rel_key, entry, bucket))
+                pairs.append((src, dst))
+
+    engine = engine or CopyEngine.from_env()
+    report: CopyReport = engine.copy_many(pairs)
+    if blob_pairs:
+        linked = engine.copy_many(blob_pairs, link=True)
+        planned += blob_planned
+        report = CopyReport(
+            results=report.results + linked.results,
+            elapsed_s=report.elapsed_s + linked.elapsed_s,
+            workers=max(report.workers, linked.workers),
+        )
+    count = 0
+    landed: Dict[str, List[Path]] = {}
+    touched: List[Path] = []
+    action = "MOVE" if move else "COPY"
+    for (peer_name, rel_key, entry, bucket), result in zip(planned, report.results):
+        if not result.ok:
+            print(f"[WARN] Failed to pull {peer_name}:{rel_key}: {result.error}")
+            failed.add(peer_name)
+            continue
+        cursors[peer_name][3][rel_key] = entry
+        landed.setdefault(peer_name, []).append(result.dst)
+        touched.append(result.dst)
+        print(f"PULL {action} {peer_name}:{rel_key} -> {result.dst} [{bucket}]")
+        if move:
+            # Remove the peer's outbox entry; shared blobs are left for gc-blobs.
+            outbox_entry = cfg.hub / peer_name / "outbox" / rel_key
+            try:
+                outbox_entry.unlink(missing_ok=True)
+            except Exception as e:
+                print(f"[WARN] Failed to remove {outbox_entry}: {e}")
+        count += 1
 
-    # Post-pull sorter: promote known artifacts from exchange/inbox
-    try:
-        inbox_root = cfg.repo_root / "exchange" / "inbox"
-        promoted = 0
-        # Load optional router rules
-        def _load_rules() -> List[Dict[str, str]]:
-            rules: List[Dict[str, str]] = []
-            for candidate in [
-                cfg.repo_root / "exchange" / "router_rules.json",
-                cfg.repo_root / "tools" / "router_rules.json",
-            ]:
-                try:
-                    if candidate.exists():
-                        data = json.loads(candidate.read_text(encoding="utf-8"))
-                        if isinstance(data, list):
-                            for r in data:
-                                if (
-                                    isinstance(r, dict)
-                                    and isinstance(r.get("glob"), str)
-                                    and isinstance(r.get("dest"), str)
-                                ):
-                                    rules.append({"glob": r["glob"], "dest": r["dest"]})
-                except Exception:
-                    # Ignore malformed rules files
-                    pass
-            return rules
-
-        rules = _load_rules()
-        if inbox_root.exists():
-            for f in inbox_root.rglob("*"):
-                if not f.is_file():
+    unpacked = unpacked_bytes = 0
+    started = time.perf_counter()
+    for peer_name, pack, next_offset, items in unpack:
+        failures = 0
+        if items:
+            targets = {id(bundle_entry): dst for _, _, bundle_entry, dst, _ in items}
+            try:
+                results = extract(pack, [item[2] for item in items], lambda e: targets[id(e)])
+            except OSError as e:
+                results = [(item[2], None, str(e)) for item in items]
+            for (rel_key, entry, _, _, bucket), (bundle_entry, dst, error) in zip(items, results):
+                if error or dst is None:
+                    failures += 1
+                    failed.add(peer_name)
+                    print(f"[WARN] Failed to unpack {peer_name}:{rel_key} from {pack.name}: {error}")
                     continue
-                name = f.name
-                low = name.lower()
-                dest: Optional[Path] = None
-                # Reports
-                if low.startswith("order-") and low.endswith("-report.json"):
-                    dest = cfg.repo_root / "exchange" / "reports" / "inbox" / name
-                # Acknowledgements
-                elif low.startswith("order-") and low.endswith("-ack.json"):
-                    dest = cfg.repo_root / "exchange" / "acknowledgements" / "logged" / name
-                # TF emoji dryrun samples
-                elif name.upper().startswith("TF-EMOJI-DRYRUN") and low.endswith(".json"):
-                    dest = cfg.repo_root / "telemetry" / "emoji_runtime" / "promoted_samples" / name
-                # Externalizable rules (basename glob -> relative dest dir)
-                if dest is None and rules:
-                    for r in rules:
-                        try:
-                            if fnmatch.fnmatch(name, r["glob"]):
-                                dest = cfg.repo_root / Path(r["dest"]) / name
-                                break
-                        except Exception:
-                            continue
-                if dest is not None:
-                    _move_file(f, dest)
-                    print(f"SORT MOVE {f} -> {dest}")
-                    promoted += 1
-        print(f"[OK] Sorted {promoted} inbox file(s)")
-    except Exception as e:
-        print(f"[WARN] Inbox sorting failed: {e}")
+                cursors[peer_name][3][rel_key] = entry
+                landed.setdefault(peer_name, []).append(dst)
+                touched.append(dst)
+                print(f"PULL UNPACK {peer_name}:{rel_key} -> {dst} [{bucket}]")
+                unpacked += 1
+                unpacked_bytes += bundle_entry.size
+        if not failures:
+            # Failed entries keep the old offset so the next pull re-reads their index lines.
+            bundle_offsets[peer_name][pack.name] = next_offset
+    count += unpacked
+
+    # Commit each cursor only once that peer's files are in place. A peer with a
+    # failed copy or unpack keeps its previous stamp so the next pull revisits its
+    # manifest; the entries that did land are recorded and not copied again.
+    for peer_name, (cursor_path, stamp, last_stamp, cursor, dirty) in cursors.items():
+        if peer_name in failed:
+            print(f"[WARN] Some files from {peer_name} failed; they will be retried on the next pull")
+            save_cursor(cursor_path, peer_name, last_stamp, cursor, bundle_offsets.get(peer_name))
+        elif dirty or landed.get(peer_name):
+            save_cursor(cursor_path, peer_name, stamp, cursor, bundle_offsets.get(peer_name))
+
+    # Tag what each peer delivered with its front in the SQLite index (best effort).
+    for peer_name, paths in landed.items():
+        record_paths(cfg.repo_root, paths, front=peer_name, source="bridge")
+
+    print(f"[OK] Pulled {count} file(s) from hub into local inboxes ({unchanged_peers} peer(s) unchanged)")
+    if report.results:
+        # Outbox copies and blob links; bundle entries are summarized below.
+        print(f"[OK] Pull {report.summary()}")
+    if unpacked:
+        elapsed = time.perf_counter() - started
+        print(f"[OK] Unpacked {unpacked} file(s) ({unpacked_bytes} bytes) from {len(unpack)} bundle(s) in {elapsed:.2f}s")
+
+    # Files are routed to their final folder above; sweeping exchange/inbox is only
+    # needed for leftovers from older pulls (or after router_rules.json changes).
+    if sort_existing:
+        try:
+            moved = sort_inbox(cfg, router)
+            touched.extend(moved)
+            record_paths(cfg.repo_root, moved, source="bridge")
+        except Exception as e:
+            print(f"[WARN] Inbox sorting failed: {e}")
 
     # Update ledger after ingest
     try:
         try:
-            from tools.ledger_update import update_ledger  # type: ignore
+            from tools.ledger_update import update_ledger_paths  # type: ignore
         except ModuleNotFoundError:
             import sys as _sys
             root = str(cfg.repo_root)
             if root not in _sys.path:
                 _sys.path.insert(0, root)
-            from tools.ledger_update import update_ledger  # type: ignore
-
-        changed = update_ledger(cfg.repo_root)
+            from tools.ledger_update import update_ledger_paths  # type: ignore
+
+        # Reuse the shared scan index without walking the tree: only the paths this
+        # pull touched need re-stat, and only the orders they belong to need
+        # re-resolving in the ledger (update_ledger_paths re-stats their files).
+        index = index or get_index(cfg.repo_root, refresh=False)
+        index.refresh_paths(touched)
+        changed = update_ledger_paths(cfg.repo_root, touched, index=index)
+        index.save()
         print(f"[OK] Ledger updated ({changed} change(s))")
     except Exception as e:
         print(f"[WARN] Ledger update failed: {e}")
@@ -268,23 +770,43 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Bidirectional offline exchange bridge")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    sub.add_parser("push", help="Push local exchange/outbox to hub/<front>/outbox")
+    io_opts = argparse.ArgumentParser(add_help=False)
+    io_opts.add_argument("--workers", type=int, default=None, help="Parallel copy workers (default: SHAGI_COPY_WORKERS or 8)")
+    io_opts.add_argument("--max-bps", type=int, default=None, help="Cap total copy throughput in bytes/sec (default: SHAGI_COPY_BPS)")
+
+    p_push = sub.add_parser("push", parents=[io_opts], help="Push local exchange/outbox to hub/<front>/outbox")
+    p_push.add_argument("--full", action="store_true", help="Ignore push manifests and re-copy every file")
+    p_push.add_argument("--blobs", action="store_true", help="Store content once under <hub>/.blobs (default: SHAGI_BRIDGE_BLOBS)")
+    p_push.add_argument("--bundle", action="store_true", help="Append changed files to this block's compressed pack (default: SHAGI_BRIDGE_BUNDLE)")
 
-    p_pull = sub.add_parser("pull", help="Pull peers' outboxes into local inboxes")
+    p_pull = sub.add_parser("pull", parents=[io_opts], help="Pull peers' outboxes into local inboxes")
     p_pull.add_argument("--move", action="store_true", help="Remove files from hub after successful pull")
+    p_pull.add_argument("--full", action="store_true", help="Ignore pull cursors and re-copy every peer file")
+    p_pull.add_argument("--sort-inbox", action="store_true", help="Also re-route leftovers already in exchange/inbox")
 
-    p_sync = sub.add_parser("sync", help="Push then pull")
+    p_sync = sub.add_parser("sync", parents=[io_opts], help="Push then pull")
     p_sync.add_argument("--move", action="store_true", help="Remove files from hub after successful pull")
+    p_sync.add_argument("--full", action="store_true", help="Ignore push manifests and pull cursors")
+    p_sync.add_argument("--blobs", action="store_true", help="Store content once under <hub>/.blobs (default: SHAGI_BRIDGE_BLOBS)")
+    p_sync.add_argument("--bundle", action="store_true", help="Append changed files to this block's compressed pack (default: SHAGI_BRIDGE_BUNDLE)")
+    p_sync.add_argument("--sort-inbox", action="store_true", help="Also re-route leftovers already in exchange/inbox")
+
+    p_gc = sub.add_parser("gc-blobs", help="Delete hub blobs no front's push manifest references")
+    p_gc.add_argument("--grace", type=float, default=BLOB_GC_GRACE_S, help="Keep blobs younger than this many seconds")
 
     args = parser.parse_args()
+    if args.cmd == "gc-blobs":
+        gc_blobs(cfg, grace_s=args.grace)
+        return 0
+    engine = CopyEngine.from_env(workers=args.workers, max_bps=args.max_bps)
 
     if args.cmd == "push":
-        push(cfg)
+        push(cfg, full=args.full, engine=engine, blobs=args.blobs, bundle=args.bundle)
     elif args.cmd == "pull":
-        pull(cfg, move=bool(getattr(args, "move", False)))
+        pull(cfg, move=bool(getattr(args, "move", False)), full=args.full, engine=engine, sort_existing=args.sort_inbox)
     elif args.cmd == "sync":
-        push(cfg)
-        pull(cfg, move=bool(getattr(args, "move", False)))
+        push(cfg, full=args.full, engine=engine, blobs=args.blobs, bundle=args.bundle)
+        pull(cfg, move=bool(getattr(args, "move", False)), full=args.full, engine=engine, sort_existing=args.sort_inbox)
     else:
         parser.print_help()
         return 2
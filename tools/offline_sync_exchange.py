@@ -2,9 +2,15 @@
 # Works across any workspace; detects and creates missing folders.
 
 import os
-import shutil
 import sys
 from pathlib import Path
+from typing import Optional
+
+try:
+    from tools.exchange_io import CopyEngine
+except ModuleNotFoundError:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from tools.exchange_io import CopyEngine
 
 # Configure stdout to avoid Windows console encoding issues
 try:
@@ -16,12 +22,14 @@ except Exception:
 # Shared hub path
 EXCHANGE = Path(os.getenv("SHAGI_EXCHANGE_PATH", "C:/Users/Admin/high_command_exchange"))
 
-def sync_local(workspace_root: str):
+def sync_local(workspace_root: str, engine: Optional[CopyEngine] = None):
     """
     Synchronize outbox/orders and outbox/reports from the current workspace
     into the shared high_command_exchange hub. Creates target folders if missing.
+    Copies for both folders run together through the shared CopyEngine.
     """
     ws = Path(workspace_root)
+    engine = engine or CopyEngine.from_env()
 
     # Define source folders
     source_folders = {
@@ -29,6 +37,7 @@ def sync_local(workspace_root: str):
         "reports": ws / "outbox" / "reports",
     }
 
+    jobs = {}
     for name, src in source_folders.items():
         dst = EXCHANGE / name
         if not src.exists():
@@ -36,24 +45,31 @@ def sync_local(workspace_root: str):
             continue
 
         # Ensure destination folder exists
-        os.makedirs(dst, exist_ok=True)
+        engine.ensure_dir(dst)
+        jobs[name] = [(f, dst / f.relative_to(src)) for f in src.glob("**/*.*") if f.is_file()]
 
+    pairs = [pair for name in jobs for pair in jobs[name]]
+    report = engine.copy_many(pairs)
+    results = iter(report.results)
+    for name, pairs_for_name in jobs.items():
         files_copied = 0
-        for f in src.glob("**/*.*"):
-            if f.is_file():
-                rel_path = f.relative_to(src)
-                dst_file = dst / rel_path
-                dst_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(f, dst_file)
-                print(f"Copied {f} -> {dst_file}")
+        for _ in pairs_for_name:
+            result = next(results)
+            if result.ok:
+                print(f"Copied {result.src} -> {result.dst}")
                 files_copied += 1
+            else:
+                print(f"[WARN] Failed to copy {result.src}: {result.error}")
 
         if files_copied == 0:
-            print(f"[INFO] No new {name} files to sync from {src}")
+            print(f"[INFO] No new {name} files to sync from {source_folders[name]}")
         else:
-            print(f"[OK] Synced {files_copied} {name} file(s) to {dst}")
+            print(f"[OK] Synced {files_copied} {name} file(s) to {EXCHANGE / name}")
 
+    if pairs:
+        print(f"[OK] Throughput: {report.summary()}")
     print("[OK] Local exchange sync complete.")
+    return report
 
 
 if __name__ == "__main__":
@@ -6,6 +6,11 @@ WORKSPACE = "toysoldiers_ai_0"
 ROOT = Path(__file__).resolve().parents[1]
 LOGS = ROOT / "logs"
 
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.exchange_index import get_index, save_shared
+
 def iso_now():
     return datetime.now(timezone.utc).isoformat()
 
@@ -24,26 +29,17 @@ def read_hub_path():
         pass
     return None
 
-def staged_missing_fields(root: Path):
+def staged_missing_fields(root: Path, index=None):
     checks = []
-    def needs(obj, fields):
-        return [f for f in fields if obj.get(f) is None]
+    index = index or get_index(root)
     kinds = [
         ("order",  root/"outbox"/"orders",  ["id","workspace","title","status","created_at","attachments"]),
         ("ack",    root/"outbox"/"acks",    ["order_id","ack_id","workspace","ack_timestamp","notes"]),
         ("report", root/"outbox"/"reports", ["order_id","report_id","workspace","summary","created_at","artifacts"]),
     ]
     for kind, d, fields in kinds:
-        if not d.exists():
-            continue
-        for f in d.glob("*.json"):
-            try:
-                obj = json.loads(f.read_text(encoding="utf-8"))
-            except Exception:
-                checks.append({"kind": kind, "file": f.name, "missing": ["invalid_json"]})
-                continue
-            missing = needs(obj, fields)
-            checks.append({"kind": kind, "file": f.name, "missing": missing})
+        for record in index.files_in(d):
+            checks.append({"kind": kind, "file": record.name, "missing": record.missing(fields)})
     return checks
 
 def main():
@@ -66,6 +62,7 @@ def main():
     LOGS.mkdir(parents=True, exist_ok=True)
     out = LOGS/"ops_readiness.json"
     out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    save_shared()
     print(f"ops_readiness written to {out}")
     sys.exit(0 if summary["ok"] else 1)
 
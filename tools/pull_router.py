@@ -0,0 +1,211 @@
+"""
+pull_router.py — Compiled routing table for offline_bridge pulls.
+
+Decides, once per file and without touching the disk, where a peer's
+``outbox/<rel>`` lands locally. Rules are compiled once per run:
+
+Path routes (on the outbox-relative path, case-insensitive)
+- a ``reports`` component anywhere           -> exchange/reports/inbox/<rest>
+- an ``acknowledgements`` component anywhere -> exchange/acknowledgements/<rest>
+  (``reports`` wins when both appear)
+- prefix trie: orders/{pending,dispatched,completed}/..., and
+  telemetry/emoji_runtime/promoted_samples/... keep their structure
+
+Name routes (for everything else, which used to land in exchange/inbox and
+be moved by a second sorting pass)
+- order-*-report.json   -> exchange/reports/inbox/<name>
+- order-*-ack.json      -> exchange/acknowledgements/logged/<name>
+- TF-EMOJI-DRYRUN*.json -> telemetry/emoji_runtime/promoted_samples/<name>
+- router_rules.json globs (exchange/ first, then tools/), as one combined
+  regex whose first matching alternative wins -> <dest>/<name>
+- otherwise                                    -> exchange/inbox/<rel>
+
+Peer paths come from the hub and are not trusted: ``route`` rejects
+absolute paths, drive prefixes and ``..`` components (``is_safe_rel``), and
+callers check ``contains(dst)`` before writing, which also catches a
+symlink inside the repo that points elsewhere.
+
+router_rules.json: ``[{"glob": "*.jsonl", "dest": "telemetry/playtests"}, ...]``
+(basename globs; ``dest`` is relative to the repo root).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath, PureWindowsPath
+from typing import Dict, List, Optional, Sequence, Tuple
+
+RULE_FILES = (Path("exchange") / "router_rules.json", Path("tools") / "router_rules.json")
+INBOX_BUCKET = "exchange/inbox"
+
+# component -> (destination under the repo root, bucket), in precedence order
+_ANYWHERE: Tuple[Tuple[str, Tuple[str, ...], str], ...] = (
+    ("reports", ("exchange", "reports", "inbox"), "reports/inbox"),
+    ("acknowledgements", ("exchange", "acknowledgements"), "acknowledgements"),
+)
+# outbox prefix -> same structure under the repo root
+_PREFIXES: Tuple[Tuple[str, ...], ...] = (
+    ("exchange", "orders", "pending"),
+    ("exchange", "orders", "dispatched"),
+    ("exchange", "orders", "completed"),
+    ("telemetry", "emoji_runtime", "promoted_samples"),
+)
+_LEAF = ""  # trie key holding (destination parts, bucket)
+
+
+def is_safe_rel(rel: str) -> bool:
+    """True if ``rel`` is a relative path that stays below the folder it is joined to.
+
+    Backslashes count as separators, so a key is judged the same on every OS.
+    """
+    if not rel or "\x00" in rel:
+        return False
+    win = PureWindowsPath(rel)
+    if win.drive or win.root or PurePosixPath(rel).is_absolute():
+        return False
+    return ".." not in win.parts
+
+
+@dataclass(frozen=True)
+class RouterRule:
+    glob: str
+    dest: str
+
+
+def load_rules(repo_root: Path) -> List[RouterRule]:
+    """External glob rules from every router_rules.json candidate (malformed files are ignored)."""
+    rules: List[RouterRule] = []
+    for candidate in RULE_FILES:
+        path = repo_root / candidate
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if not isinstance(data, list):
+            continue
+        for item in data:
+            if isinstance(item, dict) and isinstance(item.get("glob"), str) and isinstance(item.get("dest"), str):
+                rules.append(RouterRule(item["glob"], item["dest"]))
+    return rules
+
+
+def glob_to_regex(glob: str) -> str:
+    """fnmatch-style glob (``*``, ``?``, ``[seq]``, ``[!seq]``) as a group-free regex body."""
+    out: List[str] = []
+    i, n = 0, len(glob)
+    while i < n:
+        ch = glob[i]
+        i += 1
+        if ch == "*":
+            out.append(".*")
+        elif ch == "?":
+            out.append(".")
+        elif ch == "[":
+            j = i
+            if j < n and glob[j] == "!":
+                j += 1
+            if j < n and glob[j] == "]":
+                j += 1
+            while j < n and glob[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+                continue
+            body = glob[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            out.append(f"[{body}]")
+        else:
+            out.append(re.escape(ch))
+    return "".join(out)
+
+
+class PullRouter:
+    def __init__(self, repo_root: Path, rules: Sequence[RouterRule] = ()) -> None:
+        self.repo_root = Path(repo_root)
+        self.rules = list(rules)
+        self._trie: Dict[str, object] = {}
+        for parts in _PREFIXES:
+            outbox_parts = parts[1:] if parts[0] == "exchange" else parts
+            node = self._trie
+            for part in outbox_parts:
+                node = node.setdefault(part, {})  # type: ignore[assignment]
+            node[_LEAF] = (parts, "/".join(outbox_parts))
+        self._rule_dirs = [self.repo_root / Path(rule.dest) for rule in self.rules]
+        self._rules_rx: Optional[re.Pattern[str]] = None
+        if self.rules:
+            # Windows fnmatch is case-insensitive (normcase); keep that behaviour.
+            flags = re.DOTALL | (re.IGNORECASE if os.name == "nt" else 0)
+            body = "|".join(f"(?P<r{i}>{glob_to_regex(rule.glob)})" for i, rule in enumerate(self.rules))
+            self._rules_rx = re.compile(f"(?:{body})\\Z", flags)
+        root = self.repo_root
+        self._report_dir = root / "exchange" / "reports" / "inbox"
+        self._ack_dir = root / "exchange" / "acknowledgements" / "logged"
+        self._samples_dir = root / "telemetry" / "emoji_runtime" / "promoted_samples"
+        self._inbox = root / "exchange" / "inbox"
+        self._resolved_root = root.resolve()
+
+    @classmethod
+    def load(cls, repo_root: Path) -> "PullRouter":
+        return cls(repo_root, load_rules(repo_root))
+
+    def route_name(self, name: str) -> Optional[Tuple[Path, str]]:
+        """Final directory for a catch-all file by basename, or None to leave it in the inbox."""
+        low = name.lower()
+        if low.startswith("order-"):
+            if low.endswith("-report.json"):
+                return self._report_dir, "reports/inbox"
+            if low.endswith("-ack.json"):
+                return self._ack_dir, "acknowledgements/logged"
+        if low.endswith(".json") and low.startswith("tf-emoji-dryrun"):
+            return self._samples_dir, "telemetry/emoji_runtime/promoted_samples"
+        if self._rules_rx is not None:
+            match = self._rules_rx.match(name)
+            if match is not None:
+                i = int(match.lastgroup[1:])  # type: ignore[index]
+                return self._rule_dirs[i], f"rule:{self.rules[i].glob}"
+        return None
+
+    def route(self, rel: str) -> Tuple[Path, str]:
+        """Destination and bucket for a peer's ``outbox/<rel>`` (POSIX-style ``rel``).
+
+        Raises ValueError for a ``rel`` that could leave the destination folder.
+        """
+        if not is_safe_rel(rel):
+            raise ValueError(f"unsafe peer path {rel!r}")
+        parts = rel.split("/")
+        lowered = [p.lower() for p in parts]
+        present = set(lowered)
+        for component, dest, bucket in _ANYWHERE:
+            if component in present:
+                tail = parts[lowered.index(component) + 1 :]
+                return self.repo_root.joinpath(*dest, *tail), bucket
+
+        node: Dict[str, object] = self._trie
+        for depth, part in enumerate(lowered):
+            child = node.get(part)
+            if not isinstance(child, dict):
+                break
+            node = child
+            leaf = node.get(_LEAF)
+            if leaf is not None:
+                dest, bucket = leaf  # type: ignore[misc]
+                return self.repo_root.joinpath(*dest, *parts[depth + 1 :]), bucket
+
+        named = self.route_name(parts[-1])
+        if named is not None:
+            return named[0] / parts[-1], named[1]
+        return self._inbox.joinpath(*parts), INBOX_BUCKET
+
+    def contains(self, path: Path) -> bool:
+        """True if ``path``, with symlinks resolved, is inside the repo root."""
+        return path.resolve().is_relative_to(self._resolved_root)
+
+
+__all__ = ["PullRouter", "RouterRule", "glob_to_regex", "is_safe_rel", "load_rules"]